@@ -1,10 +1,15 @@
+import os
 import socket
+import sqlite3
 import pickle
+import hashlib
+import tempfile
 import tkinter as tk
 from PIL import Image, ImageTk, ImageDraw, ImageFilter, ImageEnhance, ImageFont
 import threading
 import io
 import time
+import logging
 from tkinter import font as tkfont
 from tkinter import ttk
 import json
@@ -12,6 +17,17 @@ from datetime import datetime
 import math
 import random
 from tkinter import messagebox
+from tkinter import filedialog
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import numpy as np
+import cv2
+from nikimonitorscreenSTREAM import merge_frame_messages
+from nikimonitorscreenSERVER import MonitorServer, UpdateQueue, SESSION_CONNECTED, SESSION_CLOSED
+from nikimonitorscreenSTORE import HistoryStore, ActivityStore, categorize, visit_domain
+from nikimonitorscreenRECORD import SessionRecorder, Recording
+from nikimonitorscreenEXPORT import (DataExporter, EXPORT_FORMATS, HISTORY_COLUMNS, WINDOW_COLUMNS, SESSION_COLUMNS,
+                                     visit_rows, visit_chunks, window_rows, session_rows, count_sessions)
 
 # Simple class to simulate object methods
 class SimpleObject:
@@ -19,9 +35,9 @@ class SimpleObject:
     pass
 
 # Helper function to draw rounded rectangles on canvas
-def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
-    """Create a rounded rectangle on a canvas"""
-    points = [
+def rounded_rectangle_points(x1, y1, x2, y2, radius=25):
+    """Polygon points for a rounded rectangle, also used to resize one with coords()"""
+    return [
         x1+radius, y1,
         x1+radius, y1,
         x2-radius, y1,
@@ -43,11 +59,515 @@ def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
         x1, y1+radius,
         x1, y1
     ]
-    return self.create_polygon(points, **kwargs, smooth=True)
+
+def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
+    """Create a rounded rectangle on a canvas"""
+    return self.create_polygon(rounded_rectangle_points(x1, y1, x2, y2, radius), **kwargs, smooth=True)
 
 # Monkey-patch the Canvas class to add the create_rounded_rectangle method
 tk.Canvas.create_rounded_rectangle = create_rounded_rectangle
 
+def format_visit_time(timestamp):
+    """Format a history visit's unix microsecond timestamp for display
+    
+    Only called for rows that are actually shown. Visits from today show
+    just the time of day, older ones are prefixed with the date.
+    """
+    visited = datetime.fromtimestamp(timestamp / 1_000_000)
+    if visited.date() == datetime.now().date():
+        return visited.strftime("%H:%M:%S")
+    return visited.strftime("%b %d %H:%M:%S")
+
+# Rendered backgrounds are cached here, keyed by size and colours
+BACKGROUND_CACHE_DIR = os.path.join(tempfile.gettempdir(), "oversight_cache")
+BACKGROUND_VERSION = 1  # Bump when render_background changes, to ignore old cache files
+
+def render_background(width, height, surface, border, primary, secondary):
+    """Render the window background as an RGBA array with whole-array operations
+    
+    The image is the surface colour fading out from top to bottom, a dotted
+    grid every 40 pixels, and a soft glow in each top corner (primary on the
+    left, secondary on the right). Colours are RGB tuples.
+    """
+    # Gradient: every row is the surface colour at its own opacity
+    rows = np.empty((height, 1, 4), np.uint8)
+    rows[:, 0, :3] = surface
+    rows[:, 0, 3] = 20 - (np.arange(height) / height) * 15
+    background = np.broadcast_to(rows, (height, width, 4)).copy()
+    
+    # Dotted grid: a dot every 6 pixels along every 40th column and row
+    grid = border + (15,)
+    background[0::6, 0::40] = grid
+    background[0::40, 0::6] = grid
+    
+    # Corner glows: opacity falls off with the distance from the corner
+    opacity = (10 - np.arange(401) * 0.025).astype(np.uint8)
+    reach = int(np.flatnonzero(opacity)[-1])  # Farthest radius still visible
+    size_y = min(reach + 1, height)
+    size_x = min(reach + 1, width)
+    dy = np.arange(size_y)[:, None]
+    dx = np.arange(size_x + 1)
+    radius = np.maximum(np.ceil(np.sqrt(dx * dx + dy * dy) - 0.45), 1).astype(np.intp)
+    inside = radius <= reach
+    glow = opacity[np.minimum(radius, reach)]
+    
+    # The right glow is centred just past the last column, so its distances run backwards from size_x
+    for color, region, columns in ((primary, background[:size_y, :size_x], slice(0, size_x)),
+                                   (secondary, background[:size_y, width - size_x:], slice(size_x, 0, -1))):
+        mask = inside[:, columns]
+        region[mask] = color + (0,)
+        region[..., 3][mask] = glow[:, columns][mask]
+    return background
+
+def load_background(width, height, surface, border, primary, secondary):
+    """Return the rendered background, from the disk cache when it was rendered before"""
+    key = repr((BACKGROUND_VERSION, width, height, surface, border, primary, secondary))
+    path = os.path.join(BACKGROUND_CACHE_DIR, f"background_{hashlib.sha1(key.encode()).hexdigest()[:16]}.npy")
+    try:
+        background = np.load(path)
+        if background.shape == (height, width, 4):
+            return background
+    except (OSError, ValueError):
+        pass
+    
+    background = render_background(width, height, surface, border, primary, secondary)
+    try:
+        os.makedirs(BACKGROUND_CACHE_DIR, exist_ok=True)
+        # Write then rename, so another instance never reads half a file
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            np.save(f, background)
+        os.replace(partial, path)
+    except OSError as e:
+        print(f"Could not cache background: {e}")
+    return background
+
+class TileCompositor:
+    """Rebuild the client's screen from streamed keyframes and dirty tiles"""
+    
+    def __init__(self):
+        self.canvas = None  # Persistent full-size BGR frame the tiles are pasted onto
+        self.last_sequence = 0
+    
+    @staticmethod
+    def decode_tile(tile):
+        """Decode one JPEG tile to a BGR array"""
+        return cv2.imdecode(np.frombuffer(tile["data"], np.uint8), cv2.IMREAD_COLOR)
+    
+    def apply(self, message, map_tiles=map):
+        """Apply a frame_tiles message, returning the updated frame or None
+        
+        `map_tiles` decodes the tiles; pass a thread pool's map to decode
+        them in parallel.
+        """
+        width, height = message["width"], message["height"]
+        
+        if message["keyframe"]:
+            # Keyframes replace the whole canvas
+            if self.canvas is None or self.canvas.shape[:2] != (height, width):
+                self.canvas = np.zeros((height, width, 3), np.uint8)
+        elif self.canvas is None or self.canvas.shape[:2] != (height, width):
+            # Tiles are useless until we have a keyframe to paste them onto
+            return None
+        
+        # Paste each decoded tile in place, clipped to the canvas
+        for tile, image in zip(message["tiles"], map_tiles(self.decode_tile, message["tiles"])):
+            if image is None:
+                continue
+            x, y = tile["x"], tile["y"]
+            region = self.canvas[y:y + image.shape[0], x:x + image.shape[1]]
+            region[:] = image[:region.shape[0], :region.shape[1]]
+        
+        self.last_sequence = message["seq"]
+        return self.canvas
+
+class FrameDecoder:
+    """Decode, compose and scale streamed frames off the Tk thread
+    
+    submit() returns immediately. A worker thread applies updates in order,
+    decoding the tiles of each one on a small thread pool (OpenCV releases
+    the GIL while decoding), and scales the composed frame to the display
+    size as RGB. Updates arriving while the worker is busy are merged into
+    one, and only the newest finished frame is kept for take(), so the UI
+    never works through a backlog.
+    
+    Finished frames live in a few recycled buffers; the Tk thread hands each
+    one back with recycle() after pasting it.
+    """
+    
+    def __init__(self, workers=4):
+        self.compositor = TileCompositor()
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="frame-decode")
+        self.target_size = None   # (width, height) frames are scaled to
+        self.pending = None       # Merged updates waiting for the worker
+        self.ready = None         # (buffer, seq) of the newest finished frame
+        self.free = []            # Recycled output buffers
+        self.scratch = None       # Reused BGR resize output
+        self.reset_requested = False
+        self.coalesced = 0
+        self.decoded = 0
+        self.running = True
+        self.condition = threading.Condition()
+        self.worker = threading.Thread(target=self._run, name="frame-decoder", daemon=True)
+        self.worker.start()
+    
+    def submit(self, message):
+        """Queue a frame_tiles message for decoding"""
+        with self.condition:
+            if self.pending is not None:
+                self.pending = merge_frame_messages(self.pending, message)
+                self.coalesced += 1
+            else:
+                self.pending = message
+            self.condition.notify()
+    
+    def reset(self):
+        """Forget the composed screen, e.g. when switching clients"""
+        with self.condition:
+            self.pending = None
+            self.reset_requested = True
+            if self.ready is not None:
+                self.free.append(self.ready[0])
+                self.ready = None
+    
+    def take(self):
+        """Return (rgb_buffer, seq) of the newest finished frame, or None"""
+        with self.condition:
+            ready, self.ready = self.ready, None
+            return ready
+    
+    def recycle(self, buffer):
+        """Hand a buffer from take() back once it has been displayed"""
+        with self.condition:
+            self.free.append(buffer)
+    
+    def close(self):
+        """Stop the worker and the decode pool"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.pool.shutdown(wait=False)
+    
+    def _output_buffer(self, shape):
+        """Take a free output buffer of the right shape"""
+        with self.condition:
+            while self.free:
+                buffer = self.free.pop()
+                if buffer.shape == shape:
+                    return buffer
+        return np.empty(shape, np.uint8)
+    
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                message, self.pending = self.pending, None
+                if self.reset_requested:
+                    self.compositor = TileCompositor()
+                    self.reset_requested = False
+                size = self.target_size
+            
+            try:
+                frame = self.compositor.apply(message, self.pool.map)
+                if frame is None:
+                    continue
+                
+                # Scale to the display size and convert to RGB on the small frame
+                width, height = size or (frame.shape[1], frame.shape[0])
+                if self.scratch is None or self.scratch.shape != (height, width, 3):
+                    self.scratch = np.empty((height, width, 3), np.uint8)
+                cv2.resize(frame, (width, height), dst=self.scratch, interpolation=cv2.INTER_AREA)
+                output = self._output_buffer(self.scratch.shape)
+                cv2.cvtColor(self.scratch, cv2.COLOR_BGR2RGB, dst=output)
+            except Exception as e:
+                print(f"Error decoding frame: {e}")
+                continue
+            
+            with self.condition:
+                if self.reset_requested:
+                    self.free.append(output)
+                    continue
+                if self.ready is not None:
+                    self.free.append(self.ready[0])
+                self.ready = (output, message["seq"])
+                self.decoded += 1
+
+class VirtualList:
+    """Scrollable list that only keeps widgets for the rows in view
+    
+    Rows all have the same height and are drawn by two callbacks:
+    create_row(parent) builds an empty row widget and update_row(row, item)
+    fills it in. Rows are pooled and moved around a single canvas as the
+    list scrolls, so a list of any length costs only as many widgets as fit
+    on screen. Items can be a list or any store that supports len() and
+    slicing; each render reads just the page of items in view. A row is only
+    redrawn when the item it shows changes, or when refresh() asks for it.
+    """
+    
+    def __init__(self, parent, row_height, create_row, update_row, bg):
+        self.row_height = row_height
+        self.create_row = create_row
+        self.update_row = update_row
+        self.items = []  # Sequence of items, or a store read one page at a time
+        self.rows = []   # Pooled rows: SimpleObject with widget, window, index, item
+        self.width = 1
+        
+        self.canvas = tk.Canvas(parent, bg=bg, highlightthickness=0, yscrollincrement=row_height // 4)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.yview,
+                                       style="Vertical.TScrollbar")
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.canvas)
+    
+    def bind_wheel(self, widget):
+        """Scroll the list when the wheel turns over `widget`"""
+        widget.bind("<MouseWheel>", self.on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll(1))
+    
+    def set_items(self, items):
+        """Show a new list of items, redrawing only rows whose item changed"""
+        self.items = items
+        self.canvas.configure(scrollregion=(0, 0, self.width, len(items) * self.row_height))
+        self.render()
+    
+    def refresh(self, predicate=None):
+        """Redraw the visible rows whose item matches predicate, or all of them"""
+        for row in self.rows:
+            if row.index is not None and (predicate is None or predicate(row.item)):
+                self.update_row(row.widget, row.item)
+    
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.render()
+    
+    def scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self.render()
+    
+    def on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small raw deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-delta)
+    
+    def on_resize(self, event):
+        if event.width != self.width:
+            self.width = event.width
+            for row in self.rows:
+                self.canvas.itemconfigure(row.window, width=self.width)
+            self.canvas.configure(scrollregion=(0, 0, self.width, len(self.items) * self.row_height))
+        self.render()
+    
+    def render(self):
+        """Bind pooled rows to the items in view and move them into place"""
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.row_height)
+        first = max(0, int(top // self.row_height))
+        last = min(len(self.items), int((top + height) // self.row_height) + 1)
+        
+        while len(self.rows) < last - first:
+            self.rows.append(self._new_row())
+        
+        # Rows still in view keep their place, the rest are reused for new indices
+        bound = {}
+        free = []
+        for row in self.rows:
+            if row.index is not None and first <= row.index < last:
+                bound[row.index] = row
+            else:
+                free.append(row)
+        
+        page = self.items[first:last]
+        for index, item in enumerate(page, first):
+            row = bound.get(index)
+            if row is None:
+                row = free.pop()
+                self.canvas.coords(row.window, 0, index * self.row_height)
+                row.index = index
+                row.item = None
+            if row.item != item:
+                row.item = item
+                self.update_row(row.widget, item)
+        
+        # Park unused rows above the scroll region, where they are never shown
+        for row in free:
+            if row.index is not None:
+                row.index = None
+                row.item = None
+                self.canvas.coords(row.window, 0, -2 * self.row_height)
+    
+    def _new_row(self):
+        row = SimpleObject()
+        row.widget = self.create_row(self.canvas)
+        row.window = self.canvas.create_window(0, -2 * self.row_height, window=row.widget, anchor="nw",
+                                               width=self.width, height=self.row_height)
+        row.index = None
+        row.item = None
+        self.bind_wheel(row.widget)
+        for child in row.widget.winfo_children():
+            self.bind_wheel(child)
+        return row
+
+class AnimationScheduler:
+    """Run every active animation in one pass per frame, and sleep when there are none
+    
+    Animations are keyed by target id; starting one for a target that is
+    already animating replaces it. The frame timer only runs while
+    something is animating: the last animation to finish lets it lapse and
+    animate() starts it again, so an idle window costs no wakeups at all.
+    All on_update callbacks of a frame run back to back, so Tk redraws the
+    canvas once for the whole frame.
+    """
+    
+    def __init__(self, root, interval=16, clock=time.time):
+        self.root = root
+        self.interval = interval  # ms between frames, ~60fps
+        self.clock = clock
+        self.speed = 1.0          # Speed multiplier (1.0 = normal)
+        self.animations = {}      # target_id -> running animation
+        self.job = None           # Pending after() call, None while asleep
+        self.last_frame_time = 0.0
+        self.frames = 0
+    
+    def animate(self, target_id, start, end, duration, on_update, easing="ease_out_quad", on_complete=None):
+        """Start (or replace) the animation of one target and wake the timer"""
+        self.animations[target_id] = {
+            'start': start,
+            'end': end,
+            'duration': duration,
+            'progress': 0.0,
+            'easing': easing,
+            'on_update': on_update,
+            'on_complete': on_complete
+        }
+        if self.job is None:
+            self.last_frame_time = self.clock()
+            self.job = self.root.after(self.interval, self.tick)
+    
+    def cancel(self, target_id):
+        """Stop an animation where it is, without completing it"""
+        self.animations.pop(target_id, None)
+    
+    def tick(self):
+        """Advance every animation by one frame"""
+        current_time = self.clock()
+        dt = (current_time - self.last_frame_time) * self.speed
+        self.last_frame_time = current_time
+        self.frames += 1
+        
+        finished = []
+        for anim_id, anim in list(self.animations.items()):
+            # Update animation progress
+            anim['progress'] += dt / anim['duration']
+            
+            # Finished animations land exactly on their end value
+            progress = min(anim['progress'], 1.0)
+            eased_progress = self.ease_value(progress, anim['easing'])
+            
+            # Calculate current value
+            if isinstance(anim['start'], (int, float)) and isinstance(anim['end'], (int, float)):
+                current_value = anim['start'] + (anim['end'] - anim['start']) * eased_progress
+            elif isinstance(anim['start'], tuple) and isinstance(anim['end'], tuple) and len(anim['start']) == len(anim['end']):
+                # Handle tuple values (like coordinates)
+                current_value = tuple(s + (e - s) * eased_progress for s, e in zip(anim['start'], anim['end']))
+            else:
+                current_value = anim['end'] if eased_progress > 0.5 else anim['start']
+            
+            # Update via callback
+            anim['on_update'](current_value)
+            if progress >= 1.0:
+                finished.append((anim_id, anim))
+        
+        # Completion callbacks may start new animations, even for the same target
+        for anim_id, anim in finished:
+            if self.animations.get(anim_id) is anim:
+                del self.animations[anim_id]
+            if anim['on_complete']:
+                anim['on_complete']()
+        
+        # Keep ticking only while something is animating
+        if self.animations:
+            self.job = self.root.after(self.interval, self.tick)
+        else:
+            self.job = None
+    
+    @staticmethod
+    def ease_value(progress, easing_type):
+        """Apply easing function to a progress value (0.0 to 1.0)"""
+        if easing_type == "linear":
+            return progress
+        elif easing_type == "ease_in_quad":
+            return progress * progress
+        elif easing_type == "ease_out_quad":
+            return 1 - (1 - progress) * (1 - progress)
+        elif easing_type == "ease_in_out_quad":
+            return 0.5 * (math.sin((progress - 0.5) * math.pi) + 1)
+        elif easing_type == "ease_in_cubic":
+            return progress * progress * progress
+        elif easing_type == "ease_out_cubic":
+            return 1 - math.pow(1 - progress, 3)
+        elif easing_type == "ease_out_back":
+            c1 = 1.70158
+            c3 = c1 + 1
+            return 1 + c3 * math.pow(progress - 1, 3) + c1 * math.pow(progress - 1, 2)
+        elif easing_type == "ease_in_out_back":
+            c1 = 1.70158
+            c2 = c1 * 1.525
+            if progress < 0.5:
+                return (2 * progress * progress * ((c2 + 1) * 2 * progress - c2)) / 2
+            else:
+                return (2 * math.pow(progress - 0.5, 2) * ((c2 + 1) * 2 * (progress - 0.5) + c2) + 1) / 2
+        else:
+            return progress  # Default to linear
+
+class PanelImageCache:
+    """Bounded LRU cache of rendered panel images and their PhotoImages
+    
+    Blurred shadows and frosted panels only depend on their size, radius,
+    alpha and colours, so each is rendered once per key and shared. The
+    cached PIL images are shared too and must not be drawn on. PhotoImages
+    are created on first use, on the Tk thread, and evicted with their image.
+    """
+    
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # key -> [PIL image, PhotoImage or None]
+        self.hits = 0
+        self.misses = 0
+    
+    def _entry(self, key, render):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        entry = self.entries[key] = [render(), None]
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return entry
+    
+    def image(self, key, render):
+        """Return the PIL image for a key, calling render() only on a miss"""
+        return self._entry(key, render)[0]
+    
+    def photo(self, key, render):
+        """Return a PhotoImage for a key, shared by everything showing it"""
+        entry = self._entry(key, render)
+        if entry[1] is None:
+            entry[1] = ImageTk.PhotoImage(entry[0])
+        return entry[1]
+    
+    def __len__(self):
+        return len(self.entries)
+
 class FuturisticParentMonitorApp:
     def __init__(self, root):
         self.root = root
@@ -70,12 +590,62 @@ class FuturisticParentMonitorApp:
         
         # Server status
         self.server_running = False
-        self.client_socket = None
-        self.server_socket = None
+        self.server = None              # MonitorServer running on its own thread
+        self.server_jobs = {}           # Periodic jobs of the running server: name -> Tk after id
+        self.updates = UpdateQueue()    # Client messages waiting for the Tk thread
+        self.update_interval = 15       # ms between drains of the update queue while busy
+        self.idle_update_interval = 100  # ms between drains once clients have gone quiet
+        self.idle_after = 0.5           # Seconds without messages before draining slows down
+        self.last_update_time = 0.0
+        self.activity_level = 0.5       # Activity meter fill, 0..1
+        self.activity_messages = 0      # Messages from the viewed client since the last meter update
+        self.activity_full_rate = 20    # Messages per second that fill the meter
+        self.sessions = {}              # Connected clients: session id -> address
+        self.client_names = {}          # Session id -> host name the client reported
+        self.active_session = None      # Client shown in the live view
+        self.history_poll_interval = 15000  # ms between incremental history polls
+        self.windows_poll_interval = 2000   # ms between window list polls, answered with deltas
         self.screen_paused = False
         self.windows_list = []
+        self.windows_seq = None         # Sequence number of the window list we hold
+        self.apps_list = None           # VirtualList showing windows_list, built on first use
         self.active_window_id = None
-        self.browser_history = []
+        self.history_store = HistoryStore()  # Browser history, sorted and paged for the view
+        self.history_list = None        # VirtualList showing history_store, built on first use
+        self.history_results = None     # Rows matching the history search, None while not searching
+        self.history_query = ""         # Text in the history search box
+        self.history_category = None    # Category picked in the history filter, None for all
+        self.history_search_job = None
+        self.history_search_delay = 150  # ms after the last keystroke before searching
+        self.recordings_dir = os.path.join(os.path.expanduser("~"), "OVERSIGHT Recordings")
+        self.recorder = None            # SessionRecorder writing every client's screen while serving
+        self.recordings_max_bytes = 20 * 1024 ** 3     # Oldest recorded segments are deleted beyond this
+        self.recordings_max_age = 30 * 24 * 60 * 60    # or once older than this, in seconds
+        self.playback = None            # Recording shown in the screen panel instead of the live view
+        self.playback_decoder = None    # FrameDecoder for playback, built on first use
+        self.playback_time = 0          # Position in the recording, unix microseconds
+        self.playback_playing = False
+        self.playback_fast = False      # Fast-forward: faster, and skipping stretches with no change
+        self.playback_job = None
+        self.playback_interval = 50     # ms between playback steps
+        self.playback_fast_speed = 8    # Playback speed while fast-forwarding
+        self.fast_forward_threshold = 0.005  # Changed share of the screen fast-forward stops for
+        self.playback_step_limit = 50   # Updates applied in one step before seeking from a keyframe instead
+        self.held_live_frame = None     # Newest live frame, shown again when playback ends
+        self.exporter = None            # DataExporter of the last export
+        
+        # Every client's browser history, kept on disk and searched from the history tab
+        self.activity_db = os.path.join(os.path.expanduser("~"), "OVERSIGHT Activity.sqlite3")
+        try:
+            self.activity_store = ActivityStore(self.activity_db)
+        except sqlite3.Error as e:
+            print(f"Could not open the activity store: {e}")
+            self.activity_store = None
+        self.export_poll_interval = 200  # ms between export progress updates
+        self.panel_images = PanelImageCache()  # Shadows and frosted panels, rendered once per look
+        
+        # Composes streamed tiles into the current client screen off the Tk thread
+        self.frame_decoder = FrameDecoder()
         
         # Set default current tab to 'apps' to prevent tab switching errors
         self.current_tab = "apps"
@@ -115,16 +685,17 @@ class FuturisticParentMonitorApp:
             5: {"title": "File Explorer", "process": "explorer.exe", "id": 5, "category": "system", "icon": "📁"}
         }
         
-        # Sample browser history with categories
+        # Sample browser history with categories, visited over the last hour
+        now = int(time.time() * 1_000_000)
         self.sample_history = [
-            {"time": "14:32:05", "url": "www.minecraft.net/community", "title": "Minecraft Community | Minecraft", "category": "games"},
-            {"time": "14:28:12", "url": "www.google.com/search?q=minecraft+diamond+locations", "title": "minecraft diamond locations - Google Search", "category": "games"},
-            {"time": "14:25:30", "url": "www.youtube.com/watch?v=dQw4w9WgXcQ", "title": "How to Beat Minecraft Fast - YouTube", "category": "video"},
-            {"time": "14:15:22", "url": "www.google.com/search?q=homework+answers", "title": "homework answers - Google Search", "category": "education"},
-            {"time": "14:10:15", "url": "www.roblox.com/games", "title": "Games - Roblox", "category": "games"},
-            {"time": "13:58:40", "url": "www.discord.com", "title": "Discord | Your Place to Talk and Hang Out", "category": "social"},
-            {"time": "13:45:12", "url": "www.google.com/search?q=math+homework+solver", "title": "math homework solver - Google Search", "category": "education"},
-            {"time": "13:30:05", "url": "www.google.com", "title": "Google", "category": "web"}
+            {"timestamp": now, "url": "www.minecraft.net/community", "title": "Minecraft Community | Minecraft", "category": "games"},
+            {"timestamp": now - 233_000_000, "url": "www.google.com/search?q=minecraft+diamond+locations", "title": "minecraft diamond locations - Google Search", "category": "games"},
+            {"timestamp": now - 395_000_000, "url": "www.youtube.com/watch?v=dQw4w9WgXcQ", "title": "How to Beat Minecraft Fast - YouTube", "category": "video"},
+            {"timestamp": now - 1003_000_000, "url": "www.google.com/search?q=homework+answers", "title": "homework answers - Google Search", "category": "education"},
+            {"timestamp": now - 1310_000_000, "url": "www.roblox.com/games", "title": "Games - Roblox", "category": "games"},
+            {"timestamp": now - 2005_000_000, "url": "www.discord.com", "title": "Discord | Your Place to Talk and Hang Out", "category": "social"},
+            {"timestamp": now - 2813_000_000, "url": "www.google.com/search?q=math+homework+solver", "title": "math homework solver - Google Search", "category": "education"},
+            {"timestamp": now - 3720_000_000, "url": "www.google.com", "title": "Google", "category": "web"}
         ]
         
         # Start UI animations and transitions
@@ -132,7 +703,6 @@ class FuturisticParentMonitorApp:
         
         # After all UI elements are created, load sample data and start animations
         self.root.after(100, self.load_sample_data)
-        self.root.after(100, self.animate_activity_meter)
         
         # Do not call update_status here as it causes errors
         # self.root.after(500, lambda: self.update_status("Ready to connect", "orange"))
@@ -515,60 +1085,32 @@ class FuturisticParentMonitorApp:
     def create_background(self):
         """Create a sophisticated background with subtle pattern and glow effects"""
         width, height = 1320, 800  # Updated width from 1280 to 1320
-        background = Image.new('RGBA', (width, height), self._hex_to_rgb(self.colors.bg) + (255,))
-        draw = ImageDraw.Draw(background)
-        
-        # Create a subtle gradient overlay
-        for y in range(height):
-            # Calculate gradient opacity - stronger at top, fading toward bottom
-            opacity = int(20 - (y / height) * 15)
-            if opacity > 0:
-                draw.line([(0, y), (width, y)], fill=self._hex_to_rgb(self.colors.surface) + (opacity,))
-        
-        # Add subtle grid pattern for a tech feel
-        grid_spacing = 40
-        grid_color = self._hex_to_rgb(self.colors.border) + (15,)  # Very subtle grid
-        
-        # Draw grid with dotted lines for a more refined look
-        for x in range(0, width, grid_spacing):
-            for y in range(0, height, 3):  # Draw dots every 3 pixels
-                if y % 6 == 0:  # Skip every other dot for dotted line effect
-                    draw.point((x, y), fill=grid_color)
-        
-        for y in range(0, height, grid_spacing):
-            for x in range(0, width, 3):  # Draw dots every 3 pixels
-                if x % 6 == 0:  # Skip every other dot for dotted line effect
-                    draw.point((x, y), fill=grid_color)
-        
-        # Add subtle glow in top corners
-        glow_size = 400
-        glow_color = self._hex_to_rgb(self.colors.primary) + (0,)  # Start with transparent
-        
-        # Top left glow
-        for i in range(glow_size, 0, -1):
-            # Decreasing opacity as radius increases
-            opacity = int(10 - i * 0.025)
-            if opacity <= 0:
-                continue
-                
-            glow_color_with_opacity = self._hex_to_rgb(self.colors.primary) + (opacity,)
-            draw.ellipse([-i, -i, i, i], fill=glow_color_with_opacity)
         
-        # Top right glow with secondary color
-        for i in range(glow_size, 0, -1):
-            opacity = int(10 - i * 0.025)
-            if opacity <= 0:
-                continue
-                
-            glow_color_with_opacity = self._hex_to_rgb(self.colors.secondary) + (opacity,)
-            draw.ellipse([width - i, -i, width + i, i], fill=glow_color_with_opacity)
+        # Gradient, dotted grid and corner glows, rendered once per colour scheme and size
+        background = load_background(
+            width, height,
+            self._hex_to_rgb(self.colors.surface),
+            self._hex_to_rgb(self.colors.border),
+            self._hex_to_rgb(self.colors.primary),
+            self._hex_to_rgb(self.colors.secondary)
+        )
         
         # Convert and display
-        self.bg_photo = ImageTk.PhotoImage(background)
+        self.bg_photo = ImageTk.PhotoImage(Image.fromarray(background, "RGBA"))
         self.canvas.create_image(0, 0, image=self.bg_photo, anchor="nw")
         
     def create_shadow_image(self, width, height, radius=20, alpha=100):
-        """Create a shadow image for adding depth to UI elements"""
+        """Create a shadow image for adding depth to UI elements (shared, do not draw on it)"""
+        return self.panel_images.image(("shadow", width, height, radius, alpha),
+                                       lambda: self.render_shadow_image(width, height, radius, alpha))
+    
+    def create_shadow_photo(self, width, height, radius=20, alpha=100):
+        """PhotoImage of create_shadow_image, shared between panels"""
+        return self.panel_images.photo(("shadow", width, height, radius, alpha),
+                                       lambda: self.render_shadow_image(width, height, radius, alpha))
+    
+    @staticmethod
+    def render_shadow_image(width, height, radius, alpha):
         shadow = Image.new('RGBA', (width, height), (0, 0, 0, 0))
         draw = ImageDraw.Draw(shadow)
         
@@ -581,7 +1123,16 @@ class FuturisticParentMonitorApp:
         return shadow
     
     def create_frosted_panel(self, width, height, radius=15, opacity=230):
-        """Create a frosted glass panel effect for modern UI"""
+        """Create a frosted glass panel effect for modern UI (shared, do not draw on it)"""
+        return self.panel_images.image(("frosted", width, height, radius, opacity, self.colors.surface),
+                                       lambda: self.render_frosted_panel(width, height, radius, opacity))
+    
+    def create_frosted_photo(self, width, height, radius=15, opacity=230):
+        """PhotoImage of create_frosted_panel, shared between panels"""
+        return self.panel_images.photo(("frosted", width, height, radius, opacity, self.colors.surface),
+                                       lambda: self.render_frosted_panel(width, height, radius, opacity))
+    
+    def render_frosted_panel(self, width, height, radius, opacity):
         panel = Image.new('RGBA', (width, height), (0, 0, 0, 0))
         draw = ImageDraw.Draw(panel)
         
@@ -600,96 +1151,16 @@ class FuturisticParentMonitorApp:
         return panel
     
     def start_animations(self):
-        """Initialize and start UI animations"""
-        # Animation properties
-        self.animation_speed = 1.0  # Speed multiplier (1.0 = normal)
-        self.animations = {}  # Store running animations
-        
-        # Setup animation tick
-        self.last_frame_time = time.time()
-        self.root.after(16, self.animation_tick)  # ~60fps
-    
-    def animation_tick(self):
-        """Main animation loop"""
-        current_time = time.time()
-        dt = (current_time - self.last_frame_time) * self.animation_speed
-        self.last_frame_time = current_time
-        
-        # Process all active animations
-        animations_to_remove = []
-        for anim_id, anim in self.animations.items():
-            # Update animation progress
-            anim['progress'] += dt / anim['duration']
-            
-            # Check if animation is complete
-            if anim['progress'] >= 1.0:
-                # Run completion callback if provided
-                if anim['on_complete']:
-                    anim['on_complete']()
-                animations_to_remove.append(anim_id)
-                continue
-                
-            # Calculate eased value
-            eased_progress = self.ease_value(anim['progress'], anim['easing'])
-            
-            # Calculate current value
-            if isinstance(anim['start'], (int, float)) and isinstance(anim['end'], (int, float)):
-                current_value = anim['start'] + (anim['end'] - anim['start']) * eased_progress
-            elif isinstance(anim['start'], tuple) and isinstance(anim['end'], tuple) and len(anim['start']) == len(anim['end']):
-                # Handle tuple values (like coordinates)
-                current_value = tuple(s + (e - s) * eased_progress for s, e in zip(anim['start'], anim['end']))
-            else:
-                current_value = anim['end'] if eased_progress > 0.5 else anim['start']
-            
-            # Update via callback
-            anim['on_update'](current_value)
-        
-        # Remove completed animations
-        for anim_id in animations_to_remove:
-            del self.animations[anim_id]
-        
-        # Schedule next frame
-        self.root.after(16, self.animation_tick)
+        """Initialize UI animations; frames only run while something animates"""
+        self.animation_scheduler = AnimationScheduler(self.root)
     
     def animate(self, target_id, start, end, duration, on_update, easing="ease_out_quad", on_complete=None):
         """Start a new animation"""
-        self.animations[target_id] = {
-            'start': start,
-            'end': end,
-            'duration': duration,
-            'progress': 0.0,
-            'easing': easing,
-            'on_update': on_update,
-            'on_complete': on_complete
-        }
-        
+        self.animation_scheduler.animate(target_id, start, end, duration, on_update, easing, on_complete)
+    
     def ease_value(self, progress, easing_type):
         """Apply easing function to a progress value (0.0 to 1.0)"""
-        if easing_type == "linear":
-            return progress
-        elif easing_type == "ease_in_quad":
-            return progress * progress
-        elif easing_type == "ease_out_quad":
-            return 1 - (1 - progress) * (1 - progress)
-        elif easing_type == "ease_in_out_quad":
-            return 0.5 * (math.sin((progress - 0.5) * math.pi) + 1)
-        elif easing_type == "ease_in_cubic":
-            return progress * progress * progress
-        elif easing_type == "ease_out_cubic":
-            return 1 - math.pow(1 - progress, 3)
-        elif easing_type == "ease_out_back":
-            c1 = 1.70158
-            c3 = c1 + 1
-            return 1 + c3 * math.pow(progress - 1, 3) + c1 * math.pow(progress - 1, 2)
-        elif easing_type == "ease_in_out_back":
-            c1 = 1.70158
-            c2 = c1 * 1.525
-            if progress < 0.5:
-                return (2 * progress * progress * ((c2 + 1) * 2 * progress - c2)) / 2
-            else:
-                return (2 * math.pow(progress - 0.5, 2) * ((c2 + 1) * 2 * (progress - 0.5) + c2) + 1) / 2
-        else:
-            return progress  # Default to linear
+        return AnimationScheduler.ease_value(progress, easing_type)
     
     def show_welcome_screen(self):
         """Show animated welcome screen overlay"""
@@ -1004,6 +1475,7 @@ class FuturisticParentMonitorApp:
             width=1)
         
         # Active part of the meter (will be updated)
+        self.activity_meter_box = (x_pos, y_pos, meter_width, meter_height)
         self.activity_meter = self.screen_canvas.create_rounded_rectangle(
             x_pos, y_pos,
             x_pos + meter_width//2, y_pos + meter_height,
@@ -1287,8 +1759,7 @@ class FuturisticParentMonitorApp:
         panel_height = 140
         
         # Create shadow for analytics panel
-        shadow = self.create_shadow_image(width, panel_height, radius=12, alpha=60)
-        self.analytics_shadow = ImageTk.PhotoImage(shadow)
+        self.analytics_shadow = self.create_shadow_photo(width, panel_height, radius=12, alpha=60)
         sidebar_canvas.create_image(
             x, y,
             image=self.analytics_shadow,
@@ -1297,8 +1768,7 @@ class FuturisticParentMonitorApp:
         )
         
         # Create analytics panel with frosted effect
-        panel = self.create_frosted_panel(width, panel_height, radius=12)
-        self.analytics_panel = ImageTk.PhotoImage(panel)
+        self.analytics_panel = self.create_frosted_photo(width, panel_height, radius=12)
         sidebar_canvas.create_image(
             x, y,
             image=self.analytics_panel,
@@ -1579,6 +2049,19 @@ class FuturisticParentMonitorApp:
             anchor="nw", width=self.apps_panel_width - 40, height=425,
             state="hidden")  # Initially hidden
         
+        # Search box, searching titles and URLs as you type
+        self.history_search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            self.history_container,
+            textvariable=self.history_search_var,
+            font=self.caption,
+            fg=self.colors.text, bg="#242935",
+            insertbackground=self.colors.text,
+            relief="flat", highlightthickness=0
+        )
+        search_entry.pack(fill=tk.X, ipady=6, pady=(0, 8))
+        self.history_search_var.trace_add("write", lambda *args: self.schedule_history_search())
+        
         # Modern filter options
         filter_frame = tk.Frame(self.history_container, bg=self.secondary_bg)
         filter_frame.pack(fill=tk.X, pady=(0, 10))
@@ -1591,106 +2074,43 @@ class FuturisticParentMonitorApp:
             anchor="w"
         ).pack(side=tk.LEFT, padx=(0, 10))
         
-        # Filter buttons with modern styling
-        filter_options = ["All", "Search", "Social", "Video"]
+        # Filter buttons with modern styling, each picking a category
+        filter_options = {"All": None, "Search": "search", "Social": "social", "Video": "video"}
+        self.history_filter_buttons = {}
+        
+        def style_filter(option, hover=False):
+            selected = filter_options[option] == self.history_category
+            self.history_filter_buttons[option].config(
+                bg=self.highlight_color if selected or hover else self.panel_bg,
+                fg=self.accent_primary if selected or hover else self.secondary_text)
+        
+        def select_filter(option):
+            self.history_category = filter_options[option]
+            for other in filter_options:
+                style_filter(other)
+            self.search_history()
         
         for option in filter_options:
             # Create sleek pill buttons
             btn = tk.Label(
                 filter_frame, text=option,
                 font=self.caption, # Replace small_font_tk
-                fg=self.secondary_text if option != "All" else self.accent_primary,
-                bg=self.panel_bg if option != "All" else self.highlight_color,
                 padx=10, pady=3,
                 borderwidth=0
             )
             btn.pack(side=tk.LEFT, padx=(0, 6))
+            self.history_filter_buttons[option] = btn
+            style_filter(option)
             
-            # Add hover effect
-            btn.bind("<Enter>", lambda e, b=btn: b.config(
-                bg=self.highlight_color, 
-                fg=self.accent_primary))
-            
-            btn.bind("<Leave>", lambda e, b=btn, o=option: b.config(
-                bg=self.panel_bg if o != "All" else self.highlight_color, 
-                fg=self.secondary_text if o != "All" else self.accent_primary))
+            # Add hover and click effects
+            btn.bind("<Enter>", lambda e, o=option: style_filter(o, hover=True))
+            btn.bind("<Leave>", lambda e, o=option: style_filter(o))
+            btn.bind("<Button-1>", lambda e, o=option: select_filter(o))
         
         # Scrollable history list with modern styling
         self.history_listbox = tk.Frame(self.history_container, bg=self.secondary_bg)
         self.history_listbox.pack(fill=tk.BOTH, expand=True)
     
-    def update_history_list(self):
-        """Update history list with sleek styling"""
-        # Clear existing history items
-        for widget in self.history_listbox.winfo_children():
-            widget.destroy()
-        
-        # Add history items with modern styling
-        for item in self.browser_history:
-            # Create modern history card
-            history_card = tk.Frame(
-                self.history_listbox, 
-                bg=self.panel_bg,
-                highlightthickness=1,
-                highlightbackground=self.border_color)
-            
-            history_card.pack(fill=tk.X, pady=(0, 8))
-            
-            # Add hover effect
-            def on_enter(e, card=history_card):
-                card.config(highlightbackground=self.accent_primary)
-            
-            def on_leave(e, card=history_card):
-                card.config(highlightbackground=self.border_color)
-                
-            history_card.bind("<Enter>", on_enter)
-            history_card.bind("<Leave>", on_leave)
-            
-            # Left side with site icon
-            icon_frame = tk.Frame(
-                history_card, 
-                bg=self.highlight_color, 
-                width=32, height=32)
-            
-            icon_frame.pack(side=tk.LEFT, padx=10, pady=8)
-            icon_frame.pack_propagate(False)
-            
-            # Use domain initial for icon
-            domain = item["url"].split("/")[0].replace("www.", "")[0].upper()
-            tk.Label(
-                icon_frame, text=domain,
-                font=self.caption, # Replace small_font_tk
-                fg=self.accent_tertiary, bg=icon_frame["bg"]
-            ).pack(expand=True)
-            
-            # History details
-            details_frame = tk.Frame(history_card, bg=self.panel_bg)
-            details_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=8, pady=8)
-            
-            # Website title
-            tk.Label(
-                details_frame, text=item["title"],
-                font=self.body, # Replace normal_font_tk
-                fg=self.text_color, bg=self.panel_bg,
-                anchor="w", justify="left"
-            ).pack(fill=tk.X, anchor="w")
-            
-            # URL with subdued styling
-            tk.Label(
-                details_frame, text=item["url"],
-                font=self.caption, # Replace small_font_tk
-                fg=self.secondary_text, bg=self.panel_bg,
-                anchor="w", justify="left"
-            ).pack(fill=tk.X, anchor="w")
-            
-            # Time visited
-            time_label = tk.Label(
-                history_card, text=item["time"],
-                font=self.caption, # Replace small_font_tk
-                fg=self.secondary_text, bg=self.panel_bg
-            )
-            time_label.pack(side=tk.RIGHT, padx=10, pady=10)
-    
     def update_status(self, status_text, color=None):
         """Update connection status indicator with elegant animation"""
         try:
@@ -1751,25 +2171,61 @@ class FuturisticParentMonitorApp:
             # Update status with animation
             self.update_status("Starting server...", "orange")
             
-            # For demonstration, simulate server start
+            # Listen where the control panel says
+            if hasattr(self, 'ip_var'):
+                self.server_ip = self.ip_var.get().strip() or self.server_ip
+                self.server_port = int(self.port_var.get())
+            
+            # Record every client's screen updates to disk
+            self.recorder = SessionRecorder(self.recordings_dir, max_bytes=self.recordings_max_bytes,
+                                            max_age=self.recordings_max_age)
+            self.recorder.start()
+            
+            # Accept clients on a background thread
+            self.server = MonitorServer(self.server_ip, self.server_port, self.updates, recorder=self.recorder)
+            host, port = self.server.start()
             self.server_running = True
             
             # Update button states
             self.start_button.config(state="disabled")
             self.stop_button.config(state="normal")
             
+            # Client messages reach the UI through the update queue
+            self.schedule_server_job("drain_updates", self.update_interval, self.drain_updates)
+            self.schedule_server_job("activity_meter", 1000, self.update_activity_meter)
+            self.schedule_server_job("poll_history", self.history_poll_interval, self.poll_history)
+            self.schedule_server_job("poll_windows", self.windows_poll_interval, self.poll_windows)
+            
             # Elegant status transition with animation
             def update_status_delayed():
-                self.update_status("Connected", "green")
-                # Start activity simulations
-                self.root.after(1000, self.simulate_activity_updates)
+                if self.server_running and not self.sessions:
+                    self.update_status(f"Waiting for clients on port {port}", "orange")
             
             # Delayed status update for visual effect
             self.root.after(1000, update_status_delayed)
             
         except Exception as e:
+            self.server = None
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
             self.update_status(f"Error: {str(e)}", "red")
     
+    def schedule_server_job(self, name, delay, callback):
+        """Run a periodic server job after `delay` ms; stop_server cancels it
+        
+        Each job reschedules itself through here, so only the latest after id
+        of every job is kept and a stop followed by a quick restart never
+        leaves an old chain running next to the new one.
+        """
+        self.server_jobs[name] = self.root.after(delay, callback)
+    
+    def cancel_server_jobs(self):
+        """Cancel every pending periodic server job"""
+        for job in self.server_jobs.values():
+            self.root.after_cancel(job)
+        self.server_jobs.clear()
+    
     def show_loading_bar(self):
         """Show a loading bar animation overlay for visual effect only"""
         # Create a semi-transparent overlay
@@ -1855,8 +2311,22 @@ class FuturisticParentMonitorApp:
         # Update status with animation
         self.update_status("Stopping server...", "orange")
         
-        # For demonstration, simulate server stop
+        # Close every client connection and the listening socket
         self.server_running = False
+        self.cancel_server_jobs()
+        self.set_activity_level(0.1)
+        if self.server:
+            self.server.stop()
+            self.server = None
+        if self.recorder:
+            self.recorder.close()
+            logging.info(f"Session recording: {self.recorder.stats()}")
+            self.recorder = None
+        self.sessions.clear()
+        self.client_names.clear()
+        self.active_session = None
+        self.updates.drain(limit=len(self.updates))
+        logging.debug(f"Panel images: {self.panel_images.misses} rendered, {self.panel_images.hits} reused")
         
         # Update button states
         self.start_button.config(state="normal")
@@ -2061,7 +2531,7 @@ class FuturisticParentMonitorApp:
         self.update_apps_list()
         
         # Update browser history
-        self.browser_history = self.sample_history
+        self.history_store.replace(self.sample_history)
         self.update_history_list()
         
         # Create sample screen with animation
@@ -2070,104 +2540,146 @@ class FuturisticParentMonitorApp:
         # Remove the status update that's causing errors
         # self.update_status("Ready to connect", "orange")
     
-    def animate_activity_meter(self):
-        """Animate activity meter with smooth transitions"""
-        if not hasattr(self, 'activity_level'):
-            self.activity_level = 0.5  # Start at mid-level
-            
-        # Slightly change activity level to simulate real usage
-        change = random.uniform(-0.08, 0.08)
-        self.activity_level = max(0.1, min(0.9, self.activity_level + change))
-        
-        # Update meter width
-        meter_width = 180
-        meter_height = 6
+    def update_activity_meter(self):
+        """Show how busy the viewed client is, once a second while the server runs"""
+        if not self.server_running:
+            return
         
-        x = self.screen_canvas.coords(self.activity_meter)[0]  # Left edge stays fixed
-        y = self.screen_canvas.coords(self.activity_meter)[1]  # Top edge
+        # Stream updates and other messages from the viewed client over the last second
+        self.set_activity_level(max(0.1, min(0.9, self.activity_messages / self.activity_full_rate)))
+        self.activity_messages = 0
+        self.schedule_server_job("activity_meter", 1000, self.update_activity_meter)
+    
+    def set_activity_level(self, level):
+        """Slide the activity meter to a new level; does nothing if it is already there"""
+        if not hasattr(self, 'activity_meter') or abs(level - self.activity_level) < 0.01:
+            return
         
-        # New width based on activity level
-        new_width = meter_width * self.activity_level
+        x, y, meter_width, meter_height = self.activity_meter_box
         
-        # Update meter position with animation
-        self.screen_canvas.coords(
-            self.activity_meter,
-            x, y,
-            x + new_width, y + meter_height
-        )
+        def update_meter(value):
+            self.activity_level = value
+            width = max(meter_height, meter_width * value)
+            self.screen_canvas.coords(
+                self.activity_meter,
+                *rounded_rectangle_points(x, y, x + width, y + meter_height, radius=9)
+            )
         
         # Update color based on activity level
-        if self.activity_level < 0.3:
+        if level < 0.3:
             color = self.colors.success  # Low activity
-        elif self.activity_level < 0.7:
+        elif level < 0.7:
             color = self.colors.primary  # Medium activity
         else:
             color = self.colors.secondary  # High activity
-            
         self.screen_canvas.itemconfig(self.activity_meter, fill=color)
         
-        # Schedule next update
-        self.root.after(50, self.animate_activity_meter)
-    
-    def simulate_activity_updates(self):
-        """Simulate random activity updates for demo purposes"""
-        if not self.server_running:
-            return
-            
-        # Randomly change active window
-        if random.random() > 0.7:
-            if self.windows_list:
-                new_active = random.choice(self.windows_list)
-                self.active_window_id = new_active["id"]
-                
-                # Update UI
-                self.update_apps_list()
-                
-                # Update view label
-                self.view_label_text = f"Current View: {new_active['title']}"
-                if hasattr(self, 'view_label'):
-                    self.screen_canvas.itemconfig(self.view_label, text=self.view_label_text)
-                
-                # Flash status briefly
-                self.update_status(f"Switched to {new_active['title']}", "green")
-                self.root.after(2000, lambda: self.update_status("Connected", "green"))
-        
-        # Schedule next update with variable timing
-        self.root.after(random.randint(3000, 7000), self.simulate_activity_updates)
+        self.animate("activity_meter", self.activity_level, level, 0.4, update_meter, "ease_out_quad")
     
     def update_apps_list(self):
-        """Update applications list with elegant modern UI"""
-        # Clear existing content
-        for widget in self.apps_container.winfo_children():
-            widget.destroy()
-        
-        # Create scrollable frame
-        apps_canvas = tk.Canvas(
-            self.apps_container,
+        """Show the current window list, redrawing only the rows that changed"""
+        if self.apps_list is None:
+            self.apps_list = VirtualList(
+                self.apps_container, row_height=90,
+                create_row=self.create_app_row, update_row=self.update_app_row,
+                bg=self.colors.surface
+            )
+        self.apps_list.set_items(self.windows_list)
+    
+    def set_active_window(self, window_id):
+        """Highlight another app, redrawing just the two rows involved"""
+        previous = self.active_window_id
+        self.active_window_id = window_id
+        if self.apps_list is not None:
+            self.apps_list.refresh(lambda window: window["id"] in (previous, window_id))
+    
+    def create_app_row(self, parent):
+        """Build an empty app card for the apps list, filled in by update_app_row"""
+        # App item container
+        app_frame = tk.Frame(
+            parent,
             bg=self.colors.surface,
-            highlightthickness=0
+            padx=7,
+            pady=5
         )
-        scrollbar = ttk.Scrollbar(
-            self.apps_container,
-            orient="vertical",
-            command=apps_canvas.yview,
-            style="Vertical.TScrollbar"
+        
+        # App card with shadow effect
+        app_card = tk.Canvas(
+            app_frame,
+            bg=self.colors.surface,
+            highlightthickness=0,
+            height=80
         )
-        scrollable_frame = tk.Frame(apps_canvas, bg=self.colors.surface)
+        app_card.pack(fill="x")
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: apps_canvas.configure(scrollregion=apps_canvas.bbox("all"))
+        parts = app_frame.parts = SimpleObject()
+        parts.card = app_card
+        parts.window = None
+        
+        # Card background with rounded corners, and the active indicator with glow
+        parts.bg = app_card.create_rounded_rectangle(
+            5, 5, 285, 75, radius=10,
+            fill=self.colors.surface_2, outline=""
+        )
+        parts.active_bg = app_card.create_rounded_rectangle(
+            5, 5, 285, 75, radius=10,
+            fill=self.colors.surface_3, outline=self.colors.primary, width=2,
+            state="hidden"
         )
         
-        apps_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        apps_canvas.configure(yscrollcommand=scrollbar.set)
+        # Category indicator and icon
+        parts.category = app_card.create_rounded_rectangle(
+            15, 15, 35, 65, radius=5,
+            fill=self.colors.category_other, outline=""
+        )
+        parts.icon = app_card.create_text(
+            25, 40, text="", font=("Segoe UI Emoji", 16), fill="white"
+        )
         
-        # Pack elements
-        scrollbar.pack(side="right", fill="y")
-        apps_canvas.pack(side="left", fill="both", expand=True)
+        # App title, and process name - monospace for technical feel
+        parts.title = app_card.create_text(
+            50, 30, text="", font=self.body, fill=self.colors.text_secondary, anchor="w"
+        )
+        parts.process = app_card.create_text(
+            50, 55, text="", font=self.mono_small, fill=self.colors.text_tertiary, anchor="w"
+        )
+        
+        # 'View' button, pointed at the row's current app by update_app_row
+        parts.view_button = ttk.Button(app_card, text="VIEW", style="OutlinePrimary.TButton")
+        parts.view_button_window = app_card.create_window(
+            210, 40, window=parts.view_button, width=70, height=30, anchor="e"
+        )
+        
+        # Add hover effect for card
+        def on_enter(e):
+            if parts.window and parts.window["id"] != self.active_window_id:
+                app_card.itemconfig(parts.bg, fill=self.colors.surface_3)
+                app_card.itemconfig(parts.title, fill=self.colors.text)
+        
+        def on_leave(e):
+            if parts.window and parts.window["id"] != self.active_window_id:
+                app_card.itemconfig(parts.bg, fill=self.colors.surface_2)
+                app_card.itemconfig(parts.title, fill=self.colors.text_secondary)
+        
+        app_card.bind("<Enter>", on_enter)
+        app_card.bind("<Leave>", on_leave)
+        
+        # Stretch the card and keep the button at the right edge when the list resizes
+        def on_resize(e):
+            width = max(e.width, 100)
+            for item in (parts.bg, parts.active_bg):
+                app_card.coords(item, *rounded_rectangle_points(5, 5, width - 5, 75, radius=10))
+            app_card.coords(parts.view_button_window, width - 15, 40)
+        
+        app_card.bind("<Configure>", on_resize)
+        return app_frame
+    
+    def update_app_row(self, app_frame, window):
+        """Show one window in a pooled app card"""
+        parts = app_frame.parts
+        app_card = parts.card
+        parts.window = window
         
-        # Add apps to the list
         category_colors = {
             "games": self.colors.category_games,
             "web": self.colors.category_web,
@@ -2178,166 +2690,118 @@ class FuturisticParentMonitorApp:
             "video": self.colors.category_video,
             "other": self.colors.category_other
         }
-        
-        for i, window in enumerate(self.windows_list):
-            # App item container
-            app_frame = tk.Frame(
-                scrollable_frame,
-                bg=self.colors.surface,
-                padx=5,
-                pady=3
-            )
-            app_frame.pack(fill="x", expand=True)
-            
-            # App card with shadow effect
-            app_card = tk.Canvas(
-                app_frame,
-                bg=self.colors.surface,
-                highlightthickness=0,
-                height=80
-            )
-            app_card.pack(fill="x", padx=2, pady=2)
-            
-            # Card background with rounded corners
-            app_card.create_rounded_rectangle(
-                5, 5,
-                app_card.winfo_reqwidth() - 5, 75,
-                radius=10,
-                fill=self.colors.surface_2,
-                outline="",
-                tags=f"app_bg_{i}"
-            )
-            
-            # Highlight active app
-            is_active = window["id"] == self.active_window_id
-            if is_active:
-                # Active indicator with glow
-                app_card.create_rounded_rectangle(
-                    5, 5,
-                    app_card.winfo_reqwidth() - 5, 75,
-                    radius=10,
-                    fill=self.colors.surface_3,
-                    outline=self.colors.primary,
-                    width=2,
-                    tags=f"app_active_bg_{i}"
-                )
-            
-            # Category indicator
-            category = window.get("category", "other")
-            category_color = category_colors.get(category, self.colors.category_other)
-            
-            app_card.create_rounded_rectangle(
-                15, 15,
-                35, 65,
-                radius=5,
-                fill=category_color,
-                outline="",
-                tags=f"app_category_{i}"
-            )
-            
-            # Category icon
-            app_card.create_text(
-                25, 40,
-                text=window.get("icon", "📱"),
-                font=("Segoe UI Emoji", 16),
-                fill="white",
-                tags=f"app_icon_{i}"
-            )
-            
-            # App title with elegant typography
-            app_card.create_text(
-                50, 30,
-                text=window["title"],
-                font=self.subtitle_small if is_active else self.body,
-                fill=self.colors.text if is_active else self.colors.text_secondary,
-                anchor="w",
-                tags=f"app_title_{i}"
-            )
-            
-            # Process name - monospace for technical feel
-            app_card.create_text(
-                50, 55,
-                text=window["process"],
-                font=self.mono_small,
-                fill=self.colors.text_tertiary,
-                anchor="w",
-                tags=f"app_process_{i}"
-            )
-            
-            # Add 'View' button for each app
-            view_button = ttk.Button(
-                app_card,
-                text="VIEW",
-                style="OutlinePrimary.TButton",
-                command=lambda app_id=window["id"]: self.select_app(app_id)
-            )
-            
-            view_button_window = app_card.create_window(
-                app_card.winfo_reqwidth() - 80, 40,
-                window=view_button,
-                width=70,
-                height=30,
-                anchor="e",
-                tags=f"app_view_btn_{i}"
-            )
-            
-            # Add hover effect for card
-            def on_enter(e, idx=i):
-                if self.windows_list[idx]["id"] != self.active_window_id:
-                    app_card.itemconfig(f"app_bg_{idx}", fill=self.colors.surface_3)
-                    app_card.itemconfig(f"app_title_{idx}", fill=self.colors.text)
-            
-            def on_leave(e, idx=i):
-                if self.windows_list[idx]["id"] != self.active_window_id:
-                    app_card.itemconfig(f"app_bg_{idx}", fill=self.colors.surface_2)
-                    app_card.itemconfig(f"app_title_{idx}", fill=self.colors.text_secondary)
-            
-            app_card.bind("<Enter>", on_enter)
-            app_card.bind("<Leave>", on_leave)
-            
-            # Update card width dynamically
-            app_card.update_idletasks()
-            w = app_frame.winfo_width() - 10 if app_frame.winfo_width() > 10 else 290
-            app_card.itemconfig(f"app_bg_{i}", width=w-10)
-            if is_active:
-                app_card.itemconfig(f"app_active_bg_{i}", width=w-10)
-            
-            # Fix view button position
-            app_card.coords(view_button_window, w-80, 40)
+        category = window.get("category", "other")
+        
+        # Highlight active app
+        is_active = window["id"] == self.active_window_id
+        app_card.itemconfig(parts.bg, fill=self.colors.surface_2)
+        app_card.itemconfig(parts.active_bg, state="normal" if is_active else "hidden")
+        app_card.itemconfig(parts.category, fill=category_colors.get(category, self.colors.category_other))
+        app_card.itemconfig(parts.icon, text=window.get("icon", "📱"))
+        app_card.itemconfig(
+            parts.title,
+            text=window["title"],
+            font=self.subtitle_small if is_active else self.body,
+            fill=self.colors.text if is_active else self.colors.text_secondary
+        )
+        app_card.itemconfig(parts.process, text=window["process"])
+        parts.view_button.configure(command=lambda app_id=window["id"]: self.select_app(app_id))
     
     def update_history_list(self):
-        """Update browser history list with elegant modern UI"""
-        # Clear existing content
-        for widget in self.history_container.winfo_children():
-            widget.destroy()
+        """Show the history store, or the search results, drawing only the rows in view"""
+        if self.history_list is None:
+            self.history_list = VirtualList(
+                self.history_listbox, row_height=80,
+                create_row=self.create_history_row, update_row=self.update_history_row,
+                bg=self.colors.surface
+            )
+        self.history_list.set_items(self.history_store if self.history_results is None else self.history_results)
+    
+    def schedule_history_search(self):
+        """Search once typing pauses, rather than on every keystroke"""
+        if self.history_search_job is not None:
+            self.root.after_cancel(self.history_search_job)
+        self.history_search_job = self.root.after(self.history_search_delay, self.search_history)
+    
+    def search_history(self):
+        """Filter the history tab by the search box and the category picked"""
+        self.history_search_job = None
+        self.history_query = self.history_search_var.get().strip()
+        
+        if not self.history_query and self.history_category is None:
+            self.history_results = None
+        elif self.activity_store is not None and self.active_session in self.sessions:
+            self.history_results = self.activity_store.search(
+                self.client_key(self.active_session), self.history_query, category=self.history_category)
+        else:
+            # Nothing is stored for the sample data; it is small enough to filter in place
+            words = self.history_query.lower().split()
+            self.history_results = [
+                row for row in self.history_store[:]
+                if (self.history_category is None or row.get("category") == self.history_category)
+                and all(word in row["title"].lower() or word in row["url"].lower() for word in words)
+            ]
+        self.update_history_list()
+    
+    def create_history_row(self, parent):
+        """Build an empty history card, filled in by update_history_row"""
+        # History item container
+        item_frame = tk.Frame(
+            parent,
+            bg=self.colors.surface,
+            padx=5,
+            pady=3
+        )
         
-        # Create scrollable frame
-        history_canvas = tk.Canvas(
-            self.history_container,
+        # History card
+        history_card = tk.Canvas(
+            item_frame,
             bg=self.colors.surface,
-            highlightthickness=0
+            highlightthickness=0,
+            height=70
         )
-        scrollbar = ttk.Scrollbar(
-            self.history_container,
-            orient="vertical",
-            command=history_canvas.yview,
-            style="Vertical.TScrollbar"
+        history_card.pack(fill="x", padx=2, pady=2)
+        
+        parts = item_frame.parts = SimpleObject()
+        parts.card = history_card
+        
+        # Card background with rounded corners
+        parts.bg = history_card.create_rounded_rectangle(
+            5, 5, 285, 65, radius=10,
+            fill=self.colors.surface_2, outline=""
+        )
+        
+        # Category indicator (colored dot)
+        parts.category = history_card.create_oval(
+            15, 35 - 6, 15 + 12, 35 + 6,
+            fill=self.colors.category_web, outline=""
         )
-        scrollable_frame = tk.Frame(history_canvas, bg=self.colors.surface)
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: history_canvas.configure(scrollregion=history_canvas.bbox("all"))
+        # Time, title with elegant typography, and URL - monospace for technical feel
+        parts.time = history_card.create_text(
+            40, 20, text="", font=self.mono_small, fill=self.colors.text_tertiary, anchor="w"
+        )
+        parts.title = history_card.create_text(
+            40, 40, text="", font=self.body, fill=self.colors.text, anchor="w"
+        )
+        parts.url = history_card.create_text(
+            40, 55, text="", font=self.mono_small, fill=self.colors.info, anchor="w"
         )
         
-        history_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        history_canvas.configure(yscrollcommand=scrollbar.set)
+        # Add hover effect for card
+        history_card.bind("<Enter>", lambda e: history_card.itemconfig(parts.bg, fill=self.colors.surface_3))
+        history_card.bind("<Leave>", lambda e: history_card.itemconfig(parts.bg, fill=self.colors.surface_2))
         
-        # Pack elements
-        scrollbar.pack(side="right", fill="y")
-        history_canvas.pack(side="left", fill="both", expand=True)
+        # Stretch the card with the list
+        history_card.bind("<Configure>", lambda e: history_card.coords(
+            parts.bg, *rounded_rectangle_points(5, 5, max(e.width, 100) - 5, 65, radius=10)))
+        return item_frame
+    
+    def update_history_row(self, item_frame, item):
+        """Show one visit in a pooled history card"""
+        parts = item_frame.parts
+        history_card = parts.card
         
-        # Add history items
         category_colors = {
             "games": self.colors.category_games,
             "web": self.colors.category_web,
@@ -2348,92 +2812,12 @@ class FuturisticParentMonitorApp:
             "video": self.colors.category_video,
             "other": self.colors.category_other
         }
+        category = item.get("category", "web")
         
-        for i, item in enumerate(self.browser_history):
-            # History item container
-            item_frame = tk.Frame(
-                scrollable_frame,
-                bg=self.colors.surface,
-                padx=5,
-                pady=3
-            )
-            item_frame.pack(fill="x", expand=True)
-            
-            # History card
-            history_card = tk.Canvas(
-                item_frame,
-                bg=self.colors.surface,
-                highlightthickness=0,
-                height=70
-            )
-            history_card.pack(fill="x", padx=2, pady=2)
-            
-            # Card background with rounded corners
-            history_card.create_rounded_rectangle(
-                5, 5,
-                history_card.winfo_reqwidth() - 5, 65,
-                radius=10,
-                fill=self.colors.surface_2,
-                outline="",
-                tags=f"history_bg_{i}"
-            )
-            
-            # Category indicator (colored dot)
-            category = item.get("category", "web")
-            category_color = category_colors.get(category, self.colors.category_web)
-            
-            history_card.create_oval(
-                15, 35 - 6,
-                15 + 12, 35 + 6,
-                fill=category_color,
-                outline="",
-                tags=f"history_category_{i}"
-            )
-            
-            # Time label
-            history_card.create_text(
-                40, 20,
-                text=item["time"],
-                font=self.mono_small,
-                fill=self.colors.text_tertiary,
-                anchor="w",
-                tags=f"history_time_{i}"
-            )
-            
-            # Title with elegant typography
-            history_card.create_text(
-                40, 40,
-                text=item["title"],
-                font=self.body,
-                fill=self.colors.text,
-                anchor="w",
-                tags=f"history_title_{i}"
-            )
-            
-            # URL - monospace for technical feel
-            history_card.create_text(
-                40, 55,
-                text=item["url"],
-                font=self.mono_small,
-                fill=self.colors.info,
-                anchor="w",
-                tags=f"history_url_{i}"
-            )
-            
-            # Add hover effect for card
-            def on_enter(e, idx=i):
-                history_card.itemconfig(f"history_bg_{idx}", fill=self.colors.surface_3)
-            
-            def on_leave(e, idx=i):
-                history_card.itemconfig(f"history_bg_{idx}", fill=self.colors.surface_2)
-            
-            history_card.bind("<Enter>", on_enter)
-            history_card.bind("<Leave>", on_leave)
-            
-            # Update card width dynamically
-            history_card.update_idletasks()
-            w = item_frame.winfo_width() - 10 if item_frame.winfo_width() > 10 else 290
-            history_card.itemconfig(f"history_bg_{i}", width=w-10)
+        history_card.itemconfig(parts.category, fill=category_colors.get(category, self.colors.category_web))
+        history_card.itemconfig(parts.time, text=format_visit_time(item["timestamp"]))
+        history_card.itemconfig(parts.title, text=item["title"])
+        history_card.itemconfig(parts.url, text=item["url"])
     
     def create_sample_screen(self):
         """Create sample screen capture with elegant animation"""
@@ -2550,20 +2934,7 @@ class FuturisticParentMonitorApp:
             )
             
             # Display the screen
-            self.screen_photo = ImageTk.PhotoImage(screen)
-            
-            if not hasattr(self, 'screen_image'):
-                # Position the image exactly at the screen_area coordinates
-                self.screen_image = self.screen_canvas.create_image(
-                    x1, y1,
-                    image=self.screen_photo,
-                    anchor="nw",
-                    tags="screen_image"
-                )
-            else:
-                self.screen_canvas.itemconfig(self.screen_image, image=self.screen_photo)
-                # Ensure correct positioning
-                self.screen_canvas.coords(self.screen_image, x1, y1)
+            self.display_screen_image(screen)
                 
             # Update view label
             active_app = next((app for app in self.windows_list if app["id"] == self.active_window_id), None)
@@ -2571,13 +2942,433 @@ class FuturisticParentMonitorApp:
                 self.view_label_text = f"Current View: {active_app['title']}"
                 self.screen_canvas.itemconfig(self.view_label, text=self.view_label_text)
     
+    def display_screen_image(self, screen):
+        """Show an image in the screen area of the live view"""
+        if not hasattr(self, 'screen_area'):
+            return
+        
+        x1, y1, x2, y2 = self.screen_area
+        
+        # Scale incoming frames to fit the screen area
+        if screen.size != (x2 - x1, y2 - y1):
+            screen = screen.resize((x2 - x1, y2 - y1), Image.BILINEAR)
+        
+        # Paste into the existing photo; a new PhotoImage per frame is slow
+        if self.screen_photo is not None and (self.screen_photo.width(), self.screen_photo.height()) == screen.size:
+            self.screen_photo.paste(screen)
+        else:
+            self.screen_photo = ImageTk.PhotoImage(screen)
+        
+        if not hasattr(self, 'screen_image'):
+            # Position the image exactly at the screen_area coordinates
+            self.screen_image = self.screen_canvas.create_image(
+                x1, y1,
+                image=self.screen_photo,
+                anchor="nw",
+                tags="screen_image"
+            )
+        else:
+            self.screen_canvas.itemconfig(self.screen_image, image=self.screen_photo)
+            # Ensure correct positioning
+            self.screen_canvas.coords(self.screen_image, x1, y1)
+    
+    def handle_frame_tiles(self, message):
+        """Hand a streamed frame update to the decoder"""
+        if hasattr(self, 'screen_area'):
+            x1, y1, x2, y2 = self.screen_area
+            self.frame_decoder.target_size = (x2 - x1, y2 - y1)
+        self.frame_decoder.submit(message)
+        
+        # Nothing is shown while paused, so acknowledge on arrival instead
+        if self.screen_paused:
+            self.send_command({"command": "stream_ack", "seq": message["seq"]})
+    
+    def show_decoded_frame(self):
+        """Paste the newest decoded frame into the live view"""
+        # Keep composing while paused so resuming shows an up to date screen
+        if self.screen_paused:
+            return
+        
+        ready = self.frame_decoder.take()
+        if ready is None:
+            return
+        
+        buffer, seq = ready
+        if self.playback is not None:
+            # Playback has the screen; keep the newest live frame for when it ends
+            if self.held_live_frame is not None:
+                self.frame_decoder.recycle(self.held_live_frame)
+            self.held_live_frame = buffer
+        else:
+            try:
+                self.display_screen_image(Image.fromarray(buffer))
+            finally:
+                self.frame_decoder.recycle(buffer)
+        
+        # Acknowledge so the client's bitrate controller can measure latency
+        self.send_command({"command": "stream_ack", "seq": seq})
+    
+    def open_playback(self):
+        """Pick a recorded session and play it back in the screen panel"""
+        directory = filedialog.askdirectory(
+            title="Open recording",
+            initialdir=self.recordings_dir if os.path.isdir(self.recordings_dir) else None,
+            mustexist=True)
+        if not directory:
+            return
+        
+        try:
+            recording = Recording(directory)
+        except Exception as e:
+            messagebox.showerror("Playback", f"Could not open recording: {e}")
+            return
+        if not len(recording):
+            recording.close()
+            messagebox.showinfo("Playback", "There are no recorded frames in this folder.")
+            return
+        
+        self.close_playback()
+        self.playback = recording
+        self.playback_playing = True
+        self.playback_fast = False
+        if self.playback_decoder is None:
+            self.playback_decoder = FrameDecoder()
+        
+        self.draw_playback_bar()
+        self.screen_canvas.focus_set()
+        self.seek_playback(recording.start)
+        self.playback_job = self.root.after(self.playback_interval, self.playback_tick)
+        self.update_status("Playing back recording", "green")
+    
+    def close_playback(self):
+        """Leave playback and go back to the live view"""
+        if self.playback is None:
+            return
+        
+        if self.playback_job is not None:
+            self.root.after_cancel(self.playback_job)
+            self.playback_job = None
+        self.playback.close()
+        self.playback = None
+        self.playback_decoder.reset()
+        self.screen_canvas.delete("playback_bar")
+        
+        if self.held_live_frame is not None:
+            try:
+                self.display_screen_image(Image.fromarray(self.held_live_frame))
+            finally:
+                self.frame_decoder.recycle(self.held_live_frame)
+                self.held_live_frame = None
+        self.update_status("Live view", "green")
+    
+    def submit_playback(self, message, reset=False):
+        """Hand a recorded update to the playback decoder"""
+        if hasattr(self, 'screen_area'):
+            x1, y1, x2, y2 = self.screen_area
+            self.playback_decoder.target_size = (x2 - x1, y2 - y1)
+        if reset:
+            self.playback_decoder.reset()
+        self.playback_decoder.submit(message)
+    
+    def seek_playback(self, timestamp):
+        """Jump to a moment, decoding forward from the keyframe before it"""
+        recording = self.playback
+        self.playback_time = max(recording.start, min(int(timestamp), recording.end))
+        self.submit_playback(recording.frame_at(self.playback_time), reset=True)
+        self.update_playback_bar()
+    
+    def advance_playback(self, timestamp):
+        """Play forward to a later moment, applying the updates in between"""
+        updates = self.playback.updates_between(self.playback_time, timestamp, limit=self.playback_step_limit)
+        if updates is None:
+            # Too far to step through; a seek only decodes from the nearest keyframe
+            self.seek_playback(timestamp)
+            return
+        
+        self.playback_time = timestamp
+        for update in updates:
+            self.submit_playback(update)
+        self.update_playback_bar()
+    
+    def playback_tick(self):
+        """Show the newest decoded playback frame and move the playhead"""
+        self.playback_job = None
+        if self.playback is None:
+            return
+        
+        ready = self.playback_decoder.take()
+        if ready is not None:
+            buffer, _ = ready
+            try:
+                self.display_screen_image(Image.fromarray(buffer))
+            finally:
+                self.playback_decoder.recycle(buffer)
+        
+        if self.playback_playing:
+            speed = self.playback_fast_speed if self.playback_fast else 1
+            target = self.playback_time + self.playback_interval * 1000 * speed
+            if self.playback_fast:
+                # Jump straight over stretches where the screen hardly changed
+                upcoming = self.playback.next_change(self.playback_time, self.fast_forward_threshold)
+                target = max(target, upcoming if upcoming is not None else self.playback.end)
+            
+            self.advance_playback(min(target, self.playback.end))
+            if self.playback_time >= self.playback.end:
+                self.playback_playing = False
+                self.update_playback_bar()
+        
+        self.playback_job = self.root.after(self.playback_interval, self.playback_tick)
+    
+    def draw_playback_bar(self):
+        """Timeline with a playhead in the screen panel's status bar"""
+        self.screen_canvas.delete("playback_bar")
+        y = self.screen_height - 20
+        x1, x2 = 300, self.screen_width - 260
+        self.playback_track = (x1, x2)
+        
+        self.screen_canvas.create_rectangle(
+            x1, y - 2, x2, y + 2,
+            fill=self.colors.surface_3, outline="",
+            tags=("playback_bar", "playback_track"))
+        self.playback_progress = self.screen_canvas.create_rectangle(
+            x1, y - 2, x1, y + 2,
+            fill=self.colors.primary, outline="",
+            tags=("playback_bar", "playback_track"))
+        self.playback_knob = self.screen_canvas.create_oval(
+            x1 - 6, y - 6, x1 + 6, y + 6,
+            fill=self.colors.text, outline="",
+            tags=("playback_bar", "playback_track"))
+        self.playback_label = self.screen_canvas.create_text(
+            self.screen_width - 30, y,
+            text="", font=self.caption, fill=self.secondary_text, anchor="e",
+            tags="playback_bar")
+        
+        # Click or drag along the timeline to scrub
+        def on_scrub(e):
+            if self.playback is not None:
+                fraction = min(max((e.x - x1) / (x2 - x1), 0.0), 1.0)
+                self.seek_playback(self.playback.start + fraction * (self.playback.end - self.playback.start))
+        
+        self.screen_canvas.tag_bind("playback_track", "<Button-1>", on_scrub)
+        self.screen_canvas.tag_bind("playback_track", "<B1-Motion>", on_scrub)
+        
+        # Space plays/pauses, arrows skip 10 seconds, F fast-forwards, Escape returns to live
+        def on_key(action):
+            def handler(e):
+                if self.playback is not None:
+                    action()
+                    self.update_playback_bar()
+            return handler
+        
+        def toggle_playing():
+            self.playback_playing = not self.playback_playing
+        
+        def toggle_fast():
+            self.playback_fast = not self.playback_fast
+            self.playback_playing = True
+        
+        self.screen_canvas.bind("<space>", on_key(toggle_playing))
+        self.screen_canvas.bind("<Right>", on_key(lambda: self.seek_playback(self.playback_time + 10_000_000)))
+        self.screen_canvas.bind("<Left>", on_key(lambda: self.seek_playback(self.playback_time - 10_000_000)))
+        self.screen_canvas.bind("<f>", on_key(toggle_fast))
+        self.screen_canvas.bind("<Escape>", lambda e: self.close_playback())
+    
+    def update_playback_bar(self):
+        """Move the playhead and update the time shown next to it"""
+        if self.playback is None or not self.screen_canvas.find_withtag("playback_bar"):
+            return
+        
+        recording = self.playback
+        x1, x2 = self.playback_track
+        span = max(recording.end - recording.start, 1)
+        x = x1 + (x2 - x1) * (self.playback_time - recording.start) / span
+        y = self.screen_height - 20
+        self.screen_canvas.coords(self.playback_progress, x1, y - 2, x, y + 2)
+        self.screen_canvas.coords(self.playback_knob, x - 6, y - 6, x + 6, y + 6)
+        
+        state = "FAST" if self.playback_fast and self.playback_playing else "PLAY" if self.playback_playing else "PAUSED"
+        current = datetime.fromtimestamp(self.playback_time / 1_000_000).strftime("%H:%M:%S")
+        end = datetime.fromtimestamp(recording.end / 1_000_000).strftime("%H:%M:%S")
+        self.screen_canvas.itemconfig(self.playback_label, text=f"{state}  {current} / {end}")
+    
+    def send_command(self, command, session_id=None):
+        """Send a command to a client, by default the one being viewed"""
+        session_id = session_id or self.active_session
+        if self.server and session_id is not None:
+            self.server.send(session_id, command)
+    
+    def client_key(self, session_id):
+        """Name a client's visits are stored under: the host name it reported, else its IP address
+        
+        Machines behind one NAT share an address and a machine can get a new
+        one, so the address is only used until the client has said who it is.
+        """
+        return self.client_names.get(session_id) or self.sessions[session_id][0]
+    
+    def activate_session(self, session_id):
+        """Show a client in the live view and ask it for its current state"""
+        self.active_session = session_id
+        self.windows_seq = None
+        self.frame_decoder.reset()
+        
+        if session_id is not None:
+            # Drop the previous client's visits, and the sample ones, which no full sync would replace
+            self.history_store.replace([])
+            if self.history_results is not None:
+                self.search_history()
+            else:
+                self.update_history_list()
+            
+            # A new view starts from the client's full state, later polls are incremental
+            self.send_command({"command": "get_windows", "full": True})
+            self.send_command({"command": "get_history", "full": True})
+            # Clients stream from connecting on, so this mostly asks for a keyframe to start from
+            self.send_command({"command": "start_stream"})
+    
+    def poll_history(self):
+        """Ask the viewed client for browser history it has not sent yet"""
+        if not self.server_running:
+            return
+        
+        self.send_command({"command": "get_history", "full": False})
+        self.schedule_server_job("poll_history", self.history_poll_interval, self.poll_history)
+    
+    def poll_windows(self):
+        """Ask the viewed client for changes to its window list"""
+        if not self.server_running:
+            return
+        
+        if self.windows_seq is not None:
+            self.send_command({"command": "get_windows", "full": False})
+        self.schedule_server_job("poll_windows", self.windows_poll_interval, self.poll_windows)
+    
+    def apply_windows_delta(self, message):
+        """Patch the window list with a windows_delta, returning False if it does not apply"""
+        if message["base"] != self.windows_seq:
+            return False
+        
+        windows = {window["id"]: window for window in self.windows_list}
+        for item in message["removed"]:
+            windows.pop(item["id"], None)
+        for item in message["changed"]:
+            if item["id"] in windows:
+                windows[item["id"]] = {**windows[item["id"]], "title": item["title"]}
+        for window in message["added"]:
+            windows[window["id"]] = window
+        
+        self.windows_list = sorted(windows.values(), key=lambda window: window["title"].lower())
+        self.windows_seq = message["seq"]
+        return True
+    
+    def drain_updates(self):
+        """Handle queued client messages on the Tk thread"""
+        if not self.server_running:
+            return
+        
+        drained = self.updates.drain()
+        for session_id, message in drained:
+            if session_id == self.active_session:
+                self.activity_messages += 1
+            try:
+                self.handle_client_message(session_id, message)
+            except Exception as e:
+                print(f"Error handling {message.get('type')} from client {session_id}: {e}")
+        
+        self.show_decoded_frame()
+        
+        # Poll at full rate while updates flow, and slowly once nothing has arrived for a while
+        now = time.time()
+        if drained:
+            self.last_update_time = now
+        idle = now - self.last_update_time > self.idle_after
+        self.schedule_server_job("drain_updates", self.idle_update_interval if idle else self.update_interval,
+                                 self.drain_updates)
+    
+    def handle_client_message(self, session_id, message):
+        """Update the UI for one message from a client"""
+        message_type = message.get("type")
+        
+        if message_type == SESSION_CONNECTED:
+            self.sessions[session_id] = message["address"]
+            if self.active_session is None:
+                self.activate_session(session_id)
+            self.update_status(f"{len(self.sessions)} client(s) connected", "green")
+            return
+        
+        if message_type == SESSION_CLOSED:
+            self.sessions.pop(session_id, None)
+            self.client_names.pop(session_id, None)
+            if session_id == self.active_session:
+                self.activate_session(next(iter(self.sessions), None))
+            if self.sessions:
+                self.update_status(f"{len(self.sessions)} client(s) connected", "green")
+            else:
+                self.update_status("Client disconnected", "orange")
+            return
+        
+        if message_type == "client_info":
+            self.client_names[session_id] = message["hostname"]
+            return
+        
+        # Only the client in the live view drives the panels. Frames from the
+        # others are acknowledged on arrival, or their bitrate controllers
+        # would take the missing acks for congestion and drop to the lowest quality
+        if session_id != self.active_session:
+            if message_type == "frame_tiles":
+                self.send_command({"command": "stream_ack", "seq": message["seq"]}, session_id)
+            return
+        
+        if message_type == "frame_tiles":
+            self.handle_frame_tiles(message)
+        
+        elif message_type == "screenshot":
+            if not self.screen_paused and self.playback is None:
+                self.display_screen_image(Image.open(io.BytesIO(message["data"])).convert('RGB'))
+        
+        elif message_type == "windows_list":
+            self.windows_list = message["data"]
+            self.windows_seq = message["seq"]
+            self.update_apps_list()
+        
+        elif message_type == "windows_delta":
+            if self.apply_windows_delta(message):
+                self.update_apps_list()
+            elif self.windows_seq is not None and message["seq"] > self.windows_seq:
+                # Missed an update; start over from a full list
+                self.windows_seq = None
+                self.send_command({"command": "get_windows", "full": True})
+        
+        elif message_type == "browser_history":
+            for item in message["data"]:
+                item["category"] = categorize(visit_domain(item["url"]))
+            
+            # Everything reported is kept on disk, in one transaction per chunk
+            if self.activity_store is not None and message["data"]:
+                try:
+                    self.activity_store.add_visits(self.client_key(session_id), message["data"])
+                except sqlite3.Error as e:
+                    print(f"Could not store browser history: {e}")
+            
+            # Each browser's history arrives separately; a full chunk replaces that browser's rows
+            if self.history_store.apply(message):
+                if self.history_results is not None:
+                    self.search_history()
+                else:
+                    self.update_history_list()
+        
+        elif message_type == "view_status":
+            self.update_status(f"Viewing {message['title']}", "green" if message["status"] == "success" else "red")
+        
+        elif message_type == "freeze_status":
+            self.update_status(message["message"], "green" if message["status"] == "success" else "red")
+    
     def select_app(self, app_id):
         """Select an app to view with elegant transition"""
         # Update active window
-        self.active_window_id = app_id
+        self.send_command({"command": "view_window", "window_id": app_id})
         
         # Update apps list
-        self.update_apps_list()
+        self.set_active_window(app_id)
         
         # Update view with animation
         # Add a brief flash effect
@@ -2602,7 +3393,9 @@ class FuturisticParentMonitorApp:
             # After flash animation, create new sample screen and ensure correct positioning
             def after_flash():
                 self.screen_canvas.delete("screen_flash")
-                self.create_sample_screen()
+                # The live view keeps streaming; only the demo needs a new screen
+                if self.active_session is None:
+                    self.create_sample_screen()
                 # Ensure screen is positioned correctly
                 if hasattr(self, 'screen_image') and hasattr(self, 'screen_area'):
                     self.screen_canvas.coords(self.screen_image, self.screen_area[0], self.screen_area[1])
@@ -3099,6 +3892,69 @@ class FuturisticParentMonitorApp:
         # Store button reference
         self.export_button = self.control_canvas
         
+        # Export progress, shown under the button while an export runs
+        self.export_progress_span = (export_button_x + 20, export_button_x + button_width - 20)
+        self.export_progress_bar = self.control_canvas.create_rectangle(
+            export_button_x + 20, button_y + button_height//2 + 6,
+            export_button_x + 20, button_y + button_height//2 + 9,
+            fill=self.colors.warning,
+            outline="",
+            state="hidden",
+            tags="export_progress"
+        )
+        
+        # Playback button
+        playback_button_x = export_button_x + button_width + button_spacing
+        
+        # Button shadow
+        self.control_canvas.create_rounded_rectangle(
+            playback_button_x + 3, button_y - button_height//2 + 3,
+            playback_button_x + button_width + 3, button_y + button_height//2 + 3,
+            radius=button_height//2,
+            fill=self._ensure_color_compatible(self.colors.shadow_medium),
+            outline="",
+            tags="playback_button_shadow"
+        )
+        
+        # Button background
+        self.playback_button_bg = self.control_canvas.create_rounded_rectangle(
+            playback_button_x, button_y - button_height//2,
+            playback_button_x + button_width, button_y + button_height//2,
+            radius=button_height//2, 
+            fill=self.colors.primary,
+            outline="",
+            tags="playback_button_bg"
+        )
+        
+        # Button text
+        self.playback_button_text = self.control_canvas.create_text(
+            playback_button_x + button_width//2, button_y,
+            text="PLAYBACK",
+            font=self.button,
+            fill="white",
+            tags="playback_button_text"
+        )
+        
+        # Create button interactivity
+        self.control_canvas.create_rectangle(
+            playback_button_x, button_y - button_height//2,
+            playback_button_x + button_width, button_y + button_height//2,
+            fill="",
+            outline="",
+            tags="playback_button_area"
+        )
+        
+        # Add hover and click effects
+        def on_playback_enter(e):
+            self.control_canvas.itemconfig(self.playback_button_bg, fill=self.colors.primary_hover)
+        
+        def on_playback_leave(e):
+            self.control_canvas.itemconfig(self.playback_button_bg, fill=self.colors.primary)
+        
+        self.control_canvas.tag_bind("playback_button_area", "<Enter>", on_playback_enter)
+        self.control_canvas.tag_bind("playback_button_area", "<Leave>", on_playback_leave)
+        self.control_canvas.tag_bind("playback_button_area", "<Button-1>", lambda e: self.open_playback())
+        
         # Initialize button states
         self.start_button.itemconfig = lambda **kwargs: self.control_canvas.itemconfig(
             self.start_button_bg, state=kwargs.get('state', 'normal'))
@@ -3130,9 +3986,69 @@ class FuturisticParentMonitorApp:
         )
     
     def export_data(self):
-        """Export monitoring data to file"""
-        # This would typically save data to a file, for demo we'll just show a message
-        messagebox.showinfo("Export Data", "Activity data would be exported to a file.\nThis is a placeholder for the actual export functionality.")
+        """Export browser history, the window list and recorded sessions to files"""
+        if self.exporter is not None and not self.exporter.done:
+            messagebox.showinfo("Export Data", "An export is already running.")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            title="Export data",
+            initialfile="oversight_export",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet")])
+        if not path:
+            return
+        base, extension = os.path.splitext(path)
+        if extension not in EXPORT_FORMATS:
+            base, extension = path, ".csv"
+        
+        # Snapshot what the Tk thread keeps changing; the rows themselves are never modified
+        windows = list(self.windows_list)
+        address = self.sessions.get(self.active_session)
+        session = f"{address[0]}:{address[1]}" if address else ""
+        
+        # All history of every client is in the activity store, read with a cursor on the export thread
+        if self.activity_store is not None:
+            history = visit_chunks(self.activity_store.visits())
+            history_rows = self.activity_store.count()
+        else:
+            rows = list(self.history_store.rows)
+            history = visit_rows(rows, client=self.client_key(self.active_session) if address else "")
+            history_rows = len(rows)
+        
+        try:
+            self.exporter = DataExporter(base, extension, [
+                ("history", HISTORY_COLUMNS, history, history_rows),
+                ("windows", WINDOW_COLUMNS, window_rows(windows, session), len(windows)),
+                ("sessions", SESSION_COLUMNS, session_rows(self.recordings_dir), count_sessions(self.recordings_dir))
+            ])
+        except ValueError as e:
+            messagebox.showerror("Export Data", str(e))
+            return
+        self.exporter.start()
+        self.control_canvas.itemconfig(self.export_progress_bar, state="normal")
+        self.root.after(self.export_poll_interval, self.poll_export)
+    
+    def poll_export(self):
+        """Show how far the running export has got on the control panel"""
+        exporter = self.exporter
+        written, total, current, done = exporter.progress()
+        x1, x2 = self.export_progress_span
+        fraction = min(written / total, 1.0) if total else 0.0
+        _, y1, _, y2 = self.control_canvas.coords(self.export_progress_bar)
+        self.control_canvas.coords(self.export_progress_bar, x1, y1, x1 + (x2 - x1) * fraction, y2)
+        
+        if not done:
+            self.update_status(f"Exporting {current}: {written} rows", "orange")
+            self.root.after(self.export_poll_interval, self.poll_export)
+            return
+        
+        self.control_canvas.itemconfig(self.export_progress_bar, state="hidden")
+        if exporter.error is not None:
+            self.update_status("Export failed", "red")
+            messagebox.showerror("Export Data", f"Export failed: {exporter.error}")
+        else:
+            self.update_status(f"Exported {written} rows to {len(exporter.files)} files", "green")
         
     def start_status_pulse_animation(self):
         """Animate the status indicator pulse effect"""
@@ -0,0 +1,1160 @@
+import sys
+import time
+import pickle
+
+from nikimonitorscreenPROTOCOL import encode_message, decode_message
+from nikimonitorscreenCAPTURE import synthetic_desktop
+
+# Micro-benchmarks for the OVERSIGHT hot paths
+#
+# Run everything with `python nikimonitorscreenBENCH.py`, or name the
+# benchmarks to run, e.g. `python nikimonitorscreenBENCH.py codec`.
+# Everything here runs headless so it can be used on any machine.
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under a short name"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def best_of(func, repeat=5, number=100):
+    """Return the best average time per call of func in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def report(label, seconds, extra=""):
+    """Print one benchmark result line"""
+    print(f"  {label:<44} {seconds * 1e6:>10.1f} us  {extra}")
+
+
+@benchmark("codec")
+def bench_codec():
+    """Schema codec against the old pickle payloads"""
+    jpeg = bytes(range(256)) * 600  # ~150 KB, about the size of a streamed frame
+    windows = [
+        {"id": i, "hwnd": 0x10000 + i, "title": f"Window title number {i}", "process": "chrome.exe"}
+        for i in range(60)
+    ]
+    history = [
+        {"url": f"https://www.example.com/page/{i}", "title": f"Example page {i}",
+         "timestamp": 1_704_119_525_000_000 - i * 5_000_000, "browser": "Google Chrome"}
+        for i in range(200)
+    ]
+    messages = {
+        "screenshot": {"type": "screenshot", "data": jpeg},
+        "windows_list": {"type": "windows_list", "data": windows},
+        "browser_history": {"type": "browser_history", "data": history},
+        "view_window": {"command": "view_window", "window_id": 3},
+    }
+    
+    for name, message in messages.items():
+        pickled = pickle.dumps(message)
+        msg_type, parts = encode_message(message)
+        encoded = b"".join(parts)
+        
+        # The old path always materialised the whole pickle, payload included
+        report(f"{name} pickle.dumps", best_of(lambda: pickle.dumps(message)), f"{len(pickled)} bytes")
+        report(f"{name} encode_message", best_of(lambda: encode_message(message)), f"{len(encoded)} bytes")
+        report(f"{name} pickle.loads", best_of(lambda: pickle.loads(pickled)))
+        report(f"{name} decode_message", best_of(lambda: decode_message(msg_type, encoded)))
+
+
+@benchmark("tiles")
+def bench_tiles():
+    """Dirty-tile delta encoding against full-frame JPEGs"""
+    import numpy as np
+    import cv2
+    from nikimonitorscreenSTREAM import TileDeltaEncoder
+    
+    base = synthetic_desktop()
+    frames = []
+    for i in range(60):
+        frame = base.copy()
+        # Blinking cursor and a ticking clock in the corner
+        if i % 2:
+            frame[300:318, 400:402] = 0
+        cv2.putText(frame, f"12:00:{i:02d}", (1180, 740), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        frames.append(frame)
+    
+    full_bytes = sum(len(cv2.imencode(".jpg", f, [cv2.IMWRITE_JPEG_QUALITY, 50])[1]) for f in frames)
+    encoder = TileDeltaEncoder(quality=50)
+    tile_bytes = 0
+    for frame in frames:
+        message = encoder.encode(frame)
+        if message:
+            tile_bytes += sum(len(tile["data"]) for tile in message["tiles"])
+    
+    print(f"  full JPEG every frame: {full_bytes / len(frames) / 1024:8.1f} KB/frame")
+    print(f"  dirty tiles:           {tile_bytes / len(frames) / 1024:8.1f} KB/frame")
+    
+    encoder = TileDeltaEncoder(quality=50)
+    encoder.encode(frames[0])
+    state = {"i": 1}
+    
+    def encode_next():
+        encoder.encode(frames[state["i"] % len(frames)])
+        state["i"] += 1
+    
+    report("TileDeltaEncoder.encode (cursor + clock)", best_of(encode_next, number=30))
+    report("cv2.imencode full frame", best_of(lambda: cv2.imencode(".jpg", base, [cv2.IMWRITE_JPEG_QUALITY, 50]), number=30))
+
+
+@benchmark("copies")
+def bench_copies():
+    """Per-frame copies of the stream capture path, old against pooled buffers"""
+    import io
+    import numpy as np
+    import cv2
+    from PIL import Image
+    from nikimonitorscreenSTREAM import FrameScaler
+    
+    scale = 0.7
+    screenshot = Image.fromarray(synthetic_desktop(1920, 1080)[:, :, ::-1].copy())
+    
+    def old_path():
+        # numpy copy, BGR copy, resize, RGB copy back and a PIL copy before the JPEG
+        frame = np.array(screenshot)
+        copied = frame.nbytes
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        copied += frame.nbytes
+        frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        copied += frame.nbytes
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        copied += frame_rgb.nbytes
+        pil_img = Image.fromarray(frame_rgb)
+        copied += frame_rgb.nbytes
+        pil_img.save(io.BytesIO(), format="JPEG", quality=50)
+        return copied
+    
+    scaler = FrameScaler()
+    
+    def new_path():
+        # numpy view of the capture, then resize and swap into a reused buffer
+        source = np.asarray(screenshot)
+        frame = scaler.scale(source, scale, order="RGB")
+        cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
+        scaler.release(frame)
+        return source.nbytes + frame.nbytes
+    
+    # mss hands out raw BGRA that is viewed in place, no PIL image at all
+    raw_bgra = cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2BGRA)
+    
+    def bgra_path():
+        frame = scaler.scale(raw_bgra, scale, order="BGRA")
+        cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
+        scaler.release(frame)
+        return frame.nbytes * 4 // 3 + frame.nbytes
+    
+    for label, path in (("old: cvtColor, resize, cvtColor, PIL", old_path),
+                        ("new: resize into pooled BGR buffer", new_path),
+                        ("new: BGRA grab, resize, drop alpha", bgra_path)):
+        copied = path()
+        report(label, best_of(path, number=20), f"{copied / 1e6:5.1f} MB copied/frame")
+    print(f"  buffers allocated by the pool: {scaler.allocated}")
+
+
+@benchmark("change")
+def bench_change():
+    """Block-mean change detector against full-frame absdiff + np.sum"""
+    import numpy as np
+    import cv2
+    from nikimonitorscreenSTREAM import ChangeDetector
+    
+    base = synthetic_desktop()
+    sequences = {"idle": [], "cursor + clock": [], "scrolling window": []}
+    for i in range(30):
+        sequences["idle"].append(base.copy())
+        frame = base.copy()
+        if i % 2:
+            frame[300:318, 400:402] = 0
+        cv2.putText(frame, f"12:00:{i:02d}", (1180, 740), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        sequences["cursor + clock"].append(frame)
+        frame = base.copy()
+        frame[90:600, 100:900] = np.roll(base[90:600, 100:900], -11 * i, axis=0)
+        sequences["scrolling window"].append(frame)
+    
+    def old_detect(frame, previous):
+        # What stream_screen used to do every tick: two frame-sized temporaries
+        diff = cv2.absdiff(frame, previous)
+        return np.sum(diff > 30) / diff.size
+    
+    for name, frames in sequences.items():
+        detector = ChangeDetector()
+        detector.detect(frames[0])
+        results = [detector.detect(frame) for frame in frames[1:]]
+        changed = sum(1 for ratio, region in results if region)
+        area = max((region[2] * region[3] for ratio, region in results if region), default=0)
+        state = {"i": 0}
+        
+        def old_next():
+            state["i"] += 1
+            old_detect(frames[state["i"] % len(frames)], frames[(state["i"] - 1) % len(frames)])
+        
+        def new_next():
+            state["i"] += 1
+            detector.detect(frames[state["i"] % len(frames)])
+        
+        print(f"  {name}: {changed}/{len(results)} frames changed, "
+              f"largest region {area / (base.shape[0] * base.shape[1]):.1%} of the screen")
+        report("absdiff + threshold + np.sum", best_of(old_next, number=30))
+        report("ChangeDetector.detect", best_of(new_next, number=30))
+
+
+@benchmark("pipeline")
+def bench_pipeline():
+    """Pipelined capture/encode/send against the old serial loop, slow socket"""
+    import numpy as np
+    import cv2
+    from nikimonitorscreenSTREAM import TileDeltaEncoder, StreamPipeline, merge_frame_messages
+    
+    base = synthetic_desktop()
+    frames = []
+    for i in range(30):
+        frame = base.copy()
+        cv2.putText(frame, f"frame {i}", (200 + 10 * i, 300), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+        frames.append(frame)
+    
+    def capture():
+        time.sleep(0.01)  # Roughly what a screen grab costs
+        capture.count += 1
+        return frames[capture.count % len(frames)]
+    capture.count = 0
+    
+    def send(message):
+        time.sleep(0.08)  # Congested link: 80 ms per update
+        send.count += 1
+        return True
+    send.count = 0
+    
+    duration = 3.0
+    
+    # Old behaviour: every stage in one loop
+    encoder = TileDeltaEncoder()
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        message = encoder.encode(capture())
+        if message:
+            send(message)
+    print(f"  serial:    {capture.count / duration:5.1f} captures/s, {send.count / duration:5.1f} sends/s")
+    
+    capture.count = send.count = 0
+    encoder = TileDeltaEncoder()
+    deadline = time.time() + duration
+    pipeline = StreamPipeline(capture, encoder.encode, send, fps=20,
+                              is_active=lambda: time.time() < deadline,
+                              merge=merge_frame_messages, log_interval=0)
+    pipeline.run()
+    print(f"  pipelined: {capture.count / duration:5.1f} captures/s, {send.count / duration:5.1f} sends/s")
+    for stage, stats in pipeline.stats().items():
+        print(f"    {stage:<8} {stats}")
+
+
+@benchmark("bitrate")
+def bench_bitrate():
+    """Adaptive bitrate controller over a throttled loopback socket"""
+    import socket
+    import threading
+    import numpy as np
+    import cv2
+    from nikimonitorscreenPROTOCOL import FrameReader, send_message
+    from nikimonitorscreenSTREAM import (TileDeltaEncoder, StreamPipeline, BitrateController,
+                                         merge_frame_messages)
+    
+    link_bps = 1_500_000  # Simulated congested home Wi-Fi
+    duration = 12.0
+    client, admin = socket.socketpair()
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 32 * 1024)
+    admin.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 32 * 1024)
+    send_lock = threading.Lock()
+    
+    def throttled_admin():
+        # Reads no faster than link_bps and acknowledges every frame it completes
+        reader = FrameReader()
+        while True:
+            try:
+                received = reader.recv_from(admin)
+            except OSError:
+                return
+            if not received:
+                return
+            time.sleep(received * 8 / link_bps)
+            for msg_type, flags, payload in reader.frames():
+                message = decode_message(msg_type, payload)
+                send_message(admin, {"command": "stream_ack", "seq": message["seq"]})
+    
+    def ack_listener():
+        reader = FrameReader()
+        while True:
+            try:
+                if not reader.recv_from(client):
+                    return
+            except OSError:
+                return
+            for msg_type, flags, payload in reader.frames():
+                controller.record_ack(decode_message(msg_type, payload)["seq"])
+    
+    # Busy source: a scrolling textured image so most tiles change every frame
+    rng = np.random.default_rng(1)
+    source = cv2.resize(rng.integers(0, 255, (135, 240, 3), dtype=np.uint8), (1920, 1080))
+    controller = BitrateController(target_bps=4_000_000, quality=50, scale=0.7, fps=20)
+    encoder = TileDeltaEncoder(quality=controller.quality)
+    state = {"offset": 0}
+    
+    def capture():
+        state["offset"] += 7
+        frame = np.roll(source, state["offset"], axis=1)
+        return cv2.resize(frame, (0, 0), fx=controller.scale, fy=controller.scale, interpolation=cv2.INTER_AREA)
+    
+    def send(message):
+        size = sum(len(tile["data"]) for tile in message["tiles"])
+        start = time.perf_counter()
+        with send_lock:
+            send_message(client, message)
+        controller.record_send(message["seq"], size, time.perf_counter() - start)
+        if controller.update():
+            encoder.quality = controller.quality
+            pipeline.fps = controller.fps
+            print(f"  t={time.time() - started:5.1f}s {controller.last_decision}")
+        return True
+    
+    threading.Thread(target=throttled_admin, daemon=True).start()
+    threading.Thread(target=ack_listener, daemon=True).start()
+    
+    started = time.time()
+    pipeline = StreamPipeline(capture, encoder.encode, send, fps=controller.fps,
+                              is_active=lambda: time.time() - started < duration,
+                              merge=merge_frame_messages, log_interval=0)
+    pipeline.run()
+    client.close()
+    admin.close()
+    print(f"  final: quality={controller.quality} scale={controller.scale} fps={controller.fps}")
+
+
+@benchmark("capture")
+def bench_capture():
+    """Capture backends, and the whole stream pipeline fed by the synthetic one"""
+    import socket
+    import threading
+    from nikimonitorscreenPROTOCOL import FrameReader, send_message
+    from nikimonitorscreenCAPTURE import CAPTURE_BACKENDS
+    from nikimonitorscreenSTREAM import TileDeltaEncoder, FrameScaler, StreamPipeline, merge_frame_messages
+    
+    # Real grabbers only work where there is a screen to grab
+    for name, backend_class in CAPTURE_BACKENDS.items():
+        try:
+            backend = backend_class()
+            backend.grab()
+        except Exception as e:
+            print(f"  {name}: unavailable ({e.__class__.__name__}: {e})")
+            continue
+        report(f"{name} grab ({backend.order})", best_of(backend.grab, repeat=3, number=20))
+        backend.close()
+    
+    # Synthetic desktop through scale, tile encode and a real socket
+    duration = 3.0
+    capture = CAPTURE_BACKENDS["synthetic"](scroll=4)
+    scaler = FrameScaler()
+    encoder = TileDeltaEncoder()
+    client, admin = socket.socketpair()
+    received = {"frames": 0, "bytes": 0}
+    
+    def admin_reader():
+        reader = FrameReader()
+        while True:
+            try:
+                count = reader.recv_from(admin)
+            except OSError:
+                return
+            if not count:
+                return
+            received["bytes"] += count
+            for msg_type, flags, payload in reader.frames():
+                decode_message(msg_type, payload)
+                received["frames"] += 1
+    
+    def send(message):
+        send_message(client, message)
+        return True
+    
+    threading.Thread(target=admin_reader, daemon=True).start()
+    deadline = time.time() + duration
+    pipeline = StreamPipeline(
+        capture=lambda: scaler.scale(capture.grab(), 0.7, order=capture.order),
+        encode=encoder.encode,
+        send=send,
+        fps=20,
+        is_active=lambda: time.time() < deadline,
+        merge=merge_frame_messages,
+        log_interval=0,
+        release=scaler.release
+    )
+    pipeline.run()
+    client.close()
+    admin.close()
+    
+    print(f"  synthetic stream: {received['frames'] / duration:5.1f} updates/s, "
+          f"{received['bytes'] * 8 / duration / 1e6:5.2f} Mbit/s, {scaler.allocated} buffers allocated")
+    for stage, stats in pipeline.stats().items():
+        print(f"    {stage:<8} {stats}")
+
+
+@benchmark("server")
+def bench_server():
+    """Admin server load test: hundreds of streaming clients on loopback"""
+    import asyncio
+    import threading
+    from nikimonitorscreenPROTOCOL import HEADER_SIZE, unpack_header, pack_header, encode_message
+    from nikimonitorscreenSERVER import MonitorServer, UpdateQueue
+    
+    client_count = 300
+    duration = 5.0
+    fps = 10
+    
+    updates = UpdateQueue()
+    server = MonitorServer("127.0.0.1", 0, updates)
+    host, port = server.start()
+    
+    # Stand-in for the Tk thread: drain every 15 ms and ack frames like the admin does
+    handled = {"messages": 0, "frames": 0}
+    ui_running = threading.Event()
+    ui_running.set()
+    
+    def ui_loop():
+        while ui_running.is_set():
+            for session_id, message in updates.drain():
+                handled["messages"] += 1
+                if message.get("type") == "frame_tiles":
+                    handled["frames"] += 1
+                    server.send(session_id, {"command": "stream_ack", "seq": message["seq"]})
+            time.sleep(0.015)
+    
+    ui_thread = threading.Thread(target=ui_loop, daemon=True)
+    ui_thread.start()
+    
+    tile = bytes(2048)  # About one dirty tile
+    windows = [{"id": i, "hwnd": i, "title": f"Window {i}", "process": "app.exe"} for i in range(20)]
+    sent = {"messages": 0, "acks": 0}
+    
+    def frame(message):
+        msg_type, parts = encode_message(message)
+        return pack_header(msg_type, sum(len(part) for part in parts)) + b"".join(parts)
+    
+    async def simulated_client(index, deadline):
+        reader, writer = await asyncio.open_connection(host, port)
+        
+        async def read_acks():
+            try:
+                while True:
+                    header = await reader.readexactly(HEADER_SIZE)
+                    await reader.readexactly(unpack_header(header)[2])
+                    sent["acks"] += 1
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+        
+        ack_task = asyncio.ensure_future(read_acks())
+        writer.write(frame({"type": "windows_list", "data": windows}))
+        seq = 0
+        while time.time() < deadline:
+            seq += 1
+            writer.write(frame({"type": "frame_tiles", "seq": seq, "width": 1344, "height": 756,
+                                "keyframe": False, "tiles": [{"x": 64 * (index % 20), "y": 0, "data": tile}]}))
+            await writer.drain()
+            sent["messages"] += 1
+            await asyncio.sleep(1.0 / fps)
+        writer.close()
+        ack_task.cancel()
+    
+    async def run_clients():
+        deadline = time.time() + duration
+        await asyncio.gather(*(simulated_client(i, deadline) for i in range(client_count)))
+    
+    start = time.time()
+    asyncio.run(run_clients())
+    elapsed = time.time() - start
+    time.sleep(0.5)  # Let the UI drain what is left
+    ui_running.clear()
+    ui_thread.join()
+    server.stop()
+    
+    print(f"  {client_count} clients x {fps} fps for {elapsed:.1f}s: {sent['messages']} frame updates sent")
+    print(f"  UI handled {handled['messages']} messages ({handled['frames']} frame updates), "
+          f"{updates.coalesced} coalesced, queue high water {updates.high_water}/{updates.maxsize}")
+    print(f"  {sent['acks']} stream acks delivered back to clients")
+
+
+@benchmark("decode")
+def bench_decode():
+    """Admin frame path: Tk-thread decode against the decoder worker"""
+    import io
+    from PIL import Image
+    from nikimonitorscreenCAPTURE import SyntheticCapture
+    from nikimonitorscreenSTREAM import TileDeltaEncoder
+    from nikimonitorscreenADMIN import FrameDecoder
+    
+    display_size = (880, 495)
+    capture = SyntheticCapture(width=1344, height=756, scroll=6)
+    encoder = TileDeltaEncoder(quality=50)
+    messages = [message for message in (encoder.encode(capture.grab()) for _ in range(60)) if message]
+    
+    # Old path, all on the Tk thread: PIL decode and paste, resize for display
+    canvas = Image.new("RGB", (1344, 756))
+    
+    def old_path():
+        for message in messages:
+            for tile in message["tiles"]:
+                canvas.paste(Image.open(io.BytesIO(tile["data"])), (tile["x"], tile["y"]))
+            canvas.resize(display_size, Image.BILINEAR)
+    
+    old = best_of(old_path, repeat=3, number=1) / len(messages)
+    
+    # New path: updates arrive every 10 ms, the Tk stand-in drains every 15 ms
+    # and only wraps the ready buffer
+    import threading
+    decoder = FrameDecoder()
+    decoder.target_size = display_size
+    
+    def submit_all():
+        for message in messages:
+            decoder.submit(message)
+            time.sleep(0.01)
+    
+    submitter = threading.Thread(target=submit_all)
+    start = time.perf_counter()
+    submitter.start()
+    
+    shown = 0
+    ui_time = 0.0
+    while submitter.is_alive() or decoder.pending is not None or decoder.ready is not None:
+        ui_start = time.perf_counter()
+        ready = decoder.take()
+        if ready is not None:
+            Image.fromarray(ready[0])
+            decoder.recycle(ready[0])
+            shown += 1
+            ui_time += time.perf_counter() - ui_start
+        time.sleep(0.015)
+    elapsed = time.perf_counter() - start
+    decoder.close()
+    
+    report("old: Tk thread per update", old)
+    report("new: Tk thread per displayed frame", ui_time / shown)
+    print(f"  worker: {len(messages)} updates over {elapsed * 1000:.0f} ms, "
+          f"{decoder.coalesced} merged while busy, {shown} frames displayed")
+
+
+def synthetic_history_db(path, visits=400_000, urls=100_000):
+    """Create a Chrome-like History database with the given number of visits"""
+    import random
+    import sqlite3
+    
+    rng = random.Random(1)
+    now = int((time.time() + 11644473600) * 1_000_000)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE urls(id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR,
+                          visit_count INTEGER, last_visit_time INTEGER);
+        CREATE TABLE visits(id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER,
+                            from_visit INTEGER, transition INTEGER, visit_duration INTEGER);
+        CREATE INDEX visits_url_index ON visits (url);
+        CREATE INDEX visits_time_index ON visits (visit_time);
+    """)
+    conn.executemany(
+        "INSERT INTO urls VALUES (?, ?, ?, 0, 0)",
+        ((i, f"https://site{i % 5000}.example.com/path/{i}?q={rng.random()}", f"Page title number {i}")
+         for i in range(1, urls + 1))
+    )
+    conn.executemany(
+        "INSERT INTO visits VALUES (?, ?, ?, 0, 805306368, 0)",
+        ((i, rng.randint(1, urls), now - (visits - i) * 5_000_000) for i in range(1, visits + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+@benchmark("sqlite")
+def bench_sqlite():
+    """History polls: copy the whole database against the read-only reader"""
+    import os
+    import shutil
+    import sqlite3
+    import datetime
+    import tempfile
+    from nikimonitorscreenHISTORY import HistoryDatabase
+    
+    query = """
+        SELECT visits.id, urls.url, urls.title, visits.visit_time - 11644473600000000
+        FROM urls JOIN visits ON urls.id = visits.url
+        WHERE visits.id > ? AND visits.visit_time > ?
+        ORDER BY visits.id DESC
+        LIMIT 200
+    """
+    since = (int(time.time()) - 7 * 24 * 60 * 60 + 11644473600) * 1_000_000
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "History")
+        synthetic_history_db(path)
+        print(f"  synthetic History: {os.path.getsize(path) / 1e6:.0f} MB")
+        watermark = sqlite3.connect(path).execute("SELECT MAX(id) FROM visits").fetchone()[0] - 20
+        copy_path = os.path.join(directory, "history_temp.db")
+        
+        def copy_and_query(since_id):
+            shutil.copy2(path, copy_path)
+            conn = sqlite3.connect(copy_path)
+            conn.execute(query, (since_id, since)).fetchall()
+            conn.close()
+            os.remove(copy_path)
+        
+        database = HistoryDatabase(path)
+        report("old: copy2 + query, full poll", best_of(lambda: copy_and_query(0), repeat=3, number=3))
+        report("old: copy2 + query, incremental poll", best_of(lambda: copy_and_query(watermark), repeat=3, number=3))
+        report("reader: full poll", best_of(lambda: database.query(query, (0, since)), repeat=3, number=3))
+        report("reader: incremental poll", best_of(lambda: database.query(query, (watermark, since)), number=20))
+        
+        # Full poll including row formatting: SQL datetime() + strptime against raw integers
+        formatted_query = query.replace("visits.visit_time - 11644473600000000",
+                                        "datetime(visits.visit_time/1000000-11644473600, 'unixepoch', 'localtime')")
+        
+        def formatted_poll():
+            history = []
+            for visit_id, url, title, visit_time in database.query(formatted_query, (0, since)):
+                dt = datetime.datetime.strptime(visit_time, '%Y-%m-%d %H:%M:%S')
+                history.append({"url": url, "title": title or url, "time": dt.strftime('%H:%M:%S'),
+                                "date": dt.strftime('%Y-%m-%d'), "visit_id": visit_id})
+            history.sort(key=lambda x: x["time"], reverse=True)
+        
+        def raw_poll():
+            history = [{"url": url, "title": title or url, "timestamp": visit_time, "visit_id": visit_id}
+                       for visit_id, url, title, visit_time in database.query(query, (0, since))]
+            history.sort(key=lambda x: x["timestamp"], reverse=True)
+        
+        report("old: full poll, formatted timestamps", best_of(formatted_poll, repeat=3, number=3))
+        report("new: full poll, raw timestamps", best_of(raw_poll, repeat=3, number=3))
+        
+        # Running browsers hold an exclusive lock on the file
+        lock = sqlite3.connect(path)
+        lock.execute("PRAGMA locking_mode=EXCLUSIVE")
+        lock.execute("BEGIN EXCLUSIVE")
+        report("reader while locked: incremental poll", best_of(lambda: database.query(query, (watermark, since)), number=20))
+        
+        # A lock held past the busy timeout leaves only copying the files
+        database.busy_timeout = 0.1
+        start = time.perf_counter()
+        database._refresh_snapshot()
+        report("snapshot while locked: file copy + backup API", time.perf_counter() - start - database.busy_timeout)
+        lock.rollback()
+        lock.close()
+        
+        start = time.perf_counter()
+        database.snapshot_stamp = None
+        database._refresh_snapshot()
+        report("snapshot via backup API (mid-write fallback)", time.perf_counter() - start)
+        print(f"  reader paths used: {database.stats}")
+        database.close()
+
+
+@benchmark("store")
+def bench_store():
+    """Admin history store: incremental updates and page reads at tens of thousands of visits"""
+    from nikimonitorscreenSTORE import HistoryStore
+    
+    visits = 60_000
+    now = int(time.time() * 1_000_000)
+    history = [{"url": f"https://www.example.com/page/{i % 5000}", "title": f"Example page {i}",
+                "timestamp": now - i * 30_000_000, "browser": ("Google Chrome", "Firefox")[i % 2]}
+               for i in range(visits)]
+    store = HistoryStore()
+    store.add(history)
+    
+    chunk = history[:50]
+    batches = iter(range(1, 10 ** 6))
+    
+    def newest():
+        # A poll brings visits newer than anything stored
+        shift = (visits + next(batches) * 100) * 30_000_000
+        store.add([{**item, "timestamp": item["timestamp"] + shift} for item in chunk])
+    
+    def interleaved():
+        # A browser that lagged behind reports visits between stored ones
+        shift = next(batches)
+        store.add([{**item, "timestamp": item["timestamp"] - shift} for item in chunk])
+    
+    def old_merge():
+        sorted(chunk + history, key=lambda item: item["timestamp"], reverse=True)
+    
+    report(f"old: re-sort everything per update ({visits} visits)", best_of(old_merge, repeat=3, number=5))
+    report("store: add 50 newest visits", best_of(newest, repeat=3, number=20))
+    report("store: add 50 visits between stored ones", best_of(interleaved, repeat=3, number=20))
+    report("store: read one page of 8 rows", best_of(lambda: store[30_000:30_008]))
+    print(f"  {len(store)} visits stored; the view keeps one widget per visible row whatever the size")
+
+@benchmark("background")
+def bench_background():
+    """Admin startup background: PIL drawing calls against numpy and the disk cache"""
+    import os
+    import tempfile
+    import numpy as np
+    from PIL import Image, ImageDraw
+    import nikimonitorscreenADMIN as admin
+    
+    width, height = 1320, 800
+    bg, surface, border, primary, secondary = (10, 12, 16), (20, 24, 30), (40, 44, 50), (120, 80, 250), (250, 80, 160)
+    
+    def old_background():
+        # The original create_background, drawing call by call
+        background = Image.new('RGBA', (width, height), bg + (255,))
+        draw = ImageDraw.Draw(background)
+        for y in range(height):
+            opacity = int(20 - (y / height) * 15)
+            if opacity > 0:
+                draw.line([(0, y), (width, y)], fill=surface + (opacity,))
+        for x in range(0, width, 40):
+            for y in range(0, height, 3):
+                if y % 6 == 0:
+                    draw.point((x, y), fill=border + (15,))
+        for y in range(0, height, 40):
+            for x in range(0, width, 3):
+                if x % 6 == 0:
+                    draw.point((x, y), fill=border + (15,))
+        for color, center in ((primary, 0), (secondary, width)):
+            for i in range(400, 0, -1):
+                opacity = int(10 - i * 0.025)
+                if opacity > 0:
+                    draw.ellipse([center - i, -i, center + i, i], fill=color + (opacity,))
+        return background
+    
+    old = np.asarray(old_background())
+    new = admin.render_background(width, height, surface, border, primary, secondary)
+    differing = int((old != new).any(axis=2).sum())
+    
+    with tempfile.TemporaryDirectory() as directory:
+        admin.BACKGROUND_CACHE_DIR = directory
+        admin.load_background(width, height, surface, border, primary, secondary)
+        report("old: PIL line/point/ellipse calls", best_of(old_background, repeat=3, number=3))
+        report("new: numpy render", best_of(lambda: admin.render_background(width, height, surface, border, primary, secondary),
+                                            repeat=3, number=10))
+        report("new: cached render from disk", best_of(lambda: admin.load_background(width, height, surface, border, primary, secondary),
+                                                       repeat=3, number=10))
+        report("Image.fromarray for the PhotoImage", best_of(lambda: Image.fromarray(new, "RGBA"), repeat=3, number=10))
+        print(f"  {differing} of {width * height} pixels differ from the PIL drawing (glow edges)")
+
+@benchmark("panels")
+def bench_panels():
+    """Shadow and frosted panel images: rendered every redraw against the LRU cache"""
+    import types
+    import nikimonitorscreenADMIN as admin
+    
+    app_class = admin.FuturisticParentMonitorApp
+    # Just enough of the app for the panel renderers
+    app = types.SimpleNamespace(colors=types.SimpleNamespace(surface="#14181e"), panel_images=admin.PanelImageCache())
+    app._hex_to_rgb = lambda color: app_class._hex_to_rgb(app, color)
+    app.render_shadow_image = app_class.render_shadow_image
+    app.render_frosted_panel = lambda *args: app_class.render_frosted_panel(app, *args)
+    
+    # A session of redraws: a handful of panel sizes, each drawn again and again
+    sizes = [(300, 140), (360, 690), (800, 600), (300, 140)] * 25
+    
+    def uncached():
+        for width, height in sizes:
+            app.render_shadow_image(width, height, 12, 60)
+            app.render_frosted_panel(width, height, 12, 230)
+    
+    def cached():
+        for width, height in sizes:
+            app_class.create_shadow_image(app, width, height, radius=12, alpha=60)
+            app_class.create_frosted_panel(app, width, height, radius=12)
+    
+    report(f"old: render {len(sizes)} shadow + frosted pairs", best_of(uncached, repeat=3, number=1))
+    app.panel_images = admin.PanelImageCache()
+    report(f"new: LRU cache, {len(sizes)} pairs", best_of(cached, repeat=1, number=1))
+    print(f"  {app.panel_images.misses} rendered, {app.panel_images.hits} reused, {len(app.panel_images)} cached")
+
+@benchmark("recorder")
+def bench_recorder():
+    """Session recorder: many clients' screen updates appended to segment files"""
+    import os
+    import tempfile
+    import numpy as np
+    import cv2
+    from nikimonitorscreenSTREAM import TileDeltaEncoder
+    from nikimonitorscreenRECORD import SessionRecorder, INDEX_ENTRY
+    
+    # One client's stream: a scrolling document and a clock, keyframe every 40 updates
+    base = synthetic_desktop()
+    encoder = TileDeltaEncoder(quality=50, keyframe_interval=40)
+    stream = []
+    for i in range(200):
+        frame = base.copy()
+        frame[110:580, 130:730] = np.roll(base[110:580, 130:730], -(i % 22), axis=0)
+        cv2.putText(frame, f"12:00:{i:03d}", (1180, 740), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        message = encoder.encode(frame)
+        if message:
+            msg_type, parts = encode_message(message)
+            payload = b"".join(parts)
+            stream.append((msg_type, payload, decode_message(msg_type, payload)))
+    
+    clients, fps, seconds = 16, 20, 10
+    updates = clients * fps * seconds
+    with tempfile.TemporaryDirectory() as directory:
+        max_bytes = 16 * 1024 * 1024
+        recorder = SessionRecorder(directory, segment_bytes=2 * 1024 * 1024, queue_size=updates + clients,
+                                   max_bytes=max_bytes)
+        recorder.start()
+        for client in range(clients):
+            recorder.begin(client, ("10.0.0.%d" % client, 5555))
+        
+        start = time.perf_counter()
+        for i in range(updates):
+            msg_type, payload, message = stream[(i // clients) % len(stream)]
+            recorder.record(i % clients, msg_type, payload, message)
+        queued = time.perf_counter() - start
+        for client in range(clients):
+            recorder.end(client)
+        recorder.close(timeout=120)
+        total = time.perf_counter() - start
+        
+        stats = recorder.stats()
+        index_bytes = sum(os.path.getsize(os.path.join(root, name))
+                          for root, _, names in os.walk(directory) for name in names if name.endswith(".idx"))
+        kept = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+    
+    report("record() on the network thread, per update", queued / updates)
+    report(f"write {updates} updates from {clients} clients", total,
+           f"{updates / total:.0f} updates/s, {stats['bytes'] / total / 1e6:.1f} MB/s "
+           f"(needs {clients * fps} updates/s)")
+    print(f"  {stats['written']} written, {stats['skipped']} skipped, {stats['dropped']} dropped, "
+          f"{stats['segments']} segments, index {index_bytes} bytes ({INDEX_ENTRY.size} per update)")
+    print(f"  retention: {stats['deleted']} oldest segments deleted, {kept / 1e6:.1f} MB kept "
+          f"(limit {max_bytes / 1e6:.1f} MB)")
+
+@benchmark("playback")
+def bench_playback():
+    """Recorded session playback: seeking an 8 hour recording through mapped segments"""
+    import os
+    import random
+    import tempfile
+    import psutil
+    import cv2
+    from nikimonitorscreenSTREAM import TileDeltaEncoder
+    from nikimonitorscreenRECORD import Segment, Recording, FLAG_KEYFRAME
+    from nikimonitorscreenADMIN import TileCompositor
+    
+    # One keyframe and the clock ticking after it, written over and over
+    base = synthetic_desktop()
+    encoder = TileDeltaEncoder(quality=50)
+    stream = []
+    for i in range(100):
+        frame = base.copy()
+        cv2.putText(frame, f"12:00:{i:02d}", (1180, 740), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        message = encoder.encode(frame)
+        if message:
+            msg_type, parts = encode_message(message)
+            stream.append((msg_type, b"".join(parts), message))
+    
+    # 8 hours at one update a second, a keyframe every 100, a busy burst every 10 minutes
+    hours, segment_seconds = 8, 300
+    start = 1_700_000_000 * 1_000_000
+    updates = hours * 3600
+    process = psutil.Process()
+    with tempfile.TemporaryDirectory() as directory:
+        segment = None
+        for i in range(updates):
+            timestamp = start + i * 1_000_000
+            msg_type, payload, message = stream[i % len(stream)]
+            if i % len(stream) == 0 and (segment is None or timestamp - segment.started >= segment_seconds * 1_000_000):
+                if segment is not None:
+                    segment.close()
+                segment = Segment(directory, (segment.number + 1) if segment else 1, timestamp)
+            # Periodic keyframes of a screen where only the clock moved report a tiny change
+            change = 0.3 if i % 600 == 599 else min(message["change"], 0.01)
+            segment.append(timestamp, msg_type, payload, FLAG_KEYFRAME if message["keyframe"] else 0, change)
+        segment.close()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        
+        opened = time.perf_counter()
+        recording = Recording(directory)
+        opened = time.perf_counter() - opened
+        compositor = TileCompositor()
+        rss_before = process.memory_info().rss
+        
+        times = [random.randrange(recording.start, recording.end) for _ in range(200)]
+        state = {"i": 0}
+        
+        def seek():
+            recording.frame_at(times[state["i"] % len(times)])
+            state["i"] += 1
+        
+        def seek_and_decode():
+            compositor.apply(recording.frame_at(times[state["i"] % len(times)]))
+            state["i"] += 1
+        
+        report(f"open {len(recording)} segments ({size / 1e6:.0f} MB)", opened)
+        report("random seek, merged update from keyframe", best_of(seek, repeat=3, number=len(times)))
+        report("random seek and decode to a full frame", best_of(seek_and_decode, repeat=1, number=len(times)))
+        report("fast-forward: next change over 10 idle minutes",
+               best_of(lambda: recording.next_change(recording.start, 0.1), number=200))
+        rss_after = process.memory_info().rss
+        print(f"  {updates} updates over {hours} h, memory after seeking everywhere: "
+              f"{(rss_after - rss_before) / 1e6:+.1f} MB RSS, {len(recording.readers)} segments mapped")
+        recording.close()
+
+@benchmark("export")
+def bench_export():
+    """Streaming export in chunks against building every row first"""
+    import os
+    import tempfile
+    import tracemalloc
+    from nikimonitorscreenEXPORT import DataExporter, HISTORY_COLUMNS, CsvSink, visit_rows, visit_chunks
+    from nikimonitorscreenSTORE import ActivityStore
+    
+    # A few months of browsing from one client
+    now = int(time.time() * 1_000_000)
+    rows = [{"url": f"https://example.com/page/{i}", "title": f"Example page number {i}",
+             "timestamp": now - i * 30_000_000, "browser": "Chrome"} for i in range(200_000)]
+    
+    def measure(func):
+        """(seconds, peak traced bytes); timed without tracing, which slows Python code down"""
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak
+    
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "export")
+        for extension in (".csv", ".jsonl"):
+            def streamed():
+                DataExporter(base, extension, [("history", HISTORY_COLUMNS, visit_rows(rows), len(rows))])._run()
+            
+            elapsed, peak = measure(streamed)
+            size = os.path.getsize(f"{base}_history{extension}")
+            report(f"streamed {extension[1:]}, {len(rows)} rows in chunks", elapsed,
+                   f"peak {peak / 1e6:.1f} MB, file {size / 1e6:.0f} MB")
+        
+        def everything_first():
+            # Every row formatted up front, then written in one go
+            everything = [row for chunk in visit_rows(rows) for row in chunk]
+            sink = CsvSink(f"{base}_all.csv", HISTORY_COLUMNS)
+            sink.write(everything)
+            sink.close()
+        
+        elapsed, peak = measure(everything_first)
+        report("all rows first, csv", elapsed, f"peak {peak / 1e6:.1f} MB")
+        
+        # The same visits read back from the activity store with a cursor
+        store = ActivityStore(os.path.join(directory, "activity.sqlite3"))
+        store.add_visits("10.0.0.1", [{**row, "visit_id": i} for i, row in enumerate(rows)])
+        
+        def from_store():
+            DataExporter(base, ".csv", [("history", HISTORY_COLUMNS, visit_chunks(store.visits()), store.count())])._run()
+        
+        elapsed, peak = measure(from_store)
+        report("streamed csv from the activity store", elapsed, f"peak {peak / 1e6:.1f} MB")
+        store.close()
+
+@benchmark("activity")
+def bench_activity():
+    """SQLite activity store: batched inserts and history searches at millions of visits"""
+    import os
+    import random
+    import tempfile
+    from nikimonitorscreenSTORE import ActivityStore
+    
+    sites = [("www.google.com/search?q={}", "{} - Google Search"), ("www.youtube.com/watch?v={}", "{} - YouTube"),
+             ("www.roblox.com/games/{}", "{} - Roblox"), ("www.discord.com/channels/{}", "Discord | {}"),
+             ("en.wikipedia.org/wiki/{}", "{} - Wikipedia"), ("www.example{}.com/", "Example site {}")]
+    words = ["minecraft", "homework", "math", "music", "cats", "volcano", "fractions", "dinosaurs", "space",
+             "history", "football", "drawing", "piano", "chess", "weather", "robots"]
+    rng = random.Random(1)
+    now = int(time.time() * 1_000_000)
+    clients, per_client, batch = 4, 500_000, 10_000
+    
+    with tempfile.TemporaryDirectory() as directory:
+        store = ActivityStore(os.path.join(directory, "activity.sqlite3"))
+        insert_times = []
+        for client in range(clients):
+            host = f"10.0.0.{client + 1}"
+            for start in range(0, per_client, batch):
+                items = []
+                for visit_id in range(start, start + batch):
+                    url, title = rng.choice(sites)
+                    topic = f"{rng.choice(words)} {rng.choice(words)} {visit_id % 997}"
+                    items.append({"url": url.format(topic.replace(" ", "+")), "title": title.format(topic),
+                                  "timestamp": now - (per_client - visit_id) * 5_000_000, "browser": "Chrome",
+                                  "visit_id": visit_id})
+                started = time.perf_counter()
+                store.add_visits(host, items)
+                insert_times.append(time.perf_counter() - started)
+        
+        duplicate = time.perf_counter()
+        added = store.add_visits("10.0.0.1", items)
+        duplicate = time.perf_counter() - duplicate
+        
+        total = store.count()
+        size = os.path.getsize(os.path.join(directory, "activity.sqlite3"))
+        report(f"add_visits, {batch} new visits in one transaction", sorted(insert_times)[len(insert_times) // 2],
+               f"median of {len(insert_times)} batches")
+        report(f"add_visits, the same {batch} again", duplicate, f"{added} stored")
+        print(f"  {total} visits from {clients} clients, {size / 1e6:.0f} MB with indexes and FTS")
+        
+        client = "10.0.0.2"
+        searches = [
+            ("newest 500, no filter", {}),
+            ("category: video", {"category": "video"}),
+            ("domain: en.wikipedia.org", {"domain": "en.wikipedia.org"}),
+            ("text: 'minecraft' (common word)", {"text": "minecraft"}),
+            ("text: 'volcano piano' (two words)", {"text": "volcano piano"}),
+            ("text: 'dino' prefix + category: social", {"text": "dino", "category": "social"}),
+            ("text: '996' (rare)", {"text": "996"}),
+            ("text: 'zebra' (no match)", {"text": "zebra"}),
+        ]
+        for label, filters in searches:
+            found = len(store.search(client, **filters))
+            report(f"search {label}", best_of(lambda: store.search(client, **filters), repeat=3, number=5),
+                   f"{found} rows")
+        store.close()
+
+class SimulatedRoot:
+    """Stand-in for Tk's after() on a simulated clock, counting timer wakeups"""
+    
+    def __init__(self):
+        import heapq
+        self.heapq = heapq
+        self.now = 0.0
+        self.timers = []
+        self.counter = 0
+        self.wakeups = 0
+    
+    def after(self, ms, func, *args):
+        self.counter += 1
+        self.heapq.heappush(self.timers, (self.now + ms / 1000, self.counter, func, args))
+        return self.counter
+    
+    def run(self, seconds):
+        end = self.now + seconds
+        while self.timers and self.timers[0][0] <= end:
+            self.now, _, func, args = self.heapq.heappop(self.timers)
+            self.wakeups += 1
+            func(*args)
+        self.now = end
+
+
+@benchmark("idle")
+def bench_idle():
+    """Admin timers while nothing happens: fixed-rate loops against the idle-aware scheduler"""
+    from nikimonitorscreenADMIN import AnimationScheduler
+    duration = 60.0
+    
+    def wakeups(intervals, animation=False):
+        root = SimulatedRoot()
+        scheduler = AnimationScheduler(root, clock=lambda: root.now)
+        def loop(interval):
+            root.after(interval, loop, interval)
+        for interval in intervals:
+            loop(interval)
+        if animation:
+            # One half-second fade, as after a click
+            scheduler.animate("fade", 0.0, 1.0, 0.5, lambda value: None)
+        root.run(duration)
+        return root.wakeups / duration, scheduler
+    
+    # Old: a 16 ms animation tick and a 50 ms activity meter forever, plus a 15 ms drain with the server up
+    # New: the scheduler sleeps, and with the server up the meter updates once a second and draining slows to 100 ms
+    print(f"  old, server stopped: {wakeups((16, 50))[0]:6.1f} wakeups/s")
+    print(f"  new, server stopped: {wakeups(())[0]:6.1f} wakeups/s")
+    print(f"  old, server running: {wakeups((16, 50, 15))[0]:6.1f} wakeups/s")
+    print(f"  new, server running: {wakeups((1000, 100))[0]:6.1f} wakeups/s")
+    rate, scheduler = wakeups((), animation=True)
+    print(f"  new, one 0.5 s animation: {scheduler.frames} frames, then asleep: {scheduler.job is None}")
+    
+    # Real CPU time, where there is a display to run Tk on
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"  Tk CPU time: unavailable ({e.__class__.__name__})")
+        return
+    root.withdraw()
+    
+    def cpu_for(intervals, seconds=3.0):
+        jobs = []
+        
+        def loop(interval):
+            jobs.append(root.after(interval, loop, interval))
+        for interval in intervals:
+            loop(interval)
+        start = time.process_time()
+        root.after(int(seconds * 1000), root.quit)
+        root.mainloop()
+        for job in jobs:
+            root.after_cancel(job)
+        return (time.process_time() - start) / seconds
+    
+    report("old: CPU per second idle, server running", cpu_for((16, 50, 15)))
+    report("new: CPU per second idle, server running", cpu_for((1000, 100)))
+    root.destroy()
+
+@benchmark("windows")
+def bench_windows():
+    """Process names for a window enumeration: psutil per window against the cache"""
+    import os
+    import psutil
+    from nikimonitorscreenWINDOWS import ProcessNameCache
+    
+    # A desktop has a few windows per process; stand in with this machine's processes
+    pids = (psutil.pids()[:20] or [os.getpid()]) * 3
+    
+    def per_window():
+        names = []
+        for pid in pids:
+            try:
+                names.append(psutil.Process(pid).name())
+            except psutil.Error:
+                names.append("Unknown")
+    
+    cache = ProcessNameCache()
+    cache.resolve(pids)
+    report(f"old: psutil per window ({len(pids)} windows)", best_of(per_window, number=20))
+    report("cache: resolve, all processes known", best_of(lambda: cache.resolve(pids), number=20))
+    report("cache: resolve after every process changed", best_of(lambda: ProcessNameCache().resolve(pids), number=20))
+    print(f"  cache: {len(cache)} entries, {cache.hits} hits, {cache.misses} misses")
+    
+    # Polling the list: full resends against deltas when one title changes per poll
+    from nikimonitorscreenWINDOWS import WindowListTracker
+    tracker = WindowListTracker()
+    windows = [{"hwnd": 0x10000 + i, "title": f"Window title number {i}", "process": "chrome.exe"}
+               for i in range(60)]
+    tracker.assign_ids(windows)
+    full = b"".join(encode_message(tracker.full_message(windows))[1])
+    windows[7] = {**windows[7], "title": "Window title number 7 (1)"}
+    delta = b"".join(encode_message(tracker.delta_message(windows))[1])
+    report("full windows_list per poll", best_of(lambda: encode_message(tracker.full_message(windows))),
+           f"{len(full)} bytes")
+    report("windows_delta per poll, diff of 60 windows", best_of(lambda: tracker.delta_message(windows)),
+           f"{len(delta)} bytes with one title changed")
+
+def main(names):
+    """Run the named benchmarks, or all of them"""
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            continue
+        print(f"{name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
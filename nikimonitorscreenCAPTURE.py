@@ -0,0 +1,189 @@
+import os
+import threading
+import numpy as np
+import cv2
+from PIL import Image
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+# Screen capture backends used by the client
+#
+# Every backend grabs the whole primary screen as a numpy array in its native
+# channel order (the `order` attribute: "BGR", "BGRA" or "RGB"), so callers
+# can convert once on the scaled frame instead of on every full-size grab.
+# Arrays returned by grab() may be reused buffers that are only valid until
+# the next grab on the same thread.
+
+
+def synthetic_desktop(width=1344, height=756):
+    """Build a static BGR desktop-like frame: gradient, windows and text rows"""
+    frame = np.zeros((height, width, 3), np.uint8)
+    frame[:] = np.linspace(40, 90, width, dtype=np.uint8)[None, :, None]
+    frame[60:600, 100:900] = (235, 235, 235)
+    frame[60:90, 100:900] = (120, 80, 40)
+    for row in range(110, 580, 22):
+        frame[row:row + 10, 130:130 + (row * 7) % 600] = (30, 30, 30)
+    return frame
+
+
+class CaptureBackend:
+    """Base class for screen grabbers"""
+    
+    name = "base"
+    order = "BGR"
+    
+    def grab(self):
+        """Grab the screen as an (h, w, channels) uint8 array in `order`"""
+        raise NotImplementedError
+    
+    def grab_image(self):
+        """Grab the screen as a PIL RGB image that stays valid"""
+        frame = self.grab()
+        if self.order == "BGRA":
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
+        elif self.order == "BGR":
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        else:
+            frame = frame.copy()
+        return Image.fromarray(frame)
+    
+    def close(self):
+        """Release any native resources"""
+
+
+class PyAutoGuiCapture(CaptureBackend):
+    """pyautogui screenshots: portable but slow, a new PIL image per grab"""
+    
+    name = "pyautogui"
+    order = "RGB"
+    
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+    
+    def grab(self):
+        return np.asarray(self.pyautogui.screenshot())
+    
+    def grab_image(self):
+        return self.pyautogui.screenshot()
+
+
+class MssCapture(CaptureBackend):
+    """Raw BGRA grabs through mss, viewed in place without any conversion
+    
+    mss keeps its native capture buffers per instance and its handles are
+    tied to the thread that created them, so each thread gets its own
+    instance.
+    """
+    
+    name = "mss"
+    order = "BGRA"
+    
+    def __init__(self, monitor=1):
+        if mss is None:
+            raise RuntimeError("mss is not installed")
+        self.monitor = monitor  # 1 is the primary screen, 0 all screens combined
+        self.local = threading.local()
+        self.instances = []
+        self.lock = threading.Lock()
+    
+    def _instance(self):
+        """Return this thread's mss instance, creating it on first use"""
+        sct = getattr(self.local, "sct", None)
+        if sct is None:
+            sct = self.local.sct = mss.mss()
+            with self.lock:
+                self.instances.append(sct)
+        return sct
+    
+    def grab(self):
+        sct = self._instance()
+        shot = sct.grab(sct.monitors[self.monitor])
+        return np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+    
+    def close(self):
+        with self.lock:
+            for sct in self.instances:
+                sct.close()
+            self.instances = []
+        self.local = threading.local()
+
+
+class SyntheticCapture(CaptureBackend):
+    """Deterministic frames for headless runs and benchmarks
+    
+    Replays `frames` in a loop: a list of BGR arrays, or a directory of
+    recorded images loaded in file name order. Without frames it generates a
+    synthetic desktop with a blinking cursor, a clock ticking every `fps`
+    frames and, if `scroll` is set, a window scrolling that many pixels per
+    frame. The n-th grab is always the same image.
+    """
+    
+    name = "synthetic"
+    order = "BGR"
+    
+    def __init__(self, frames=None, width=1920, height=1080, fps=20, scroll=0):
+        if isinstance(frames, (str, os.PathLike)):
+            frames = self.load_frames(frames)
+        self.frames = frames
+        self.fps = fps
+        self.scroll = scroll
+        self.index = 0
+        
+        if not frames:
+            self.base = synthetic_desktop(width, height)
+            self.buffer = np.empty_like(self.base)
+    
+    @staticmethod
+    def load_frames(directory):
+        """Load recorded frames from image files in name order"""
+        frames = []
+        for name in sorted(os.listdir(directory)):
+            frame = cv2.imread(os.path.join(directory, name), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append(frame)
+        if not frames:
+            raise ValueError(f"No images found in {directory}")
+        return frames
+    
+    def grab(self):
+        index = self.index
+        self.index += 1
+        if self.frames:
+            return self.frames[index % len(self.frames)]
+        
+        frame = self.buffer
+        np.copyto(frame, self.base)
+        height, width = frame.shape[:2]
+        
+        # Scroll the content of the main window
+        if self.scroll:
+            window = self.base[90:600, 100:900]
+            frame[90:600, 100:900] = np.roll(window, -self.scroll * index, axis=0)
+        
+        # Cursor blinks twice a second, the clock ticks once a second
+        if (index * 4 // self.fps) % 2:
+            frame[300:318, 400:402] = 0
+        seconds = index // self.fps
+        cv2.putText(frame, f"12:{seconds // 60 % 60:02d}:{seconds % 60:02d}", (width - 164, height - 16),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        return frame
+
+
+CAPTURE_BACKENDS = {
+    "mss": MssCapture,
+    "pyautogui": PyAutoGuiCapture,
+    "synthetic": SyntheticCapture
+}
+
+
+def create_capture_backend(name="auto"):
+    """Create a capture backend by name; "auto" prefers mss over pyautogui"""
+    if name == "auto":
+        name = "mss" if mss is not None else "pyautogui"
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend: {name} (available: {', '.join(CAPTURE_BACKENDS)})")
+    return CAPTURE_BACKENDS[name]()
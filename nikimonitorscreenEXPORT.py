@@ -0,0 +1,238 @@
+import os
+import csv
+import json
+import threading
+import logging
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from nikimonitorscreenRECORD import Recording, INDEX_ENTRY
+
+# Data export used by the admin
+#
+# Every dataset is a generator of row chunks, and every output format a sink
+# that writes one chunk at a time, so an export holds one chunk in memory
+# however much data there is. Exports run on a background thread; the UI
+# polls progress() instead of being called back from that thread.
+
+
+HISTORY_COLUMNS = ["visited", "timestamp", "client", "browser", "category", "title", "url"]
+WINDOW_COLUMNS = ["session", "id", "title", "process"]
+SESSION_COLUMNS = ["recording", "host", "session", "start", "end", "seconds", "segments", "updates", "bytes"]
+
+
+def visit_chunks(chunks, client=""):
+    """Browser history rows from chunks of visits, such as ActivityStore.visits() yields"""
+    for chunk in chunks:
+        yield [{
+            "visited": datetime.fromtimestamp(row["timestamp"] / 1_000_000).isoformat(timespec="seconds"),
+            "timestamp": row["timestamp"],
+            "client": row.get("client", client),
+            "browser": row.get("browser", ""),
+            "category": row.get("category", ""),
+            "title": row["title"],
+            "url": row["url"]
+        } for row in chunk]
+
+
+def visit_rows(rows, chunk_size=1000, client=""):
+    """Browser history rows from a list of visits, in the list's order"""
+    return visit_chunks((rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)), client)
+
+
+def window_rows(windows, session, chunk_size=1000):
+    """The open windows of a client, as last reported"""
+    for start in range(0, len(windows), chunk_size):
+        yield [{
+            "session": session,
+            "id": window["id"],
+            "title": window["title"],
+            "process": window["process"]
+        } for window in windows[start:start + chunk_size]]
+
+
+def recording_has_updates(path):
+    """Whether a recording folder holds any recorded update, judged by file sizes only"""
+    return any(name.endswith(".idx") and os.path.getsize(os.path.join(path, name)) >= INDEX_ENTRY.size
+               and os.path.exists(os.path.join(path, name[:-4] + ".seg"))
+               for name in os.listdir(path))
+
+
+def count_sessions(directory):
+    """Number of rows session_rows() will yield, without opening any recording"""
+    if not os.path.isdir(directory):
+        return 0
+    count = 0
+    for entry in os.scandir(directory):
+        try:
+            count += entry.is_dir() and recording_has_updates(entry.path)
+        except OSError:
+            continue
+    return count
+
+
+def session_rows(directory, chunk_size=100):
+    """One row per recorded session, read from the recording index files only"""
+    if not os.path.isdir(directory):
+        return
+    chunk = []
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if not entry.is_dir():
+            continue
+        try:
+            recording = Recording(entry.path)
+            if not len(recording):
+                continue
+            files = [os.path.join(entry.path, name) for name in os.listdir(entry.path)]
+            updates = sum(os.path.getsize(path) // INDEX_ENTRY.size for path in files if path.endswith(".idx"))
+            size = sum(os.path.getsize(path) for path in files if path.endswith(".seg"))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping recording {entry.path}: {e}")
+            continue
+        
+        # Recording folders are named <started>_<host>_<session id>
+        _, _, rest = entry.name.partition("_")
+        host, _, session = rest.rpartition("_")
+        chunk.append({
+            "recording": entry.name,
+            "host": host,
+            "session": session,
+            "start": datetime.fromtimestamp(recording.start / 1_000_000).isoformat(timespec="seconds"),
+            "end": datetime.fromtimestamp(recording.end / 1_000_000).isoformat(timespec="seconds"),
+            "seconds": round((recording.end - recording.start) / 1_000_000, 1),
+            "segments": len(recording),
+            "updates": updates,
+            "bytes": size
+        })
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CsvSink:
+    """Rows as CSV with a header line"""
+    
+    extension = ".csv"
+    
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, columns)
+        self.writer.writeheader()
+    
+    def write(self, rows):
+        self.writer.writerows(rows)
+    
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    """Rows as JSON Lines, one object per line"""
+    
+    extension = ".jsonl"
+    
+    def __init__(self, path, columns):
+        self.file = open(path, "w", encoding="utf-8")
+    
+    def write(self, rows):
+        self.file.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+    
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Rows as a Parquet file, one row group per chunk (needs pyarrow)"""
+    
+    extension = ".parquet"
+    
+    def __init__(self, path, columns):
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is not installed")
+        self.path = path
+        self.columns = columns
+        self.writer = None  # Created on the first chunk, which fixes the column types
+    
+    def write(self, rows):
+        columns = {column: [row[column] for row in rows] for column in self.columns}
+        if self.writer is not None:
+            self.writer.write_table(pyarrow.Table.from_pydict(columns, schema=self.writer.schema))
+            return
+        table = pyarrow.Table.from_pydict(columns)
+        self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+EXPORT_FORMATS = {sink.extension: sink for sink in (CsvSink, JsonlSink, ParquetSink)}
+
+
+class DataExporter:
+    """Write datasets to files on a background thread
+    
+    `datasets` is a list of (name, columns, chunks, total rows or None),
+    where chunks is an iterable of lists of row dicts. Each dataset goes to
+    <base>_<name><extension>, and the extension picks the format. The
+    thread only reads the chunk iterables, so they must not depend on
+    state the UI thread changes while the export runs.
+    """
+    
+    def __init__(self, base, extension, datasets):
+        if extension not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {extension}")
+        self.base = base
+        self.extension = extension
+        self.datasets = datasets
+        self.rows = 0             # Rows written so far
+        self.current = None       # Dataset being written
+        self.files = []           # Files written
+        self.error = None
+        self.done = False
+        self.lock = threading.Lock()
+        self.thread = None
+    
+    def start(self):
+        """Start exporting on a background thread"""
+        self.thread = threading.Thread(target=self._run, name="data-export", daemon=True)
+        self.thread.start()
+    
+    def progress(self):
+        """(rows written, total rows or None, current dataset, finished)"""
+        total = sum(dataset[3] for dataset in self.datasets) \
+            if all(dataset[3] is not None for dataset in self.datasets) else None
+        with self.lock:
+            return self.rows, total, self.current, self.done
+    
+    def _run(self):
+        try:
+            for name, columns, chunks, _ in self.datasets:
+                with self.lock:
+                    self.current = name
+                path = f"{self.base}_{name}{self.extension}"
+                sink = EXPORT_FORMATS[self.extension](path, columns)
+                try:
+                    for rows in chunks:
+                        if rows:
+                            sink.write(rows)
+                        with self.lock:
+                            self.rows += len(rows)
+                finally:
+                    sink.close()
+                with self.lock:
+                    self.files.append(path)
+        except Exception as e:
+            logging.error(f"Export failed: {e}")
+            self.error = e
+        finally:
+            with self.lock:
+                self.done = True
@@ -0,0 +1,155 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import logging
+from pathlib import Path
+
+# Browser history database access used by the client
+#
+# Browsers keep their history in SQLite files that are open, and often
+# locked, while the browser runs. Instead of copying the whole file before
+# every query, HistoryDatabase reads the live file in place and keeps its
+# connection between polls, and copies it only when that is not possible.
+
+
+class HistoryDatabase:
+    """Read-only, reusable access to one browser history database
+    
+    Queries go through a read-only connection to the live file, kept open
+    between polls. Chrome and Edge hold an exclusive lock while they run, so
+    when the file is locked the query is retried on a fresh immutable
+    connection, which reads the file without taking any locks (SQLite
+    caches freely on those, so they are never reused). An immutable read
+    sees only the main file, so it is skipped while a -wal file holds
+    changes that have not been checkpointed yet, as Firefox's usually does.
+    
+    Otherwise, or if the browser was writing mid-read, the query runs on a
+    snapshot, an in-memory copy reused while the files are unchanged. The
+    snapshot is taken with SQLite's backup API through a read-only
+    connection that waits up to `busy_timeout` seconds for the lock, which
+    gives a consistent copy including the WAL. A browser holding its
+    exclusive lock for longer leaves no consistent way in: the database
+    file is then copied together with its -wal or -journal and opened, so
+    SQLite applies those, but the files are not copied at one instant and
+    a write during the copy can still leave it torn. The snapshot is then
+    retaken at the next query after the files change.
+    """
+    
+    def __init__(self, path, backup_pages=1024, busy_timeout=1.0):
+        self.path = os.path.abspath(path)
+        self.uri = Path(self.path).as_uri()
+        self.backup_pages = backup_pages  # Pages copied per backup step
+        self.busy_timeout = busy_timeout  # Seconds a snapshot waits for the browser's lock
+        self.connection = None            # Read-only connection to the live file
+        self.snapshot = None              # In-memory copy, last resort
+        self.snapshot_stamp = None        # File stamp the snapshot was taken at
+        self.stats = {"live": 0, "immutable": 0, "snapshot": 0, "snapshots_taken": 0, "snapshots_copied": 0}
+        self.lock = threading.Lock()      # Collections may overlap on the worker pool
+    
+    def _connect(self, options, timeout=0):
+        # No busy timeout by default: a locked file should go straight to the lock-free read
+        return sqlite3.connect(f"{self.uri}?{options}", uri=True, timeout=timeout, check_same_thread=False)
+    
+    def _stamp(self):
+        """(mtime, size) of the database and of its -wal and -journal, None for a missing file"""
+        stamp = []
+        for path in (self.path, self.path + "-wal", self.path + "-journal"):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def query(self, sql, params=()):
+        """Run a read-only query and return all rows"""
+        with self.lock:
+            return self._query(sql, params)
+    
+    def _query(self, sql, params):
+        try:
+            if self.connection is None:
+                self.connection = self._connect("mode=ro")
+            rows = self.connection.execute(sql, params).fetchall()
+            self.stats["live"] += 1
+            return rows
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+        
+        # An immutable read would miss whatever is still in the WAL
+        wal = self.path + "-wal"
+        if not (os.path.exists(wal) and os.path.getsize(wal)):
+            immutable = self._connect("mode=ro&immutable=1")
+            try:
+                rows = immutable.execute(sql, params).fetchall()
+                self.stats["immutable"] += 1
+                return rows
+            except sqlite3.DatabaseError as e:
+                # Caught the browser mid-write; a consistent copy is needed
+                logging.warning(f"Lock-free read of {self.path} failed ({e}), using a snapshot")
+            finally:
+                immutable.close()
+        
+        rows = self._refresh_snapshot().execute(sql, params).fetchall()
+        self.stats["snapshot"] += 1
+        return rows
+    
+    def _refresh_snapshot(self):
+        """Return an in-memory copy of the database, copying it only if it changed"""
+        stamp = self._stamp()
+        if self.snapshot is not None and stamp == self.snapshot_stamp:
+            return self.snapshot
+        
+        if self.snapshot is None:
+            self.snapshot = sqlite3.connect(":memory:", check_same_thread=False)
+        source = self._connect("mode=ro", timeout=self.busy_timeout)
+        try:
+            # Hold a read transaction for the whole backup: it pins one version
+            # of the database, and waiting for the lock here honours the busy
+            # timeout, where backup() itself would retry a locked file forever
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            source.backup(self.snapshot, pages=self.backup_pages)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            self._copy_snapshot()
+        finally:
+            source.close()
+        
+        self.snapshot_stamp = stamp
+        self.stats["snapshots_taken"] += 1
+        return self.snapshot
+    
+    def _copy_snapshot(self):
+        """Fill the snapshot from a copy of the files, for a database locked too long to back up"""
+        with tempfile.TemporaryDirectory() as directory:
+            copy = os.path.join(directory, os.path.basename(self.path))
+            shutil.copyfile(self.path, copy)
+            for suffix in ("-wal", "-journal"):
+                if os.path.exists(self.path + suffix):
+                    shutil.copyfile(self.path + suffix, copy + suffix)
+            
+            # A plain connection to the copy replays its WAL or rolls back its journal
+            source = sqlite3.connect(copy)
+            try:
+                source.backup(self.snapshot, pages=self.backup_pages)
+            finally:
+                source.close()
+        self.stats["snapshots_copied"] += 1
+    
+    def close(self):
+        """Close every connection"""
+        with self.lock:
+            self._close()
+    
+    def _close(self):
+        for connection in (self.connection, self.snapshot):
+            if connection is not None:
+                connection.close()
+        self.connection = None
+        self.snapshot = None
+        self.snapshot_stamp = None
@@ -0,0 +1,488 @@
+import struct
+from itertools import accumulate, repeat
+
+# Wire protocol shared by the admin and client
+#
+# Every message on the socket is one frame: a fixed 7 byte header followed by
+# the payload. The header carries the protocol version, the message type, a
+# flags byte and the payload length, so the receiver always knows exactly how
+# many bytes to wait for and never has to guess where a message ends.
+#
+# Payloads are encoded with a small schema based binary codec rather than
+# pickle: each message type has a fixed list of typed fields, so nothing from
+# the network is ever executed, and bulky payloads such as JPEG frames travel
+# as raw trailing bytes without being copied into an intermediate container.
+
+# Session recordings keep frames with the version they arrived with; a change
+# to the screenshot or frame_tiles layout must keep the old one readable in
+# nikimonitorscreenRECORD.RECORDED_LAYOUTS
+PROTOCOL_VERSION = 9
+
+# Header layout: version (u8), message type (u8), flags (u8), payload length (u32)
+HEADER = struct.Struct("!BBBI")
+HEADER_SIZE = HEADER.size
+
+# Largest payload we accept before treating the stream as corrupt
+MAX_PAYLOAD_SIZE = 64 * 1024 * 1024
+
+# Payloads smaller than this are joined with their header into a single send
+SMALL_PAYLOAD_SIZE = 64 * 1024
+
+
+class ProtocolError(Exception):
+    """Raised when the peer sends a frame we cannot parse"""
+    pass
+
+
+# Fixed width field encoders
+_FIXED_CODES = {
+    "bool": "?",
+    "u8": "B",
+    "u16": "H",
+    "u32": "I",
+    "u64": "Q",
+    "i64": "q",
+    "f32": "f",
+    "f64": "d",
+}
+_FIXED_FIELDS = {kind: struct.Struct("!" + code) for kind, code in _FIXED_CODES.items()}
+
+_FIELD_DEFAULTS = {"str": "", "bytes": b"", "bool": False}
+
+# Width codes for the length column of a string/bytes list column
+_LENGTH_CODES = [(0xFF, "B"), (0xFFFF, "H"), (0xFFFFFFFF, "I")]
+
+
+def _pack_varint(value, out):
+    """Append an unsigned LEB128 varint to a bytearray"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _unpack_varint(payload, offset):
+    """Read an unsigned LEB128 varint, returning (value, new_offset)"""
+    value = 0
+    shift = 0
+    while True:
+        try:
+            byte = payload[offset]
+        except IndexError:
+            raise ProtocolError("Truncated varint")
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _check_length(payload, offset, size, name):
+    """Raise if fewer than size bytes remain at offset"""
+    if offset + size > len(payload):
+        raise ProtocolError(f"Truncated field: {name}")
+
+
+class Record:
+    """An ordered list of typed fields
+    
+    Field kinds are the fixed width numbers in _FIXED_FIELDS, "str" (varint
+    length + UTF-8), "bytes" (varint length + raw bytes) or a nested Record,
+    which encodes a list of dicts.
+    
+    Lists are stored column by column: every fixed width column is packed
+    with a single struct call and every string column as one array of
+    lengths followed by the concatenated data, so encoding and decoding
+    cost a handful of C calls per column instead of work per value.
+    """
+    
+    def __init__(self, *fields):
+        for name, kind in fields:
+            if not isinstance(kind, Record) and kind not in _FIXED_FIELDS and kind not in ("str", "bytes"):
+                raise ValueError(f"Unknown field kind for {name}: {kind}")
+        self.fields = fields
+        self.names = tuple(name for name, _ in fields)
+        
+        # Decoded rows are built by a comprehension with a literal dict display,
+        # generated once from the (code defined) field names the way
+        # collections.namedtuple builds its methods: about twice as fast as
+        # dict(zip(names, row)) per row
+        if fields:
+            variables = "".join(f"_{index}, " for index in range(len(fields)))
+            display = ", ".join(f"{name!r}: _{index}" for index, name in enumerate(self.names))
+            self._rows = eval(f"lambda columns: [{{{display}}} for {variables}in zip(*columns)]")
+    
+    def encode_into(self, message, out):
+        """Append the encoding of one dict to a bytearray"""
+        for name, kind in self.fields:
+            value = message.get(name)
+            if value is None:
+                value = _FIELD_DEFAULTS.get(kind, 0) if not isinstance(kind, Record) else []
+            
+            if isinstance(kind, Record):
+                kind.encode_list(value, out)
+            elif kind == "str" or kind == "bytes":
+                if kind == "str":
+                    value = value.encode("utf-8", "replace")
+                _pack_varint(len(value), out)
+                out += value
+            else:
+                out += _FIXED_FIELDS[kind].pack(value)
+    
+    def decode_from(self, payload, offset, message):
+        """Fill a dict from the payload, returning the new offset"""
+        for name, kind in self.fields:
+            if isinstance(kind, Record):
+                message[name], offset = kind.decode_list(payload, offset)
+            elif kind == "str" or kind == "bytes":
+                length, offset = _unpack_varint(payload, offset)
+                _check_length(payload, offset, length, name)
+                raw = payload[offset:offset + length]
+                message[name] = str(raw, "utf-8", "replace") if kind == "str" else bytes(raw)
+                offset += length
+            else:
+                codec = _FIXED_FIELDS[kind]
+                _check_length(payload, offset, codec.size, name)
+                message[name] = codec.unpack_from(payload, offset)[0]
+                offset += codec.size
+        return offset
+    
+    def encode_list(self, items, out):
+        """Append a list of dicts in columnar form"""
+        count = len(items)
+        _pack_varint(count, out)
+        if not count:
+            return
+        
+        for name, kind in self.fields:
+            if isinstance(kind, Record):
+                # Nested lists are rare enough to encode item by item
+                for item in items:
+                    kind.encode_list(item.get(name) or [], out)
+                continue
+            
+            # map() keeps the per item work in C; None only needs a second pass when present
+            column = list(map(dict.get, items, repeat(name)))
+            if None in column:
+                default = _FIELD_DEFAULTS.get(kind, 0)
+                column = [default if value is None else value for value in column]
+            
+            if kind in _FIXED_CODES:
+                out += struct.pack(f"!{count}{_FIXED_CODES[kind]}", *column)
+                continue
+            
+            if kind == "str":
+                text = "".join(column)
+                if text.isascii():
+                    # Pure ASCII: character counts are byte counts, so encode the column at once
+                    lengths = list(map(len, column))
+                    column = [text.encode("ascii")]
+                else:
+                    column = [value.encode("utf-8", "replace") for value in column]
+                    lengths = list(map(len, column))
+            else:
+                lengths = list(map(len, column))
+            longest = max(lengths)
+            for index, (limit, code) in enumerate(_LENGTH_CODES):
+                if longest <= limit:
+                    break
+            out.append(index)
+            out += struct.pack(f"!{count}{code}", *lengths)
+            out += b"".join(column)
+    
+    def decode_list(self, payload, offset):
+        """Read a columnar list of dicts, returning (items, new_offset)"""
+        count, offset = _unpack_varint(payload, offset)
+        if not count:
+            return [], offset
+        
+        columns = []
+        for name, kind in self.fields:
+            if isinstance(kind, Record):
+                column = []
+                for _ in range(count):
+                    value, offset = kind.decode_list(payload, offset)
+                    column.append(value)
+                columns.append(column)
+                continue
+            
+            if kind in _FIXED_CODES:
+                column_struct = struct.Struct(f"!{count}{_FIXED_CODES[kind]}")
+                _check_length(payload, offset, column_struct.size, name)
+                columns.append(column_struct.unpack_from(payload, offset))
+                offset += column_struct.size
+                continue
+            
+            _check_length(payload, offset, 1, name)
+            width = payload[offset]
+            if width >= len(_LENGTH_CODES):
+                raise ProtocolError(f"Bad length width in column: {name}")
+            lengths_struct = struct.Struct(f"!{count}{_LENGTH_CODES[width][1]}")
+            offset += 1
+            _check_length(payload, offset, lengths_struct.size, name)
+            lengths = lengths_struct.unpack_from(payload, offset)
+            offset += lengths_struct.size
+            
+            total = sum(lengths)
+            _check_length(payload, offset, total, name)
+            blob = bytes(payload[offset:offset + total])
+            offset += total
+            
+            bounds = list(accumulate(lengths, initial=0))
+            if kind == "str":
+                text = blob.decode("utf-8", "replace")
+                if len(text) == total:
+                    # Pure ASCII: byte offsets are character offsets
+                    columns.append([text[start:end] for start, end in zip(bounds, bounds[1:])])
+                    continue
+                columns.append([blob[start:end].decode("utf-8", "replace") for start, end in zip(bounds, bounds[1:])])
+            else:
+                columns.append([blob[start:end] for start, end in zip(bounds, bounds[1:])])
+        
+        return self._rows(columns), offset
+
+
+class MessageSchema(Record):
+    """Wire layout for one message type
+    
+    `key` is the dict key naming the message ("type" for client messages,
+    "command" for admin commands) and `trailing` optionally names a bytes
+    field sent raw after the structured fields, with no length prefix and
+    no copy on the sending side.
+    """
+    
+    def __init__(self, msg_type, key, name, *fields, trailing=None):
+        super().__init__(*fields)
+        self.msg_type = msg_type
+        self.key = key
+        self.name = name
+        self.trailing = trailing
+    
+    def encode(self, message):
+        """Encode a message dict into a list of buffers to send in order"""
+        out = bytearray()
+        self.encode_into(message, out)
+        if self.trailing is None:
+            return [out]
+        return [out, message.get(self.trailing) or b""]
+    
+    def decode(self, payload):
+        """Decode a frame payload into a message dict"""
+        message = {self.key: self.name}
+        offset = self.decode_from(payload, 0, message)
+        if self.trailing is not None:
+            message[self.trailing] = bytes(payload[offset:])
+        elif offset != len(payload):
+            raise ProtocolError(f"Trailing garbage in {self.name} message")
+        return message
+
+
+WINDOW_RECORD = Record(("id", "u32"), ("hwnd", "u64"), ("title", "str"), ("process", "str"))
+WINDOW_ID_RECORD = Record(("id", "u32"))
+WINDOW_TITLE_RECORD = Record(("id", "u32"), ("title", "str"))
+# Visit timestamps are unix microseconds, formatted only where they are displayed
+HISTORY_RECORD = Record(("url", "str"), ("title", "str"), ("timestamp", "i64"), ("browser", "str"),
+                        ("visit_id", "i64"))
+TILE_RECORD = Record(("x", "u16"), ("y", "u16"), ("data", "bytes"))
+
+# Admin -> client commands
+CMD_GET_SCREENSHOT = 1
+CMD_GET_WINDOWS = 2
+CMD_GET_HISTORY = 3
+CMD_VIEW_WINDOW = 4
+CMD_PAUSE_MONITORING = 5
+CMD_FREEZE_SCREEN = 6
+CMD_START_STREAM = 7
+CMD_STOP_STREAM = 8
+CMD_DISCONNECT = 9
+CMD_STREAM_ACK = 10
+
+# Client -> admin messages
+MSG_SCREENSHOT = 32
+MSG_WINDOWS_LIST = 33
+MSG_BROWSER_HISTORY = 34
+MSG_VIEW_STATUS = 35
+MSG_FREEZE_STATUS = 36
+MSG_FRAME_TILES = 37
+MSG_WINDOWS_DELTA = 38
+MSG_CLIENT_INFO = 39
+
+SCHEMAS = [
+    MessageSchema(CMD_GET_SCREENSHOT, "command", "get_screenshot"),
+    MessageSchema(CMD_GET_WINDOWS, "command", "get_windows", ("full", "bool")),
+    MessageSchema(CMD_GET_HISTORY, "command", "get_history", ("full", "bool")),
+    MessageSchema(CMD_VIEW_WINDOW, "command", "view_window", ("window_id", "u32")),
+    MessageSchema(CMD_PAUSE_MONITORING, "command", "pause_monitoring", ("paused", "bool")),
+    MessageSchema(CMD_FREEZE_SCREEN, "command", "freeze_screen", ("freeze", "bool")),
+    MessageSchema(CMD_START_STREAM, "command", "start_stream"),
+    MessageSchema(CMD_STOP_STREAM, "command", "stop_stream"),
+    MessageSchema(CMD_DISCONNECT, "command", "disconnect"),
+    MessageSchema(CMD_STREAM_ACK, "command", "stream_ack", ("seq", "u32")),
+    
+    MessageSchema(MSG_SCREENSHOT, "type", "screenshot", trailing="data"),
+    MessageSchema(MSG_WINDOWS_LIST, "type", "windows_list", ("seq", "u32"), ("data", WINDOW_RECORD)),
+    MessageSchema(MSG_WINDOWS_DELTA, "type", "windows_delta",
+                  ("base", "u32"), ("seq", "u32"), ("added", WINDOW_RECORD),
+                  ("removed", WINDOW_ID_RECORD), ("changed", WINDOW_TITLE_RECORD)),
+    MessageSchema(MSG_BROWSER_HISTORY, "type", "browser_history",
+                  ("browser", "str"), ("full", "bool"), ("data", HISTORY_RECORD)),
+    MessageSchema(MSG_VIEW_STATUS, "type", "view_status",
+                  ("window_id", "u32"), ("title", "str"), ("status", "str")),
+    MessageSchema(MSG_FREEZE_STATUS, "type", "freeze_status", ("status", "str"), ("message", "str")),
+    MessageSchema(MSG_CLIENT_INFO, "type", "client_info", ("hostname", "str")),
+    MessageSchema(MSG_FRAME_TILES, "type", "frame_tiles",
+                  ("seq", "u32"), ("width", "u16"), ("height", "u16"), ("keyframe", "bool"),
+                  ("change", "f32"), ("tiles", TILE_RECORD)),
+]
+
+SCHEMAS_BY_TYPE = {schema.msg_type: schema for schema in SCHEMAS}
+SCHEMAS_BY_NAME = {(schema.key, schema.name): schema for schema in SCHEMAS}
+
+
+def encode_message(message):
+    """Encode a message dict, returning (msg_type, [buffers])"""
+    if "command" in message:
+        schema = SCHEMAS_BY_NAME.get(("command", message["command"]))
+    else:
+        schema = SCHEMAS_BY_NAME.get(("type", message.get("type")))
+    
+    if schema is None:
+        raise ProtocolError(f"No schema for message: {message.get('command') or message.get('type')}")
+    
+    return schema.msg_type, schema.encode(message)
+
+
+def decode_message(msg_type, payload):
+    """Decode a received frame payload back into a message dict"""
+    schema = SCHEMAS_BY_TYPE.get(msg_type)
+    if schema is None:
+        raise ProtocolError(f"Unknown message type: {msg_type}")
+    return schema.decode(payload)
+
+
+def pack_header(msg_type, payload_length, flags=0):
+    """Build the fixed size header for a frame"""
+    return HEADER.pack(PROTOCOL_VERSION, msg_type, flags, payload_length)
+
+
+def unpack_header(buffer, offset=0, max_payload=MAX_PAYLOAD_SIZE):
+    """Parse and validate a frame header, returning (msg_type, flags, length)"""
+    version, msg_type, flags, length = HEADER.unpack_from(buffer, offset)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version: {version}")
+    if length > max_payload:
+        raise ProtocolError(f"Frame too large: {length} bytes")
+    return msg_type, flags, length
+
+
+def send_frame(sock, msg_type, parts, flags=0):
+    """Send a single framed message made of one or more buffers"""
+    length = sum(len(part) for part in parts)
+    header = pack_header(msg_type, length, flags)
+    
+    if length < SMALL_PAYLOAD_SIZE:
+        # One syscall for small messages such as commands
+        sock.sendall(b"".join([header, *parts]))
+    else:
+        # Avoid copying large payloads just to prepend the header
+        sock.sendall(header)
+        for part in parts:
+            if part:
+                sock.sendall(part)
+
+
+def send_message(sock, message):
+    """Encode a message dict and send it as a single frame"""
+    msg_type, parts = encode_message(message)
+    send_frame(sock, msg_type, parts)
+
+
+class FrameReader:
+    """Incremental frame parser backed by a reusable receive buffer
+    
+    Data is received straight into a preallocated bytearray with recv_into and
+    complete frames are sliced out of it in place, so parsing costs are linear
+    in the number of bytes received no matter how large frames get or how many
+    arrive back to back in a single recv.
+    """
+    
+    def __init__(self, initial_size=256 * 1024, max_payload=MAX_PAYLOAD_SIZE):
+        self.buffer = bytearray(initial_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # Offset of the first unparsed byte
+        self.end = 0    # Offset one past the last received byte
+        self.max_payload = max_payload
+    
+    def _ensure_space(self, needed):
+        """Make room for at least `needed` more bytes after self.end"""
+        if len(self.buffer) - self.end >= needed:
+            return
+        
+        pending = self.end - self.start
+        
+        if len(self.buffer) - pending >= needed:
+            # Enough room once the unparsed tail is moved to the front
+            self.buffer[:pending] = self.view[self.start:self.end]
+        else:
+            # Grow geometrically so a stream of large frames is still linear.
+            # A fresh buffer is allocated instead of resizing in place because
+            # payload views handed out earlier may still reference the old one.
+            new_size = max(len(self.buffer) * 2, pending + needed)
+            new_buffer = bytearray(new_size)
+            new_buffer[:pending] = self.view[self.start:self.end]
+            self.buffer = new_buffer
+            self.view = memoryview(new_buffer)
+        
+        self.start = 0
+        self.end = pending
+    
+    def _next_frame_size(self):
+        """Return the full size of the next frame if its header has arrived"""
+        if self.end - self.start < HEADER_SIZE:
+            return None
+        
+        _, _, length = unpack_header(self.buffer, self.start, self.max_payload)
+        return HEADER_SIZE + length
+    
+    def recv_from(self, sock):
+        """Receive once from the socket into the buffer
+        
+        Returns the number of bytes read, 0 when the peer closed the connection.
+        """
+        frame_size = self._next_frame_size()
+        pending = self.end - self.start
+        
+        # Reserve room for the whole of a partially received frame
+        wanted = frame_size - pending if frame_size else HEADER_SIZE
+        self._ensure_space(max(wanted, 4096))
+        
+        received = sock.recv_into(self.view[self.end:])
+        self.end += received
+        return received
+    
+    def feed(self, data):
+        """Append already received bytes to the buffer"""
+        self._ensure_space(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+    
+    def frames(self):
+        """Yield (msg_type, flags, payload) for every complete frame buffered
+        
+        The payload is a memoryview into the receive buffer and is only valid
+        until the next call to recv_from or feed.
+        """
+        while True:
+            frame_size = self._next_frame_size()
+            if frame_size is None or self.end - self.start < frame_size:
+                break
+            
+            _, msg_type, flags, _ = HEADER.unpack_from(self.buffer, self.start)
+            payload = self.view[self.start + HEADER_SIZE:self.start + frame_size]
+            self.start += frame_size
+            yield msg_type, flags, payload
+        
+        # Rewind to the front of the buffer once everything has been consumed
+        if self.start == self.end:
+            self.start = 0
+            self.end = 0
@@ -0,0 +1,513 @@
+import os
+import mmap
+import struct
+import threading
+import logging
+import time
+from collections import deque, OrderedDict
+import numpy as np
+
+from nikimonitorscreenPROTOCOL import (PROTOCOL_VERSION, HEADER, HEADER_SIZE, MSG_SCREENSHOT, MSG_FRAME_TILES,
+                                       TILE_RECORD, MessageSchema, ProtocolError, pack_header, decode_message)
+from nikimonitorscreenSTREAM import merge_frame_messages
+
+# Session recordings written by the admin
+#
+# Every screen update a client sends is appended, exactly as it arrived on
+# the wire, to rolling segment files on disk. Each segment is a plain stream
+# of protocol frames (header + payload) with a sidecar index of fixed size
+# entries: when the update arrived, where its frame starts, how long it is,
+# whether it is a keyframe and how much of the screen it changed. Finding a
+# moment is a binary search over the index instead of a scan of the frames,
+# and every segment starts with a keyframe, so it decodes on its own.
+#
+# Layout: <directory>/<started>_<host>_<session id>/<segment>.seg and .idx
+#
+# Frames keep the protocol version they arrived with, and a protocol bump
+# must not make older recordings unplayable, so they are read back with the
+# layout of their own version (see decode_recorded).
+
+# Index entry: arrival time (unix microseconds), frame offset, frame length,
+# flags, changed share of the screen
+INDEX_ENTRY = struct.Struct("!qIIBf")
+INDEX_DTYPE = np.dtype([("time", ">i8"), ("offset", ">u4"), ("length", ">u4"), ("flags", "u1"), ("change", ">f4")])
+FLAG_KEYFRAME = 0x01
+
+RECORDED_TYPES = (MSG_SCREENSHOT, MSG_FRAME_TILES)
+
+# Oldest protocol version recordings were written with
+FIRST_RECORDED_VERSION = 6
+
+# Layouts of recorded types in older protocol versions, where they differ
+# from the current ones. A protocol change to a recorded type must add the
+# old layout here for every version it applied to.
+RECORDED_LAYOUTS = {
+    6: {MSG_FRAME_TILES: MessageSchema(MSG_FRAME_TILES, "type", "frame_tiles",
+                                       ("seq", "u32"), ("width", "u16"), ("height", "u16"), ("keyframe", "bool"),
+                                       ("tiles", TILE_RECORD))},
+}
+
+# Start of frame markers carry the image size; C4, C8 and CC are other markers
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data):
+    """Return (width, height) from a JPEG's headers, or None if there are none"""
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from("!HH", data, offset + 5)
+            return width, height
+        offset += 2 + int.from_bytes(data[offset + 2:offset + 4], "big")
+    return None
+
+
+def change_ratio(message):
+    """Share of the screen that changed with a recorded update
+    
+    Stream updates carry the client's own measurement, so a periodic
+    keyframe of an idle screen still counts as unchanged. A screenshot
+    counts as a whole new screen.
+    """
+    if message.get("type") != "frame_tiles":
+        return 1.0
+    return message["change"]
+
+
+class Segment:
+    """One open segment file and its index, appended to by the writer thread"""
+    
+    def __init__(self, directory, number, started):
+        self.number = number
+        self.started = started  # Arrival time of the first frame, unix microseconds
+        self.path = os.path.join(directory, f"{number:06d}.seg")
+        self.data = open(self.path, "ab")
+        self.index = open(os.path.join(directory, f"{number:06d}.idx"), "ab")
+        self.size = self.data.tell()
+        self.entries = 0
+    
+    def append(self, timestamp, msg_type, payload, flags, change):
+        header = pack_header(msg_type, len(payload))
+        self.data.write(header)
+        self.data.write(payload)
+        self.index.write(INDEX_ENTRY.pack(timestamp, self.size, len(header) + len(payload), flags, change))
+        self.size += len(header) + len(payload)
+        self.entries += 1
+    
+    def flush(self):
+        # Frames first, so an index entry never points past the end of its segment
+        self.data.flush()
+        self.index.flush()
+    
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+
+class SessionRecorder:
+    """Append every client's screen updates to segment files on a writer thread
+    
+    record() is called on the network thread for every message and only
+    appends to an in-memory queue, never touching the disk. The writer
+    thread takes everything queued at once, writes it and flushes each
+    touched file once per batch.
+    
+    A recording is only useful from a keyframe on, so a session's updates
+    are skipped until its first keyframe. If the disk cannot keep up and
+    the queue fills, that session's updates are dropped up to its next
+    keyframe rather than recording tiles with nothing under them. A new
+    segment is started at the first keyframe after the current one has
+    reached `segment_bytes` or `segment_seconds`.
+    
+    Whenever a segment is started, and once on start, the oldest closed
+    segments of any recording in `directory` are deleted while they are
+    older than `max_age` seconds or all segments together take more than
+    `max_bytes`; None disables either limit. A recording folder goes with
+    its last segment. The total can exceed `max_bytes` by about one
+    segment per connected client.
+    """
+    
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, segment_seconds=300, queue_size=1024,
+                 max_bytes=None, max_age=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        
+        self.items = deque()    # (kind, session_id, ...) waiting for the writer
+        self.synced = set()     # Sessions whose queued updates start at a keyframe
+        self.sessions = {}      # session_id -> recording directory, writer thread only
+        self.segments = {}      # session_id -> open Segment, writer thread only
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+        
+        self.written = 0
+        self.bytes_written = 0
+        self.skipped = 0        # Updates before a session's first keyframe
+        self.dropped = 0        # Updates lost because the writer fell behind
+        self.segments_written = 0
+        self.segments_deleted = 0
+        self.bytes_deleted = 0
+    
+    def start(self):
+        """Start the writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self.thread.start()
+    
+    def begin(self, session_id, address):
+        """Start a recording for a newly connected client"""
+        host = str(address[0]).replace(":", "-") if address else "unknown"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{host}_{session_id}"
+        with self.condition:
+            self.items.append(("begin", session_id, os.path.join(self.directory, name)))
+            self.condition.notify()
+    
+    def end(self, session_id):
+        """Close a client's recording once everything queued for it is written"""
+        with self.condition:
+            self.synced.discard(session_id)
+            self.items.append(("end", session_id))
+            self.condition.notify()
+    
+    def record(self, session_id, msg_type, payload, message):
+        """Queue a received message for recording; returns without waiting"""
+        if msg_type not in RECORDED_TYPES:
+            return
+        keyframe = msg_type == MSG_SCREENSHOT or message["keyframe"]
+        timestamp = time.time_ns() // 1000
+        with self.condition:
+            if self.closed:
+                return
+            if len(self.items) >= self.queue_size:
+                # Everything after this for the session is useless until a keyframe
+                self.synced.discard(session_id)
+                self.dropped += 1
+                return
+            if not keyframe and session_id not in self.synced:
+                self.skipped += 1
+                return
+            self.synced.add(session_id)
+            self.items.append(("frame", session_id, timestamp, msg_type, payload, message, keyframe))
+            self.condition.notify()
+    
+    def close(self, timeout=10.0):
+        """Write out everything queued, close every segment and stop the writer"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+    
+    def stats(self):
+        """Counters for the log"""
+        with self.condition:
+            return {"written": self.written, "bytes": self.bytes_written, "segments": self.segments_written,
+                    "skipped": self.skipped, "dropped": self.dropped, "queued": len(self.items),
+                    "deleted": self.segments_deleted, "bytes_deleted": self.bytes_deleted}
+    
+    def _run(self):
+        try:
+            self._enforce_retention()
+        except OSError as e:
+            logging.error(f"Error cleaning up session recordings: {e}")
+        
+        while True:
+            with self.condition:
+                while not self.items and not self.closed:
+                    self.condition.wait()
+                if not self.items:
+                    break
+                batch = list(self.items)
+                self.items.clear()
+            
+            try:
+                self._write(batch)
+            except OSError as e:
+                logging.error(f"Error writing session recording: {e}")
+        
+        for session_id in list(self.segments):
+            self._close_segment(session_id)
+    
+    def _write(self, batch):
+        touched = set()
+        rolled = False
+        for item in batch:
+            kind, session_id = item[0], item[1]
+            if kind == "begin":
+                os.makedirs(item[2], exist_ok=True)
+                self.sessions[session_id] = item[2]
+                continue
+            if kind == "end":
+                self._close_segment(session_id)
+                self.sessions.pop(session_id, None)
+                continue
+            
+            _, _, timestamp, msg_type, payload, message, keyframe = item
+            directory = self.sessions.get(session_id)
+            if directory is None:
+                continue
+            
+            segment = self.segments.get(session_id)
+            if keyframe and (segment is None or segment.size >= self.segment_bytes
+                             or timestamp - segment.started >= self.segment_seconds * 1_000_000):
+                number = segment.number + 1 if segment is not None else 1
+                self._close_segment(session_id)
+                segment = self.segments[session_id] = Segment(directory, number, timestamp)
+                rolled = True
+            if segment is None:
+                continue
+            
+            segment.append(timestamp, msg_type, payload, FLAG_KEYFRAME if keyframe else 0, change_ratio(message))
+            touched.add(segment)
+            self.written += 1
+            self.bytes_written += len(payload)
+        
+        for segment in touched:
+            if not segment.data.closed:
+                segment.flush()
+        
+        if rolled:
+            self._enforce_retention()
+    
+    def _enforce_retention(self):
+        """Delete the oldest closed segments until the recordings are within max_age and max_bytes"""
+        if self.max_bytes is None and self.max_age is None:
+            return
+        
+        segments = []  # (last written, path without extension, bytes)
+        for recording in os.scandir(self.directory):
+            if not recording.is_dir():
+                continue
+            for entry in os.scandir(recording.path):
+                if not entry.name.endswith(".seg"):
+                    continue
+                base = entry.path[:-4]
+                stat = entry.stat()
+                size = stat.st_size + (os.path.getsize(base + ".idx") if os.path.exists(base + ".idx") else 0)
+                segments.append((stat.st_mtime, base, size))
+        segments.sort()
+        
+        total = sum(size for _, _, size in segments)
+        cutoff = time.time() - self.max_age if self.max_age is not None else None
+        open_segments = {segment.path[:-4] for segment in self.segments.values()}
+        active = set(self.sessions.values())
+        for modified, base, size in segments:
+            if (self.max_bytes is None or total <= self.max_bytes) and (cutoff is None or modified >= cutoff):
+                break
+            if base in open_segments:
+                continue
+            try:
+                # Index first: a segment without its index is never listed for playback
+                if os.path.exists(base + ".idx"):
+                    os.remove(base + ".idx")
+                os.remove(base + ".seg")
+            except OSError as e:
+                # Most likely mapped by a playback on Windows; try again next time
+                logging.warning(f"Could not delete recording segment {base}: {e}")
+                continue
+            total -= size
+            self.segments_deleted += 1
+            self.bytes_deleted += size
+            
+            folder = os.path.dirname(base)
+            if folder not in active and not os.listdir(folder):
+                os.rmdir(folder)
+    
+    def _close_segment(self, session_id):
+        segment = self.segments.pop(session_id, None)
+        if segment is not None:
+            segment.close()
+            self.segments_written += 1
+
+
+def decode_recorded(buffer, offset):
+    """Decode the recorded frame at `offset`, in the layout of the protocol version it was recorded with"""
+    version, msg_type, _, length = HEADER.unpack_from(buffer, offset)
+    if not FIRST_RECORDED_VERSION <= version <= PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported recording version: {version}")
+    
+    schema = RECORDED_LAYOUTS.get(version, {}).get(msg_type)
+    view = memoryview(buffer)
+    try:
+        payload = view[offset + HEADER_SIZE:offset + HEADER_SIZE + length]
+        return decode_message(msg_type, payload) if schema is None else schema.decode(payload)
+    finally:
+        view.release()
+
+
+def as_frame_message(message):
+    """Return a recorded update as a frame_tiles message; screenshots become keyframes"""
+    if message.get("type") == "frame_tiles":
+        return message
+    width, height = jpeg_size(message["data"]) or (0, 0)
+    return {"type": "frame_tiles", "seq": 0, "width": width, "height": height, "keyframe": True,
+            "change": 1.0, "tiles": [{"x": 0, "y": 0, "data": message["data"]}]}
+
+
+class SegmentReader:
+    """Memory mapped view of one recorded segment and its index
+    
+    Nothing is read up front: the index is a numpy view straight onto the
+    mapped .idx file, and frames are decoded from the mapped .seg file when
+    asked for. An index entry cut short by a crash, or pointing past the end
+    of the frames, is ignored.
+    """
+    
+    def __init__(self, data_path, index_path):
+        self.data_file = open(data_path, "rb")
+        self.index_file = open(index_path, "rb")
+        self.data = mmap.mmap(self.data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index_map = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        index = np.frombuffer(self.index_map, INDEX_DTYPE, count=len(self.index_map) // INDEX_DTYPE.itemsize)
+        valid = len(index)
+        while valid and int(index["offset"][valid - 1]) + int(index["length"][valid - 1]) > len(self.data):
+            valid -= 1
+        self.index = index[:valid]
+        self.keyframes = np.flatnonzero(self.index["flags"] & FLAG_KEYFRAME)
+    
+    def __len__(self):
+        return len(self.index)
+    
+    def position(self, timestamp):
+        """Index of the last update at or before a time, or -1 if there is none"""
+        return int(np.searchsorted(self.index["time"], timestamp, side="right")) - 1
+    
+    def keyframe_before(self, position):
+        """Index of the last keyframe at or before an update"""
+        at = int(np.searchsorted(self.keyframes, position, side="right")) - 1
+        return int(self.keyframes[at]) if at >= 0 else 0
+    
+    def message(self, position):
+        """Decode one recorded update"""
+        message = decode_recorded(self.data, int(self.index["offset"][position]))
+        if message["type"] == "frame_tiles":
+            # Updates recorded before they carried it have the change in the index
+            message.setdefault("change", float(self.index["change"][position]))
+        return message
+    
+    def close(self):
+        # The numpy views hold exports of the index map; drop them before closing it
+        self.index = self.keyframes = None
+        self.data.close()
+        self.index_map.close()
+        self.data_file.close()
+        self.index_file.close()
+
+
+class Recording:
+    """A recorded session for playback: seek, step and skip through its segments
+    
+    Only the first and last time of every segment are read when opening;
+    at most `open_segments` segments are mapped at once, least recently
+    used first out, so memory stays flat however long the recording is.
+    Times are unix microseconds.
+    """
+    
+    def __init__(self, directory, open_segments=4):
+        self.directory = directory
+        self.open_segments = open_segments
+        self.readers = OrderedDict()  # segment number -> SegmentReader
+        
+        self.numbers = []
+        starts, ends = [], []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".idx"):
+                continue
+            path = os.path.join(directory, name)
+            entries = os.path.getsize(path) // INDEX_ENTRY.size
+            if not entries or not os.path.exists(path[:-4] + ".seg"):
+                continue
+            with open(path, "rb") as f:
+                first = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+                f.seek((entries - 1) * INDEX_ENTRY.size)
+                last = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+            self.numbers.append(int(name[:-4]))
+            starts.append(first[0])
+            ends.append(last[0])
+        self.starts = np.array(starts, np.int64)
+        self.ends = np.array(ends, np.int64)
+    
+    def __len__(self):
+        return len(self.numbers)
+    
+    @property
+    def start(self):
+        return int(self.starts[0])
+    
+    @property
+    def end(self):
+        return int(self.ends[-1])
+    
+    def _reader(self, segment):
+        number = self.numbers[segment]
+        reader = self.readers.get(number)
+        if reader is not None:
+            self.readers.move_to_end(number)
+            return reader
+        
+        base = os.path.join(self.directory, f"{number:06d}")
+        reader = self.readers[number] = SegmentReader(base + ".seg", base + ".idx")
+        while len(self.readers) > self.open_segments:
+            self.readers.popitem(last=False)[1].close()
+        return reader
+    
+    def _locate(self, timestamp):
+        """(segment, reader, position) of the last update at or before a time, clamped to the recording"""
+        segment = max(0, int(np.searchsorted(self.starts, timestamp, side="right")) - 1)
+        reader = self._reader(segment)
+        return segment, reader, max(0, min(reader.position(timestamp), len(reader) - 1))
+    
+    def frame_at(self, timestamp):
+        """The screen at a time, as one frame_tiles message from the keyframe before it"""
+        _, reader, position = self._locate(timestamp)
+        message = None
+        for at in range(reader.keyframe_before(position), position + 1):
+            update = as_frame_message(reader.message(at))
+            message = update if message is None else merge_frame_messages(message, update)
+        return message
+    
+    def updates_between(self, after, until, limit=None):
+        """Updates recorded after one time up to and including another, oldest first
+        
+        Returns None instead if there are more than `limit` of them, when
+        seeking with frame_at() is cheaper than applying them all.
+        """
+        segment, reader, position = self._locate(after)
+        if reader.index["time"][position] > after:
+            position -= 1  # `after` is before the first update
+        
+        updates = []
+        while True:
+            stop = reader.position(until) + 1
+            if limit is not None and len(updates) + stop - position - 1 > limit:
+                return None
+            updates.extend(as_frame_message(reader.message(at)) for at in range(position + 1, stop))
+            segment += 1
+            if segment >= len(self.numbers) or self.starts[segment] > until:
+                return updates
+            reader, position = self._reader(segment), -1
+    
+    def next_change(self, after, min_change):
+        """Time of the first update after `after` that changed at least `min_change` of the screen"""
+        segment, reader, position = self._locate(after)
+        position = position + 1 if reader.index["time"][position] <= after else position
+        while True:
+            changes = np.flatnonzero(reader.index["change"][position:] >= min_change)
+            if len(changes):
+                return int(reader.index["time"][position + changes[0]])
+            segment += 1
+            if segment >= len(self.numbers):
+                return None
+            reader, position = self._reader(segment), 0
+    
+    def close(self):
+        """Unmap every open segment"""
+        while self.readers:
+            self.readers.popitem()[1].close()
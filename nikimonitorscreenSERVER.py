@@ -0,0 +1,340 @@
+import asyncio
+import threading
+import logging
+import itertools
+import time
+from collections import OrderedDict
+
+from nikimonitorscreenPROTOCOL import (HEADER_SIZE, MAX_PAYLOAD_SIZE, ProtocolError, unpack_header,
+                                       pack_header, encode_message, decode_message)
+from nikimonitorscreenSTREAM import merge_frame_messages
+
+# Admin side network server
+#
+# An asyncio TCP server runs on its own thread and accepts any number of
+# client connections. Each connection gets a ClientSession with its own
+# bounded outbox of commands. Everything a client sends is handed to the Tk
+# thread through an UpdateQueue, which the UI drains from root.after. Neither
+# side ever blocks the other:
+#
+# - a client that stops reading only fills its own outbox, and the oldest
+#   queued command is dropped
+# - when the UI falls behind, pending updates of the same kind from the same
+#   client are coalesced. Once the queue is full, sessions stop reading
+#   their sockets until the UI catches up, so the clients feel TCP
+#   backpressure instead of the admin buffering without bound.
+
+# Internal event types published alongside wire messages
+SESSION_CONNECTED = "session_connected"
+SESSION_CLOSED = "session_closed"
+
+def merge_history_messages(older, newer):
+    """Fold a pending browser_history update for one browser into the next one
+    
+    Incremental updates only carry visits the admin has not seen, so they
+    are concatenated, newest first; a full resync replaces everything.
+    """
+    if newer.get("full"):
+        return newer
+    return {**older, "data": newer["data"] + older["data"]}
+
+
+def merge_window_deltas(older, newer):
+    """Fold two consecutive pending windows_delta updates into one
+    
+    Windows added and removed again in between never reach the admin.
+    Deltas that do not follow each other are not merged; the newer one is
+    kept and the admin, seeing the gap, asks for a full list.
+    """
+    if newer["base"] != older["seq"]:
+        return newer
+    
+    added = {window["id"]: window for window in older["added"]}
+    changed = {item["id"]: item["title"] for item in older["changed"]}
+    removed = list(older["removed"])
+    for item in newer["removed"]:
+        if added.pop(item["id"], None) is None:
+            removed.append(item)
+        changed.pop(item["id"], None)
+    for item in newer["changed"]:
+        if item["id"] in added:
+            added[item["id"]] = {**added[item["id"]], "title": item["title"]}
+        else:
+            changed[item["id"]] = item["title"]
+    for window in newer["added"]:
+        added[window["id"]] = window
+    
+    return {"type": "windows_delta", "base": older["base"], "seq": newer["seq"],
+            "added": list(added.values()), "removed": removed,
+            "changed": [{"id": window_id, "title": title} for window_id, title in changed.items()]}
+
+
+# Pending updates of these types are folded into one per session
+MERGEABLE_TYPES = {
+    "frame_tiles": merge_frame_messages,
+    "browser_history": merge_history_messages,
+    "screenshot": lambda older, newer: newer,
+    "windows_list": lambda older, newer: newer,
+    "windows_delta": merge_window_deltas
+}
+
+
+class UpdateQueue:
+    """Thread-safe bounded hand-off from the server thread to the Tk thread
+    
+    Items are (session_id, message) pairs kept in arrival order. A new
+    frame_tiles, browser_history or windows_delta update is merged into a
+    still pending one from the same session, and newer snapshots (window
+    list, screenshot) replace older ones. Anything else takes a slot of its own. put() returns False
+    instead of blocking when the queue is full.
+    
+    A full windows_list also drops the session's pending windows_delta:
+    the list may take the slot of an older list queued before that delta,
+    and the delta would then be applied on top of the newer list.
+    """
+    
+    def __init__(self, maxsize=256, on_space=None):
+        self.items = OrderedDict()  # key -> (session_id, message)
+        self.maxsize = maxsize
+        self.on_space = on_space    # Called after a drain frees up room
+        self.coalesced = 0
+        self.high_water = 0
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+    
+    def put(self, session_id, message, force=False):
+        """Queue a message, returning False if there is no room for it"""
+        kind = message.get("type")
+        with self.lock:
+            if kind == "windows_list" and self.items.pop((session_id, "windows_delta", None), None) is not None:
+                self.coalesced += 1
+            
+            if kind in MERGEABLE_TYPES:
+                # History arrives in one chunk per browser, merged per browser
+                key = (session_id, kind, message.get("browser"))
+                pending = self.items.get(key)
+                if pending is not None:
+                    message = MERGEABLE_TYPES[kind](pending[1], message)
+                    self.items[key] = (session_id, message)
+                    self.coalesced += 1
+                    return True
+            else:
+                key = (session_id, kind, next(self.counter))
+            
+            if len(self.items) >= self.maxsize and not force:
+                return False
+            
+            self.items[key] = (session_id, message)
+            self.high_water = max(self.high_water, len(self.items))
+            return True
+    
+    def drain(self, limit=64):
+        """Remove and return up to `limit` of the oldest items"""
+        with self.lock:
+            was_full = len(self.items) >= self.maxsize
+            count = min(limit, len(self.items))
+            drained = [self.items.popitem(last=False)[1] for _ in range(count)]
+        
+        if drained and was_full and self.on_space is not None:
+            self.on_space()
+        return drained
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+
+class ClientSession:
+    """One connected client: its socket streams, outbox and counters"""
+    
+    def __init__(self, server, session_id, reader, writer, outbox_size=64):
+        self.server = server
+        self.id = session_id
+        self.reader = reader
+        self.writer = writer
+        self.address = writer.get_extra_info("peername")
+        self.outbox = asyncio.Queue(maxsize=outbox_size)
+        self.connected_at = time.time()
+        self.messages_in = 0
+        self.bytes_in = 0
+        self.dropped_commands = 0
+    
+    def enqueue(self, command):
+        """Queue a command for the client, dropping the oldest if it is not reading"""
+        if self.outbox.full():
+            self.outbox.get_nowait()
+            self.dropped_commands += 1
+        self.outbox.put_nowait(command)
+    
+    async def read_loop(self):
+        """Read framed messages and publish them until the client goes away"""
+        while True:
+            try:
+                header = await self.reader.readexactly(HEADER_SIZE)
+            except asyncio.IncompleteReadError:
+                return
+            
+            msg_type, flags, length = unpack_header(header, 0, self.server.max_payload)
+            payload = await self.reader.readexactly(length)
+            self.messages_in += 1
+            self.bytes_in += HEADER_SIZE + length
+            
+            message = decode_message(msg_type, payload)
+            if self.server.recorder is not None:
+                self.server.recorder.record(self.id, msg_type, payload, message)
+            await self.server.publish(self, message)
+    
+    async def write_loop(self):
+        """Send queued commands, waiting for the socket to drain after each"""
+        while True:
+            command = await self.outbox.get()
+            msg_type, parts = encode_message(command)
+            self.writer.write(pack_header(msg_type, sum(len(part) for part in parts)))
+            self.writer.writelines(parts)
+            await self.writer.drain()
+    
+    async def run(self):
+        """Serve the connection until either direction fails"""
+        writer_task = asyncio.ensure_future(self.write_loop())
+        try:
+            await self.read_loop()
+        except ProtocolError as e:
+            logging.error(f"Protocol error from {self.address}, dropping connection: {e}")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer_task.cancel()
+            self.writer.close()
+
+
+class MonitorServer:
+    """asyncio TCP server for many clients, run on a background thread
+    
+    start() and stop() are called from the Tk thread; send() and broadcast()
+    may be called from any thread. Incoming messages, plus
+    session_connected and session_closed events, arrive on `updates`. If a
+    `recorder` is given, every session and every message received is also
+    handed to it, before the message waits for room in `updates`.
+    """
+    
+    def __init__(self, host, port, updates, outbox_size=64, max_payload=MAX_PAYLOAD_SIZE, recorder=None):
+        self.host = host
+        self.port = port
+        self.updates = updates
+        self.updates.on_space = self._notify_space
+        self.outbox_size = outbox_size
+        self.max_payload = max_payload
+        self.recorder = recorder  # SessionRecorder, or None
+        
+        self.sessions = {}  # session_id -> ClientSession, only touched on the loop thread
+        self.tasks = set()  # Connection handler tasks, awaited on shutdown
+        self.session_ids = itertools.count(1)
+        self.address = None
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+        self.stopping = None
+        self.space = None
+    
+    def start(self, timeout=5.0):
+        """Start serving on a background thread, returning the bound address"""
+        self.thread = threading.Thread(target=self._run, name="monitor-server", daemon=True)
+        self.thread.start()
+        if not self.ready.wait(timeout):
+            raise RuntimeError("Server did not start in time")
+        if self.error is not None:
+            raise self.error
+        return self.address
+    
+    def stop(self, timeout=5.0):
+        """Close every session and stop the server thread"""
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stopping.set)
+            self.thread.join(timeout)
+    
+    def send(self, session_id, command):
+        """Queue a command for one client from any thread"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._send, session_id, command)
+    
+    def broadcast(self, command):
+        """Queue a command for every connected client from any thread"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._broadcast, command)
+    
+    def _send(self, session_id, command):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.enqueue(command)
+    
+    def _broadcast(self, command):
+        for session in self.sessions.values():
+            session.enqueue(command)
+    
+    def _notify_space(self):
+        """Called on the Tk thread after a drain freed up room in the queue"""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.space.set)
+    
+    async def publish(self, session, message):
+        """Hand a message to the UI, waiting for room when it has fallen behind"""
+        while not self.updates.put(session.id, message):
+            if self.stopping.is_set():
+                return
+            
+            # Not reading while we wait is what pushes back on the client
+            self.space.clear()
+            await self.space.wait()
+    
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.loop.close()
+    
+    async def _serve(self):
+        self.stopping = asyncio.Event()
+        self.space = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                backlog=1024)
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+            return
+        
+        self.address = server.sockets[0].getsockname()[:2]
+        self.ready.set()
+        logging.info(f"Monitor server listening on {self.address[0]}:{self.address[1]}")
+        
+        async with server:
+            await self.stopping.wait()
+            server.close()
+            self.space.set()  # Release sessions waiting on the UI
+            for session in list(self.sessions.values()):
+                session.writer.close()
+            if self.tasks:
+                await asyncio.wait(self.tasks, timeout=2.0)
+        logging.info("Monitor server stopped")
+    
+    async def _handle_client(self, reader, writer):
+        session = ClientSession(self, next(self.session_ids), reader, writer, self.outbox_size)
+        self.sessions[session.id] = session
+        self.tasks.add(asyncio.current_task())
+        logging.info(f"Client {session.id} connected from {session.address}")
+        if self.recorder is not None:
+            self.recorder.begin(session.id, session.address)
+        self.updates.put(session.id, {"type": SESSION_CONNECTED, "address": session.address}, force=True)
+        
+        try:
+            await session.run()
+        finally:
+            del self.sessions[session.id]
+            self.tasks.discard(asyncio.current_task())
+            logging.info(f"Client {session.id} disconnected after {session.messages_in} messages")
+            if self.recorder is not None:
+                self.recorder.end(session.id)
+            self.updates.put(session.id, {"type": SESSION_CLOSED}, force=True)
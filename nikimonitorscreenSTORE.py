@@ -0,0 +1,359 @@
+import re
+import sqlite3
+import unicodedata
+import zlib
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+# Browser history storage used by the admin
+#
+# A client can report months of browsing, far more than the UI can show as
+# widgets. The history view therefore reads pages out of a store, kept in
+# display order, and only asks for the rows that are currently on screen.
+#
+# Everything every client reports is also kept on disk in an ActivityStore,
+# an SQLite database that the history tab searches and filters.
+
+# Sites by category, matched on the domain and its parent domains
+DOMAIN_CATEGORIES = {
+    "games": ("minecraft.net", "roblox.com", "steampowered.com", "epicgames.com", "fortnite.com", "miniclip.com",
+              "poki.com", "coolmathgames.com"),
+    "video": ("youtube.com", "youtu.be", "netflix.com", "twitch.tv", "tiktok.com", "vimeo.com", "disneyplus.com"),
+    "social": ("discord.com", "facebook.com", "instagram.com", "twitter.com", "x.com", "reddit.com",
+               "snapchat.com", "whatsapp.com"),
+    "education": ("wikipedia.org", "khanacademy.org", "duolingo.com", "quizlet.com", "coursera.org",
+                  "classroom.google.com"),
+    "productivity": ("docs.google.com", "drive.google.com", "office.com", "notion.so", "github.com"),
+    "search": ("google.com", "bing.com", "duckduckgo.com", "yahoo.com", "ecosia.org"),
+}
+_CATEGORY_BY_DOMAIN = {domain: category for category, domains in DOMAIN_CATEGORIES.items() for domain in domains}
+
+
+def visit_domain(url):
+    """Host name of a visited URL without a leading www., lower case"""
+    if "://" not in url:
+        url = "//" + url  # Some rows come without a scheme
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def categorize(domain):
+    """Category of a site, from the most specific matching entry in DOMAIN_CATEGORIES"""
+    while domain:
+        category = _CATEGORY_BY_DOMAIN.get(domain)
+        if category is not None:
+            return category
+        _, _, domain = domain.partition(".")
+    return "web"
+
+
+_TERM = re.compile(r"[^\W_]+")
+
+
+def search_terms(text):
+    """Words of a text as the FTS index splits them, lower case, in order
+    
+    Words with accents are followed by their unaccented form, since the
+    index may store either.
+    """
+    terms = []
+    for term in _TERM.findall(text.lower()):
+        terms.append(term)
+        if not term.isascii():
+            plain = "".join(char for char in unicodedata.normalize("NFKD", term) if not unicodedata.combining(char))
+            if plain and plain != term:
+                terms.append(plain)
+    return terms
+
+
+def history_key(item):
+    """Display order of a visit: newest first, ties broken by browser and URL"""
+    return (-item["timestamp"], item.get("browser", ""), item["url"])
+
+
+class HistoryStore:
+    """Browser history kept sorted newest first, read a page at a time
+    
+    Rows are held in display order with a parallel list of sort keys, so a
+    page is a slice, a visit's position is a binary search, and the same
+    visit reported twice is stored once. Updates arrive as browser_history
+    messages: a full message replaces everything from that browser, an
+    incremental one is merged in.
+    """
+    
+    def __init__(self):
+        self.rows = []
+        self.keys = []  # history_key of every row, for binary search
+    
+    def apply(self, message):
+        """Apply a browser_history message, returning True if anything changed"""
+        if not message.get("full"):
+            return self.add(message["data"])
+        
+        browser = message["browser"]
+        kept = [(key, row) for key, row in zip(self.keys, self.rows) if row.get("browser") != browser]
+        changed = len(kept) != len(self.rows) or bool(message["data"])
+        self.keys = [key for key, _ in kept]
+        self.rows = [row for _, row in kept]
+        self.add(message["data"])
+        return changed
+    
+    def add(self, items):
+        """Merge visits into the store, skipping ones it already has"""
+        new = {}
+        for item in items:
+            key = history_key(item)
+            if self._position(key) is None:
+                new.setdefault(key, item)
+        if not new:
+            return False
+        
+        keys = sorted(new)
+        if not self.keys or keys[-1] < self.keys[0]:
+            # The usual case: every new visit is newer than everything stored
+            self.keys = keys + self.keys
+            self.rows = [new[key] for key in keys] + self.rows
+        elif len(keys) < 256:
+            # A few visits from another browser that land between stored ones
+            for key in keys:
+                position = bisect_left(self.keys, key)
+                self.keys.insert(position, key)
+                self.rows.insert(position, new[key])
+        else:
+            merged = sorted(zip(self.keys + keys, self.rows + [new[key] for key in keys]), key=lambda pair: pair[0])
+            self.keys = [key for key, _ in merged]
+            self.rows = [row for _, row in merged]
+        return True
+    
+    def replace(self, items):
+        """Replace the whole store"""
+        self.keys = []
+        self.rows = []
+        self.add(items)
+    
+    def index(self, item):
+        """Return the position of a visit in display order, or None"""
+        return self._position(history_key(item))
+    
+    def __getitem__(self, index):
+        """Rows by position or slice, a slice being one page of the view"""
+        return self.rows[index]
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def _position(self, key):
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return position
+        return None
+
+
+class ActivityStore:
+    """Every client's browser history in an SQLite database, searchable by text
+    
+    A visit is stored once per (client, browser, visit id), however often it
+    is reported. Rows are keyed by their visit time (unix microseconds, times
+    64, plus 6 bits of a hash of that identity), so the primary key is the
+    time index: newest first is a backwards walk of the table, or of the
+    per-client, per-domain and per-category indexes, which all end in the
+    key. An FTS5 index over titles and URLs is kept up to date by a trigger
+    and searched in key order too, so a search stops after `limit` hits
+    instead of sorting every match.
+    
+    Search words are prefixes, but an FTS5 prefix query merges the whole
+    posting list of every term it covers before returning the first hit.
+    Every term ever indexed is therefore also kept in visit_terms, and a
+    prefix is expanded there into an OR of whole terms, which FTS5 walks
+    newest first and stops early. Words shorter than `min_prefix` only
+    match whole terms; a prefix covering more than `max_expansion` terms
+    falls back to a prefix query.
+    
+    add_visits() writes a batch in one transaction. Without FTS5 in this
+    SQLite build, text search falls back to scanning with LIKE.
+    """
+    
+    min_prefix = 3
+    max_expansion = 64
+    
+    # A visit already stored is skipped; a key taken by another visit is an IntegrityError
+    _INSERT = ("INSERT INTO visits (id, client, browser, visit_id, timestamp, url, title, domain, category)"
+               " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (client, browser, visit_id) DO NOTHING")
+    
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS visits (
+                    id INTEGER PRIMARY KEY,
+                    client TEXT NOT NULL,
+                    browser TEXT NOT NULL,
+                    visit_id INTEGER NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    domain TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    UNIQUE (client, browser, visit_id)
+                );
+                CREATE INDEX IF NOT EXISTS visits_client ON visits (client);
+                CREATE INDEX IF NOT EXISTS visits_domain ON visits (client, domain);
+                CREATE INDEX IF NOT EXISTS visits_category ON visits (client, category);
+            """)
+        try:
+            with self.connection:
+                had_terms = self.connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'visit_terms'").fetchone() is not None
+                self.connection.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS visits_fts USING fts5(
+                        title, url, content='visits', content_rowid='id');
+                    CREATE TRIGGER IF NOT EXISTS visits_fts_insert AFTER INSERT ON visits BEGIN
+                        INSERT INTO visits_fts (rowid, title, url) VALUES (new.id, new.title, new.url);
+                    END;
+                    CREATE TABLE IF NOT EXISTS visit_terms (term TEXT PRIMARY KEY) WITHOUT ROWID;
+                """)
+                if not had_terms:
+                    # A store from before visit_terms: take the terms from the index itself, once
+                    self.connection.execute(
+                        "CREATE VIRTUAL TABLE temp.visits_vocab USING fts5vocab(main, visits_fts, 'row')")
+                    self.connection.execute("INSERT INTO visit_terms SELECT term FROM temp.visits_vocab")
+                    self.connection.execute("DROP TABLE temp.visits_vocab")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+    
+    @staticmethod
+    def visit_key(client, browser, visit_id, timestamp):
+        """Primary key of a visit: its time, with room for visits in the same microsecond"""
+        identity = zlib.crc32(f"{client}\0{browser}\0{visit_id}".encode("utf-8", "replace"))
+        return timestamp * 64 + (identity & 63)
+    
+    def add_visits(self, client, items):
+        """Store a batch of reported visits in one transaction, returning how many were new"""
+        rows = []
+        for item in items:
+            browser = item.get("browser", "")
+            domain = visit_domain(item["url"])
+            rows.append((self.visit_key(client, browser, item["visit_id"], item["timestamp"]),
+                         client, browser, item["visit_id"], item["timestamp"], item["url"], item["title"],
+                         domain, categorize(domain)))
+        if not rows:
+            return 0
+        
+        # Inserting in key order keeps the table and FTS index appends mostly sequential
+        rows.sort()
+        terms = []
+        if self.fts:
+            terms = [(term,) for term in set(search_terms(" ".join(f"{row[6]} {row[5]}" for row in rows)))]
+        try:
+            with self.connection:
+                added = self.connection.executemany(self._INSERT, rows).rowcount
+                self.connection.executemany("INSERT OR IGNORE INTO visit_terms VALUES (?)", terms)
+                return added
+        except sqlite3.IntegrityError:
+            pass
+        
+        # Two different visits landed on the same key; retry row by row, moving them to the next free one
+        added = 0
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO visit_terms VALUES (?)", terms)
+            for row in rows:
+                while True:
+                    try:
+                        added += self.connection.execute(self._INSERT, row).rowcount
+                        break
+                    except sqlite3.IntegrityError:
+                        row = (row[0] + 1,) + row[1:]
+        return added
+    
+    def search(self, client=None, text="", domain=None, category=None, limit=500):
+        """Newest visits matching every given filter, as history row dicts
+        
+        `text` matches words in titles and URLs, each word as a prefix.
+        `client` None searches every client.
+        """
+        conditions, params = [], []
+        for column, value in (("client", client), ("domain", domain), ("category", category)):
+            if value is not None:
+                conditions.append(f"visits.{column} = ?")
+                params.append(value)
+        
+        words = text.split()
+        if words and self.fts:
+            match = self._match(words)
+            if not match:
+                return []  # Only punctuation, which the index does not hold
+            sql = ("SELECT visits.timestamp, visits.url, visits.title, visits.browser, visits.category"
+                   " FROM visits_fts JOIN visits ON visits.id = visits_fts.rowid"
+                   " WHERE visits_fts MATCH ?" + "".join(" AND " + condition for condition in conditions) +
+                   " ORDER BY visits_fts.rowid DESC LIMIT ?")
+            params = [match] + params
+        else:
+            for word in words:
+                conditions.append("(visits.title LIKE ? ESCAPE '\\' OR visits.url LIKE ? ESCAPE '\\')")
+                pattern = "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                params += [pattern, pattern]
+            sql = ("SELECT timestamp, url, title, browser, category FROM visits" +
+                   (" WHERE " + " AND ".join(conditions) if conditions else "") +
+                   " ORDER BY visits.id DESC LIMIT ?")
+        
+        rows = self.connection.execute(sql, params + [limit]).fetchall()
+        return [{"timestamp": timestamp, "url": url, "title": title, "browser": browser, "category": category}
+                for timestamp, url, title, browser, category in rows]
+    
+    def visits(self, client=None, chunk_size=1000):
+        """Every stored visit, newest first, as lists of row dicts with the client
+        
+        Reads through a connection of its own, so the chunks can be consumed
+        on another thread while visits keep being added. In WAL mode they
+        are a snapshot of the store as it was at the first chunk.
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            sql = "SELECT client, timestamp, url, title, browser, category FROM visits"
+            params = ()
+            if client is not None:
+                sql += " WHERE client = ?"
+                params = (client,)
+            cursor = connection.execute(sql + " ORDER BY id DESC", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [{"client": client, "timestamp": timestamp, "url": url, "title": title, "browser": browser,
+                        "category": category}
+                       for client, timestamp, url, title, browser, category in rows]
+        finally:
+            connection.close()
+    
+    def _match(self, words):
+        """FTS5 query for rows containing every word, each word a prefix of a term"""
+        groups = []
+        for term in search_terms(" ".join(words)):
+            # Terms are quoted, so user input is never FTS syntax; they never contain quotes anyway
+            if len(term) < self.min_prefix:
+                groups.append(f'"{term}"')
+                continue
+            expansions = [expansion for expansion, in self.connection.execute(
+                "SELECT term FROM visit_terms WHERE term >= ? AND term < ? LIMIT ?",
+                (term, term + "\U0010ffff", self.max_expansion + 1))]
+            if not expansions or len(expansions) > self.max_expansion:
+                groups.append(f'"{term}"*')
+            else:
+                groups.append("(" + " OR ".join(f'"{expansion}"' for expansion in expansions) + ")")
+        return " AND ".join(groups)
+    
+    def count(self, client=None):
+        """Number of stored visits, for one client or all of them"""
+        if client is None:
+            return self.connection.execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM visits WHERE client = ?", (client,)).fetchone()[0]
+    
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,643 @@
+import threading
+import logging
+import time
+from collections import deque
+import numpy as np
+import cv2
+
+# Screen streaming building blocks used by the client
+#
+# These pieces are kept free of any Windows specific imports so the whole
+# streaming path can be exercised and benchmarked on any machine.
+
+
+class ChangeDetector:
+    """Cheap change test on block-mean grayscale thumbnails
+    
+    Each frame is converted to grayscale and shrunk to one pixel per `block`
+    x `block` block (an exact-ratio INTER_AREA resize, so each pixel is the
+    block mean) and compared with the thumbnail of the last frame that
+    changed. All intermediate images live in reused buffers, so a check
+    costs one pass over the frame and a few tiny ones, with no frame-sized
+    temporaries. Since the comparison is against the last
+    change, not the last frame, slow drift still adds up to a change.
+    
+    Changes too small to move any block mean past `threshold` (a single
+    faint pixel, say) can go unnoticed until the next keyframe.
+    """
+    
+    def __init__(self, block=8, threshold=1):
+        self.block = block
+        self.threshold = threshold    # Block mean difference that counts as a change
+        self.gray = None              # Reused grayscale frame, padded to whole blocks
+        self.thumbnail = None         # Reused grayscale thumbnail of the current frame
+        self.previous = None          # Grayscale thumbnail of the last change
+        self.mask = None              # Reused thresholded difference
+    
+    def detect(self, frame):
+        """Return (changed ratio, (x, y, w, h) changed region or None) for a BGR frame"""
+        block = self.block
+        height, width = frame.shape[:2]
+        size = (-(-width // block), -(-height // block))
+        
+        if self.thumbnail is None or self.gray.shape[0] < height or self.gray.shape[1] < width \
+                or self.thumbnail.shape != (size[1], size[0]):
+            # Padding stays black, so partial edge blocks are still compared
+            self.gray = np.zeros((size[1] * block, size[0] * block), np.uint8)
+            self.thumbnail = np.empty((size[1], size[0]), np.uint8)
+            self.mask = np.empty_like(self.thumbnail)
+            self.previous = None
+        
+        # Whole-block downscaling takes OpenCV's fast INTER_AREA path
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray[:height, :width])
+        cv2.resize(self.gray, size, dst=self.thumbnail, interpolation=cv2.INTER_AREA)
+        
+        if self.previous is None:
+            self.previous = self.thumbnail.copy()
+            return 1.0, (0, 0, width, height)
+        
+        cv2.absdiff(self.thumbnail, self.previous, dst=self.mask)
+        cv2.threshold(self.mask, self.threshold, 255, cv2.THRESH_BINARY, dst=self.mask)
+        changed = cv2.countNonZero(self.mask)
+        if not changed:
+            return 0.0, None
+        
+        # This frame becomes the one later frames are compared against
+        self.previous, self.thumbnail = self.thumbnail, self.previous
+        
+        # Map the changed blocks back to frame pixels
+        x, y, w, h = cv2.boundingRect(self.mask)
+        x1, y1 = x * block, y * block
+        x2, y2 = min((x + w) * block, width), min((y + h) * block, height)
+        return changed / self.mask.size, (x1, y1, x2 - x1, y2 - y1)
+
+
+class TileDeltaEncoder:
+    """Encode screen frames as JPEG tiles covering only what changed
+    
+    The frame is split into a fixed grid of tiles. Each new frame is compared
+    with what the admin last received, tile by tile, and only the dirty tiles
+    are JPEG encoded. Runs of dirty tiles on the same tile row are merged into
+    one strip to save per-JPEG overhead. A full keyframe is sent on the first
+    frame, whenever the frame size changes, every `keyframe_interval` frames
+    and whenever most of the screen changed anyway.
+    
+    A ChangeDetector runs first, so idle frames are rejected on a thumbnail
+    and the full resolution comparison only covers the changed region.
+    """
+    
+    def __init__(self, tile_size=64, threshold=30, quality=50, keyframe_interval=100,
+                 full_frame_ratio=0.5):
+        self.tile_size = tile_size
+        self.threshold = threshold                # Per-channel difference that counts as a change
+        self.quality = quality                    # JPEG quality (1-100)
+        self.keyframe_interval = keyframe_interval
+        self.full_frame_ratio = full_frame_ratio  # Send a full frame above this dirty ratio
+        
+        self.reference = None   # What the admin currently has on screen
+        self.diff = None        # Reused flat absdiff buffer, as large as the reference
+        self.detector = ChangeDetector()
+        self.change_ratio = 0.0  # Changed share of the screen in the last frame
+        self.frames_since_keyframe = 0
+        self.sequence = 0
+        self.force_keyframe = False
+    
+    def request_keyframe(self):
+        """Make the next encoded frame a full keyframe"""
+        self.force_keyframe = True
+    
+    def _encode_jpeg(self, image):
+        """JPEG encode a BGR image region"""
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        return encoded.tobytes()
+    
+    def dirty_tiles(self, frame, region=None):
+        """Return a boolean (rows, cols) grid of tiles that changed
+        
+        If `region` (x, y, w, h) is given only tiles overlapping it are compared.
+        """
+        size = self.tile_size
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        dirty = np.zeros((-(-height // size), -(-width // size)), bool)
+        
+        # Compare only the tile-aligned window around the changed region
+        if region is None:
+            row1, col1, row2, col2 = 0, 0, dirty.shape[0], dirty.shape[1]
+        else:
+            x, y, w, h = region
+            row1, col1 = y // size, x // size
+            row2, col2 = -(-(y + h) // size), -(-(x + w) // size)
+        y1, x1 = row1 * size, col1 * size
+        y2, x2 = min(row2 * size, height), min(col2 * size, width)
+        
+        window = frame[y1:y2, x1:x2]
+        if self.diff is None or self.diff.size < frame.size:
+            self.diff = np.empty(frame.size, np.uint8)
+        diff = self.diff[:window.size].reshape(window.shape)
+        cv2.absdiff(window, self.reference[y1:y2, x1:x2], dst=diff)
+        
+        # View the difference as one row of width * channels bytes per scanline;
+        # reducing over channels separately along the last axis is very slow
+        diff = diff.reshape(y2 - y1, (x2 - x1) * channels)
+        
+        # Maximum difference inside each tile, using reduceat over tile edges
+        # so partial tiles on the right and bottom edges are handled too
+        row_starts = np.arange(0, y2 - y1, size)
+        col_starts = np.arange(0, x2 - x1, size) * channels
+        tile_max = np.maximum.reduceat(np.maximum.reduceat(diff, row_starts, axis=0), col_starts, axis=1)
+        
+        dirty[row1:row2, col1:col2] = tile_max > self.threshold
+        return dirty
+    
+    def encode(self, frame):
+        """Encode a frame, returning a frame_tiles message or None if unchanged"""
+        height, width = frame.shape[:2]
+        
+        keyframe = (
+            self.force_keyframe
+            or self.reference is None
+            or self.reference.shape != frame.shape
+            or self.frames_since_keyframe >= self.keyframe_interval
+        )
+        
+        self.change_ratio, region = self.detector.detect(frame)
+        
+        if not keyframe:
+            if region is None:
+                return None
+            
+            dirty = self.dirty_tiles(frame, region)
+            dirty_count = int(dirty.sum())
+            
+            if dirty_count == 0:
+                return None
+            
+            # When most of the screen changed a single JPEG is cheaper than many tiles
+            if dirty_count > dirty.size * self.full_frame_ratio:
+                keyframe = True
+        
+        tiles = []
+        if keyframe:
+            tiles.append({"x": 0, "y": 0, "data": self._encode_jpeg(frame)})
+            # Frames may be reused capture buffers, so always copy into our own
+            if self.reference is None or self.reference.shape != frame.shape:
+                self.reference = frame.copy()
+            else:
+                np.copyto(self.reference, frame)
+            self.frames_since_keyframe = 0
+            self.force_keyframe = False
+        else:
+            size = self.tile_size
+            for row in range(dirty.shape[0]):
+                cols = np.flatnonzero(dirty[row])
+                if not len(cols):
+                    continue
+                
+                # Split the dirty columns of this row into contiguous runs
+                breaks = np.flatnonzero(np.diff(cols) > 1) + 1
+                for run in np.split(cols, breaks):
+                    y1 = row * size
+                    x1 = int(run[0]) * size
+                    y2 = min(y1 + size, height)
+                    x2 = min((int(run[-1]) + 1) * size, width)
+                    
+                    tiles.append({"x": x1, "y": y1, "data": self._encode_jpeg(frame[y1:y2, x1:x2])})
+                    
+                    # Only the regions actually sent become the new reference
+                    self.reference[y1:y2, x1:x2] = frame[y1:y2, x1:x2]
+            
+            self.frames_since_keyframe += 1
+        
+        self.sequence += 1
+        return {
+            "type": "frame_tiles",
+            "seq": self.sequence,
+            "width": width,
+            "height": height,
+            "keyframe": keyframe,
+            "change": self.change_ratio,
+            "tiles": tiles
+        }
+
+
+class FrameScaler:
+    """Scale captured screens into pooled BGR buffers
+    
+    The stream stays in one colour space from capture to JPEG: the source is
+    resized straight into a preallocated buffer and, if it came in as RGB or
+    BGRA, converted to BGR on the small scaled frame. That is one
+    read of the full-size capture per frame and no new allocations, instead
+    of a full-size conversion copy, a resize copy and a conversion back.
+    
+    The pipeline may still be encoding one buffer while the next capture is
+    written, so buffers come from a small pool and go back with release()
+    once the encoder is done with them or the frame is dropped.
+    """
+    
+    def __init__(self, pool_size=6):
+        self.pool_size = pool_size
+        self.free = []
+        self.allocated = 0
+        self.local = threading.local()  # Per-thread scratch for BGRA resizes
+        self.lock = threading.Lock()
+    
+    def acquire(self, shape):
+        """Take a free buffer of the given shape from the pool"""
+        with self.lock:
+            while self.free:
+                buffer = self.free.pop()
+                if buffer.shape == shape:
+                    return buffer
+            self.allocated += 1
+        return np.empty(shape, np.uint8)
+    
+    def release(self, buffer):
+        """Hand a buffer back to the pool"""
+        with self.lock:
+            if len(self.free) < self.pool_size:
+                self.free.append(buffer)
+    
+    def scale(self, source, scale, order="BGR"):
+        """Resize a captured BGR, RGB or BGRA frame into a pooled BGR buffer"""
+        height, width = source.shape[:2]
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        buffer = self.acquire((size[1], size[0], 3))
+        
+        if order == "BGRA":
+            # Four channel source: resize into scratch, then drop alpha
+            if size != (width, height):
+                scratch = getattr(self.local, "scratch", None)
+                if scratch is None or scratch.shape != (size[1], size[0], 4):
+                    scratch = self.local.scratch = np.empty((size[1], size[0], 4), np.uint8)
+                source = cv2.resize(source, size, dst=scratch, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(source, cv2.COLOR_BGRA2BGR, dst=buffer)
+            return buffer
+        
+        if size == (width, height):
+            np.copyto(buffer, source)
+        else:
+            cv2.resize(source, size, dst=buffer, interpolation=cv2.INTER_AREA)
+        
+        if order == "RGB":
+            cv2.cvtColor(buffer, cv2.COLOR_RGB2BGR, dst=buffer)
+        return buffer
+
+
+def merge_frame_messages(older, newer):
+    """Fold an unsent frame_tiles message into the next one
+    
+    Tiles only make sense applied in order on top of each other, so instead of
+    dropping an unsent update we prepend its tiles to the newer one. A newer
+    keyframe replaces everything before it. The changed share of the screen
+    of the merged update is at most the sum of the two.
+    """
+    if newer["keyframe"]:
+        return newer
+    
+    merged = dict(newer)
+    merged["keyframe"] = older["keyframe"]
+    merged["change"] = min(1.0, older.get("change", 0.0) + newer.get("change", 0.0))
+    merged["tiles"] = older["tiles"] + newer["tiles"]
+    return merged
+
+
+class DropOldestQueue:
+    """Bounded hand-off queue between pipeline stages
+    
+    put never blocks: when the queue is full the oldest item is discarded, so
+    a slow consumer always receives the freshest data and never stalls the
+    producer. If `merge` is given the oldest item is folded into the one
+    after it instead of being lost, otherwise `on_drop` is called with it.
+    """
+    
+    def __init__(self, maxsize=2, merge=None, on_drop=None):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.merge = merge
+        self.on_drop = on_drop
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def put(self, item):
+        """Add an item, discarding or merging the oldest if full"""
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                oldest = self.items.popleft()
+                self.dropped += 1
+                if self.merge is not None:
+                    if self.items:
+                        self.items[0] = self.merge(oldest, self.items[0])
+                    else:
+                        item = self.merge(oldest, item)
+                elif self.on_drop is not None:
+                    self.on_drop(oldest)
+            self.items.append(item)
+            self.condition.notify()
+    
+    def get(self, timeout=None):
+        """Wait for the next item, returning None on timeout or close"""
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if self.items:
+                return self.items.popleft()
+            return None
+    
+    def close(self):
+        """Wake up any waiting consumer"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class StageStats:
+    """Running timing statistics for one pipeline stage"""
+    
+    def __init__(self, smoothing=0.1):
+        self.smoothing = smoothing
+        self.count = 0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+        self.lock = threading.Lock()
+    
+    def record(self, seconds):
+        """Record the duration of one pass through the stage"""
+        ms = seconds * 1000.0
+        with self.lock:
+            self.count += 1
+            if self.count == 1:
+                self.avg_ms = ms
+            else:
+                self.avg_ms += (ms - self.avg_ms) * self.smoothing
+            self.max_ms = max(self.max_ms, ms)
+    
+    def snapshot(self):
+        """Return the current statistics as a dict"""
+        with self.lock:
+            return {"count": self.count, "avg_ms": round(self.avg_ms, 2), "max_ms": round(self.max_ms, 2)}
+
+
+class StreamPipeline:
+    """Run capture, encode and send as three concurrent stages
+    
+    Stages are connected by small DropOldestQueues. Capture runs at the target
+    frame rate on the calling thread and never waits for the encoder; the
+    encoder always works on the newest captured frame; and encoded updates
+    waiting on a slow socket are merged rather than queued up, so the admin
+    never falls behind by more than one update.
+    
+    capture() returns a frame or None, encode(frame) returns a message or None
+    and send(message) returns False once the connection is gone. If capture
+    hands out reused buffers, `release(frame)` is called once the encoder is
+    done with a frame or it was dropped unencoded.
+    """
+    
+    def __init__(self, capture, encode, send, fps, is_active, merge=None, queue_size=2,
+                 log_interval=30.0, release=None):
+        self.capture = capture
+        self.encode = encode
+        self.send = send
+        self.release = release
+        self.fps = fps
+        self.is_active = is_active
+        self.log_interval = log_interval
+        
+        self.frames = DropOldestQueue(queue_size, on_drop=release)
+        self.messages = DropOldestQueue(1 if merge else queue_size, merge=merge)
+        self.timings = {name: StageStats() for name in ("capture", "encode", "send")}
+        self.running = False
+    
+    def stats(self):
+        """Per-stage timings plus how many items each queue discarded"""
+        stats = {name: timing.snapshot() for name, timing in self.timings.items()}
+        stats["capture"]["dropped"] = self.frames.dropped
+        stats["encode"]["dropped"] = self.messages.dropped
+        return stats
+    
+    def _encode_loop(self):
+        """Encode stage: newest captured frame in, message out"""
+        while self.running:
+            frame = self.frames.get(timeout=0.5)
+            if frame is None:
+                continue
+            
+            start = time.perf_counter()
+            try:
+                message = self.encode(frame)
+            except Exception as e:
+                logging.error(f"Error encoding frame: {e}")
+                continue
+            finally:
+                if self.release is not None:
+                    self.release(frame)
+            self.timings["encode"].record(time.perf_counter() - start)
+            
+            if message is not None:
+                self.messages.put(message)
+    
+    def _send_loop(self):
+        """Send stage: one message at a time onto the socket"""
+        while self.running:
+            message = self.messages.get(timeout=0.5)
+            if message is None:
+                continue
+            
+            start = time.perf_counter()
+            if not self.send(message):
+                self.running = False
+                break
+            self.timings["send"].record(time.perf_counter() - start)
+    
+    def run(self):
+        """Run the pipeline on the calling thread until is_active() turns false"""
+        self.running = True
+        workers = [
+            threading.Thread(target=self._encode_loop, daemon=True),
+            threading.Thread(target=self._send_loop, daemon=True)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        last_log = time.time()
+        try:
+            while self.running and self.is_active():
+                start = time.perf_counter()
+                try:
+                    frame = self.capture()
+                except Exception as e:
+                    logging.error(f"Error capturing frame: {e}")
+                    time.sleep(1)  # Wait a bit before trying again
+                    continue
+                elapsed = time.perf_counter() - start
+                self.timings["capture"].record(elapsed)
+                
+                if frame is not None:
+                    self.frames.put(frame)
+                
+                # Periodically log where the time goes
+                if self.log_interval and time.time() - last_log >= self.log_interval:
+                    logging.info(f"Stream pipeline stats: {self.stats()}")
+                    last_log = time.time()
+                
+                # Pace capture to the target frame rate
+                sleep_time = 1.0 / self.fps - elapsed
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+        finally:
+            self.running = False
+            self.frames.close()
+            self.messages.close()
+            for worker in workers:
+                worker.join()
+
+
+class BitrateController:
+    """Closed-loop control of stream quality, scale and frame rate
+    
+    Every `interval` seconds the controller looks at what the send stage
+    achieved (bits per second, how much of the time the socket was busy) and
+    at how long the admin took to acknowledge frames, then moves one knob one
+    step toward `target_bps`:
+    
+    - congested (slow acks, saturated socket or over target): lower JPEG
+      quality first, then the scale, then the frame rate
+    - headroom (fast acks, idle socket, well under target): undo in the
+      reverse order, frame rate first, then scale, then quality
+    
+    Each setting stays within its (min, max) bounds and every decision is
+    logged.
+    """
+    
+    def __init__(self, target_bps=4_000_000, quality=50, scale=0.7, fps=20,
+                 quality_range=(20, 80), scale_range=(0.4, 1.0), fps_range=(5, 20),
+                 interval=1.0, latency_high=0.4, latency_low=0.15):
+        self.target_bps = target_bps
+        self.quality = quality
+        self.scale = scale
+        self.fps = fps
+        self.quality_range = quality_range
+        self.scale_range = scale_range
+        self.fps_range = fps_range
+        self.interval = interval
+        self.latency_high = latency_high  # Ack latency (s) treated as congestion
+        self.latency_low = latency_low    # Ack latency (s) that leaves room to grow
+        
+        self.lock = threading.Lock()
+        self.sent_at = {}  # seq -> time the frame finished sending
+        self._reset_window(time.time())
+        self.last_decision = None
+    
+    def _reset_window(self, now):
+        """Start a new measurement interval"""
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_send_time = 0.0
+        self.window_latencies = []
+    
+    def record_send(self, seq, size, seconds):
+        """Record a frame of `size` bytes that took `seconds` to send"""
+        with self.lock:
+            self.window_bytes += size
+            self.window_send_time += seconds
+            self.sent_at[seq] = time.time()
+            
+            # Frames that are never acknowledged must not pile up
+            if len(self.sent_at) > 256:
+                for old_seq in sorted(self.sent_at)[:128]:
+                    del self.sent_at[old_seq]
+    
+    def record_ack(self, seq):
+        """Record the admin's acknowledgement of frame `seq`"""
+        with self.lock:
+            sent = self.sent_at.pop(seq, None)
+            if sent is not None:
+                self.window_latencies.append(time.time() - sent)
+            
+            # Earlier frames were merged or lost; stop waiting for them
+            for old_seq in [s for s in self.sent_at if s < seq]:
+                del self.sent_at[old_seq]
+    
+    def _step(self, direction):
+        """Move one setting one step; direction is -1 (back off) or +1 (grow)"""
+        q_min, q_max = self.quality_range
+        s_min, s_max = self.scale_range
+        f_min, f_max = self.fps_range
+        
+        if direction < 0:
+            if self.quality > q_min:
+                self.quality = max(q_min, self.quality - 10)
+                return "quality"
+            if self.scale > s_min:
+                self.scale = max(s_min, round(self.scale - 0.1, 2))
+                return "scale"
+            if self.fps > f_min:
+                self.fps = max(f_min, int(self.fps * 0.75))
+                return "fps"
+        else:
+            if self.fps < f_max:
+                self.fps = min(f_max, self.fps + 2)
+                return "fps"
+            if self.scale < s_max:
+                self.scale = min(s_max, round(self.scale + 0.1, 2))
+                return "scale"
+            if self.quality < q_max:
+                self.quality = min(q_max, self.quality + 5)
+                return "quality"
+        return None
+    
+    def update(self, now=None):
+        """Re-evaluate the settings; returns True if anything changed"""
+        now = time.time() if now is None else now
+        with self.lock:
+            elapsed = now - self.window_start
+            if elapsed < self.interval:
+                return False
+            
+            bps = self.window_bytes * 8 / elapsed
+            busy = self.window_send_time / elapsed
+            latencies = self.window_latencies
+            latency = sorted(latencies)[len(latencies) // 2] if latencies else None
+            
+            # Frames sent but never acknowledged within the interval count as slow
+            oldest_unacked = min(self.sent_at.values(), default=None)
+            if oldest_unacked is not None and now - oldest_unacked > self.latency_high:
+                latency = max(latency or 0.0, now - oldest_unacked)
+            
+            congested = (
+                (latency is not None and latency > self.latency_high)
+                or busy > 0.8
+                or bps > self.target_bps * 1.1
+            )
+            # Only grow while frames are flowing; an idle screen tells us nothing
+            headroom = (
+                (latency is None or latency < self.latency_low)
+                and busy < 0.5
+                and 0 < bps < self.target_bps * 0.7
+            )
+            
+            self._reset_window(now)
+            
+            if congested:
+                changed = self._step(-1)
+                reason = "congested"
+            elif headroom:
+                changed = self._step(+1)
+                reason = "headroom"
+            else:
+                changed = None
+            
+            if not changed:
+                return False
+            
+            self.last_decision = {
+                "reason": reason, "changed": changed, "bps": int(bps), "busy": round(busy, 2),
+                "latency_ms": None if latency is None else int(latency * 1000),
+                "quality": self.quality, "scale": self.scale, "fps": self.fps
+            }
+            logging.info(f"Bitrate controller: {self.last_decision}")
+            return True
+
@@ -0,0 +1,126 @@
+import threading
+import itertools
+import psutil
+
+# Window list support used by the client
+#
+# Listing the open windows means resolving the process behind every visible
+# window. Asking psutil for a process name opens the process and reads its
+# image path every time, so names are cached per PID. PIDs are reused by the
+# OS, so a cached name is only trusted while the process still has the
+# create time it was cached with.
+#
+# Window ids are stable for the lifetime of a window, so once the admin has a
+# full list it can be kept current with small deltas of what was added,
+# removed or retitled.
+
+
+class ProcessNameCache:
+    """PID -> process name cache, validated by process create time
+    
+    resolve() takes every PID seen in one window enumeration and checks each
+    distinct PID once: a cached entry is kept only if a process with that PID
+    is still running and was created at the same time. Entries for PIDs that
+    did not show up are evicted, so the cache never outgrows the set of
+    processes that own windows.
+    """
+    
+    def __init__(self):
+        self.entries = {}  # pid -> (psutil.Process, name)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def resolve(self, pids):
+        """Return {pid: name} for the given PIDs, evicting every other entry"""
+        names = {}
+        with self.lock:
+            entries = {}
+            for pid in set(pids):
+                entry = self.entries.get(pid)
+                # is_running() compares the create time, so a reused PID misses
+                if entry is not None and entry[0] is not None and entry[0].is_running():
+                    self.hits += 1
+                else:
+                    entry = self._lookup(pid)
+                    self.misses += 1
+                entries[pid] = entry
+                names[pid] = entry[1]
+            self.entries = entries
+        return names
+    
+    @staticmethod
+    def _lookup(pid):
+        try:
+            process = psutil.Process(pid)
+        except (psutil.Error, OSError):
+            # Already gone; such entries are never trusted, so it is looked up again next time
+            return None, "Unknown"
+        try:
+            return process, process.name()
+        except (psutil.Error, OSError):
+            # Protected process: remember that, it will not become readable
+            return process, "Unknown"
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class WindowListTracker:
+    """Stable window ids, and what changed since the admin's last list
+    
+    assign_ids() gives every window an id that lasts as long as its hwnd
+    belongs to the same process. full_message() and delta_message() build
+    the windows_list and windows_delta updates and remember what the admin
+    will have once it receives them; each update gets the next sequence
+    number and a delta names the one it applies on top of as `base`.
+    """
+    
+    def __init__(self):
+        self.ids = {}  # hwnd -> (id, process) from the last enumeration
+        self.next_ids = itertools.count(1)
+        self.sent = None  # id -> window as last sent, None until a full list went out
+        self.seq = 0
+    
+    def assign_ids(self, windows):
+        """Set the stable "id" of every window in place"""
+        ids = {}
+        for window in windows:
+            known = self.ids.get(window["hwnd"])
+            if known is None or known[1] != window["process"]:
+                # New window, or a recycled hwnd now owned by another process
+                known = (next(self.next_ids), window["process"])
+            ids[window["hwnd"]] = known
+            window["id"] = known[0]
+        self.ids = ids
+    
+    def reset(self):
+        """Forget what was sent, so the next update is a full list"""
+        self.sent = None
+    
+    def full_message(self, windows):
+        """Return a windows_list message with every window"""
+        self.seq += 1
+        self.sent = {window["id"]: window for window in windows}
+        return {"type": "windows_list", "seq": self.seq, "data": windows}
+    
+    def delta_message(self, windows):
+        """Return a windows_delta message, or None if nothing changed"""
+        if self.sent is None:
+            return self.full_message(windows)
+        
+        current = {window["id"]: window for window in windows}
+        sent = self.sent
+        added = [window for window_id, window in current.items() if window_id not in sent]
+        removed = [{"id": window_id} for window_id in sent if window_id not in current]
+        changed = [{"id": window_id, "title": window["title"]} for window_id, window in current.items()
+                   if window_id in sent and sent[window_id]["title"] != window["title"]]
+        if not (added or removed or changed):
+            return None
+        
+        base = self.seq
+        self.seq += 1
+        self.sent = current
+        return {"type": "windows_delta", "base": base, "seq": self.seq,
+                "added": added, "removed": removed, "changed": changed}